@@ -0,0 +1,46 @@
+"""
+Количество запросов к БД при создании и обновлении треклиста больших альбомов.
+
+Запуск: python -m benchmarks.album_write
+"""
+
+from benchmarks.utils import measure, setup_django, test_database
+
+SIZES = (16, 256, 2048)
+
+
+def run():
+    from catalogs.models import Artist, Song
+    from catalogs.serializers import AlbumSerializer
+
+    artist = Artist.objects.create(name="Бенчмарк")
+    songs = Song.objects.bulk_create([Song(title=f"Песня {index}") for index in range(max(SIZES))])
+    print(f"{'треков':>8} {'операция':>12} {'запросов':>10} {'время, с':>10}")
+    for size in SIZES:
+        tracks = [{"song": song.pk, "track_number": number} for number, song in enumerate(songs[:size], start=1)]
+        data = {"title": f"Альбом {size}", "release_year": 2020, "artist": artist.pk, "songs": tracks}
+        serializer = AlbumSerializer(data=data)
+        with measure() as validate:
+            serializer.is_valid(raise_exception=True)
+        with measure() as create:
+            album = serializer.save()
+
+        # Меняется каждая десятая песня, последние 10% треков удаляются
+        keep = size - size // 10
+        updated = [
+            {"song": songs[(index + 1) % size].pk if index % 10 == 0 else track["song"], "track_number": index + 1}
+            for index, track in enumerate(tracks[:keep])
+        ]
+        serializer = AlbumSerializer(album, data={**data, "songs": updated})
+        serializer.is_valid(raise_exception=True)
+        with measure() as update:
+            serializer.save()
+
+        for name, result in (("валидация", validate), ("создание", create), ("обновление", update)):
+            print(f"{size:>8} {name:>12} {result['queries']:>10} {result['seconds']:>10.3f}")
+
+
+if __name__ == "__main__":
+    setup_django()
+    with test_database():
+        run()
@@ -0,0 +1,61 @@
+"""
+Размер ответа на проводе и задержка страниц исполнителей без сжатия, с gzip и brotli.
+
+Задержка - время обработки запроса приложением (включая сжатие) без кэша и при попадании
+в кэш ответов, где тело хранится уже сжатым; передача - время отправки тела по каналу LINK_MBITS.
+
+Запуск: python -m benchmarks.compression
+"""
+
+import time
+
+from benchmarks.serializers import seed
+from benchmarks.utils import setup_django, test_database
+
+PAGE_SIZES = (10, 20, 100)
+ENCODINGS = ("identity", "gzip", "br")
+LINK_MBITS = 20
+REPEAT = 20
+
+
+def request(client, url, encoding):
+    """
+    Среднее время запроса в мс и размер тела последнего ответа.
+    """
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        response = client.get(url, headers={"Accept": "application/json", "Accept-Encoding": encoding})
+    return (time.perf_counter() - started) / REPEAT * 1000, len(response.content)
+
+
+def run():
+    from django.core.cache import caches
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    seed()
+    client = Client()
+    print(
+        f"{'исполнителей':>12} {'кодировка':>10} {'КиБ':>7} {'без кэша, мс':>13} {'из кэша, мс':>12} "
+        f"{f'передача {LINK_MBITS} Мбит/с, мс':>26}"
+    )
+    for size in PAGE_SIZES:
+        url = f"/api/v1/catalogs/artists/?limit={size}"
+        for encoding in ENCODINGS:
+            with override_settings(CATALOG_CACHE_ENABLED=False):
+                uncached_ms, length = request(client, url, encoding)
+            with override_settings(CATALOG_CACHE_ENABLED=True):
+                caches["catalog"].clear()
+                client.get(url, headers={"Accept": "application/json"})
+                cached_ms, _ = request(client, url, encoding)
+            transfer_ms = length * 8 / (LINK_MBITS * 1_000_000) * 1000
+            print(
+                f"{size:>12} {encoding:>10} {length / 1024:>7.1f} {uncached_ms:>13.2f} {cached_ms:>12.2f} "
+                f"{transfer_ms:>26.1f}"
+            )
+
+
+if __name__ == "__main__":
+    setup_django()
+    with test_database():
+        run()
@@ -0,0 +1,252 @@
+"""
+Сравнение развёртываний API каталога под конкурентной нагрузкой: gunicorn с синхронными
+воркерами (WSGI) и gunicorn с воркерами uvicorn (ASGI) с синхронными и асинхронными
+представлениями чтения (CATALOG_ASYNC_VIEWS), а также режимы соединений с БД: новое
+соединение на запрос, постоянные соединения и пул psycopg 3.
+
+Серверы запускаются отдельными процессами на временной БД, заполненной командой test_data.
+Клиент на asyncio держит --concurrency соединений HTTP/1.1 и выполняет одну и ту же смесь
+запросов benchmarks.load; количество SQL-запросов берётся из заголовка Server-Timing.
+Клиент работает на той же машине, что и серверы, поэтому на малом числе ядер сравнивать
+имеет смысл только результаты одного запуска между собой.
+
+Запуск:
+    python -m benchmarks.deploy
+    python -m benchmarks.deploy --concurrency 1 16 64 --workers 3 --albums 100000
+    python -m benchmarks.deploy --servers wsgi asgi-async --save benchmarks/baselines/deploy.json
+    python -m benchmarks.deploy --servers wsgi asgi --connections close persistent pool
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from benchmarks.load import MixGenerator, git_commit, seed, summarize
+from benchmarks.utils import setup_django, test_database
+
+HOST = "127.0.0.1"
+# Команда gunicorn и значение CATALOG_ASYNC_VIEWS для каждого варианта развёртывания
+SERVERS = {
+    "wsgi": (["config.wsgi:application"], False),
+    "asgi": (["config.asgi:application", "-k", "uvicorn_worker.UvicornWorker"], False),
+    "asgi-async": (["config.asgi:application", "-k", "uvicorn_worker.UvicornWorker"], True),
+}
+# Переменные окружения для режимов соединений с БД: новое соединение на каждый запрос,
+# постоянные соединения процесса и пул psycopg 3
+CONNECTIONS = {
+    "close": {"POSTGRES_POOL": "False", "POSTGRES_CONN_MAX_AGE": "0"},
+    "persistent": {"POSTGRES_POOL": "False", "POSTGRES_CONN_MAX_AGE": "600"},
+    "pool": {"POSTGRES_POOL": "True"},
+}
+SQL_QUERIES = re.compile(r'desc="(\d+) SQL"')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name, connections, workers, database, cache):
+    from django.conf import settings
+
+    arguments, async_views = SERVERS[name]
+    port = free_port()
+    env = {
+        **os.environ,
+        "POSTGRES_DB": database,
+        "ALLOWED_HOSTS": HOST,
+        "DEBUG": "False",
+        "SECRET_KEY": settings.SECRET_KEY or "benchmark",
+        "CATALOG_ASYNC_VIEWS": str(async_views),
+        "CATALOG_CACHE_ENABLED": str(cache),
+        "CATALOG_QUERY_BUDGET_STRICT": "False",
+        "CATALOG_SERVER_TIMING": "True",
+        **CONNECTIONS[connections],
+    }
+    command = [sys.executable, "-m", "gunicorn", *arguments, "--bind", f"{HOST}:{port}", "--workers", str(workers)]
+    # Журнал сервера пишется в файл: непрочитанный pipe заполнился бы и остановил воркеры
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=log)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            raise SystemExit(f"{name}: сервер не запустился\n{log.read().decode()}")
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f"{name}: сервер не ответил за 30 секунд")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class Connection:
+    """
+    Минимальный клиент HTTP/1.1 с keep-alive. Синхронные воркеры gunicorn закрывают
+    соединение после каждого ответа, тогда оно открывается заново.
+    """
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, request):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(HOST, self.port)
+        body = b"" if request["body"] is None else json.dumps(request["body"]).encode()
+        head = (
+            f"{request['method']} {request['path']} HTTP/1.1\r\nHost: {HOST}\r\nAccept: application/json\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        )
+        self.writer.write(head.encode() + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            while size := int((await self.reader.readline()).strip(), 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        else:
+            await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        match = SQL_QUERIES.search(headers.get("server-timing", ""))
+        return status, int(match[1]) if match else 0
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def run_clients(port, mix, concurrency):
+    """
+    Выполняет mix в concurrency соединениях. Возвращает [(задержка, SQL-запросов, статус)]
+    в порядке mix и общее время.
+    """
+    samples = [None] * len(mix)
+    indexes = iter(range(len(mix)))
+
+    async def client():
+        connection = Connection(port)
+        for index in indexes:
+            started = time.perf_counter()
+            try:
+                status, queries = await connection.request(mix[index])
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                await connection.close()
+                status, queries = 599, 0
+            samples[index] = (time.perf_counter() - started, queries, status)
+        await connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def benchmark(options):
+    from django.db import connection
+
+    started = time.perf_counter()
+    seed(options)
+    print(f"Наполнение каталога: {time.perf_counter() - started:.1f} с", file=sys.stderr)
+    mix = MixGenerator(random.Random(options.seed)).generate(options.requests + options.warmup)
+    warmup, mix = mix[: options.warmup], mix[options.warmup :]
+    database = connection.settings_dict["NAME"]
+
+    results = {}
+    for server in options.servers:
+        for connections in options.connections:
+            name = f"{server}/{connections}"
+            process, port = start_server(server, connections, options.workers, database, options.cache)
+            try:
+                asyncio.run(run_clients(port, warmup, max(options.concurrency)))
+                for concurrency in options.concurrency:
+                    samples, seconds = asyncio.run(run_clients(port, mix, concurrency))
+                    results.setdefault(name, {})[str(concurrency)] = stats = summarize(samples, seconds)
+                    print(f"{name} c={concurrency}: {stats['rps']:.1f} rps", file=sys.stderr)
+            finally:
+                stop_server(process)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "workers": options.workers,
+            "requests": len(mix),
+            "catalog": {"artists": options.artists, "songs": options.songs, "albums": options.albums},
+            "seed": options.seed,
+            "cache": options.cache,
+        },
+        "servers": results,
+    }
+
+
+def print_report(result):
+    columns = ("rps", "p50_ms", "p95_ms", "p99_ms", "errors", "queries_mean")
+    print(f"{'':>22}{'clients':>9}" + "".join(f"{column:>14}" for column in columns))
+    for name, levels in result["servers"].items():
+        for concurrency, stats in levels.items():
+            values = "".join(
+                f"{stats[column]:>14}" if isinstance(stats[column], int) else f"{stats[column]:>14.2f}"
+                for column in columns
+            )
+            print(f"{name:>22}{concurrency:>9}{values}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--artists", type=int, default=2000)
+    parser.add_argument("--songs", type=int, default=20000)
+    parser.add_argument("--albums", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=1000, help="Запросов на каждый уровень нагрузки.")
+    parser.add_argument("--warmup", type=int, default=100, help="Запросы прогрева, не входят в замер.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Одновременных клиентов.")
+    parser.add_argument("--workers", type=int, default=3, help="Воркеров gunicorn.")
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=list(SERVERS))
+    parser.add_argument("--connections", nargs="+", choices=CONNECTIONS, default=["pool"], help="Соединения с БД.")
+    parser.add_argument("--cache", action="store_true", help="Включить кэш ответов каталога.")
+    parser.add_argument("--save", help="Сохранить результат в JSON.")
+    return parser.parse_args()
+
+
+def main():
+    options = parse_args()
+    setup_django()
+    with test_database():
+        result = benchmark(options)
+    print_report(result)
+    if options.save:
+        Path(options.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(options.save).write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
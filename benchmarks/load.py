@@ -0,0 +1,456 @@
+"""
+Нагрузочный бенчмарк API каталога: задержка (p50/p95/p99), запросы в секунду
+и количество SQL-запросов на HTTP-запрос.
+
+Запросы выполняются напрямую через WSGI- или ASGI-приложение Django, без HTTP-сервера,
+на временной БД, заполненной командой test_data. Набор запросов генерируется по весам
+из MIX или воспроизводится из JSONL-файла (строка - {"name", "method", "path", "body"}).
+Результат можно сохранить как JSON-базовую линию и сравнить с ней следующий запуск.
+
+Запуск:
+    python -m benchmarks.load --save benchmarks/baselines/main.json
+    python -m benchmarks.load --compare benchmarks/baselines/main.json
+    python -m benchmarks.load --interface asgi --concurrency 8 --save-mix mix.jsonl
+    python -m benchmarks.load --mix mix.jsonl
+"""
+
+import argparse
+import asyncio
+import contextvars
+import io
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks.utils import setup_django, test_database
+
+PREFIX = "/api/v1/catalogs"
+HOST = "testserver"
+PAGE_SIZE = 20
+MAX_OFFSET = 1000
+SAMPLE_SIZE = 1000
+
+# Счётчик SQL-запросов текущего HTTP-запроса. Контекст копируется в поток,
+# в котором ASGI выполняет синхронные представления, поэтому счётчик общий
+queries_counter = contextvars.ContextVar("queries_counter", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = queries_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    # Объект соединения переиспользуется при переподключении, обёртка добавляется один раз.
+    # Соединение может открыться внутри connection.execute_wrapper() (например, в middleware
+    # метрик), который при выходе снимает последнюю обёртку, поэтому счётчик ставится первым
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+def percentile(values, percent):
+    """
+    Перцентиль по методу ближайшего ранга, values отсортированы.
+    """
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def summarize(samples, seconds=None):
+    latencies = sorted(latency for latency, _, _ in samples)
+    queries = [count for _, count, _ in samples]
+    result = {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, status in samples if status >= 400),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "queries_mean": sum(queries) / len(queries),
+        "queries_max": max(queries),
+    }
+    if seconds is not None:
+        result["rps"] = len(samples) / seconds
+    return result
+
+
+def seed(options):
+    from django.core.management import call_command
+    from django.db import connection
+
+    from catalogs.search import rebuild_search_index
+
+    call_command(
+        "test_data",
+        artists=options.artists,
+        songs=options.songs,
+        albums=options.albums,
+        seed=options.seed,
+        stdout=io.StringIO(),
+    )
+    rebuild_search_index()
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+class MixGenerator:
+    """
+    Генератор запросов к трём viewset-ам и поиску. Вес задаёт долю запросов каждого вида,
+    id и слова для фильтров берутся из выборки данных БД.
+    """
+
+    MIX = {
+        "artists-list": 10,
+        "artists-retrieve": 10,
+        "artists-filter": 5,
+        "albums-list": 10,
+        "albums-retrieve": 15,
+        "albums-filter": 5,
+        "songs-list": 10,
+        "songs-retrieve": 15,
+        "songs-filter": 5,
+        "search": 10,
+        "songs-update": 5,
+    }
+
+    def __init__(self, rng):
+        from catalogs.models import Album, Artist, Song
+
+        self.rng = rng
+        self.artists = self.sample(Artist, "name")
+        self.albums = self.sample(Album, "title")
+        self.songs = self.sample(Song, "title")
+        self.years = list(Album.objects.values_list("release_year", flat=True).distinct())
+
+    def sample(self, model, field):
+        from django.db.models import Max, Min
+
+        # id выбираются генератором с seed, поэтому набор запросов воспроизводим
+        bounds = model.objects.aggregate(low=Min("id"), high=Max("id"))
+        if bounds["low"] is None:
+            return []
+        ids = range(bounds["low"], bounds["high"] + 1)
+        ids = self.rng.sample(ids, min(SAMPLE_SIZE, len(ids)))
+        return list(model.objects.filter(id__in=ids).order_by("id").values_list("id", field))
+
+    def page(self, resource, **params):
+        params = {"limit": PAGE_SIZE, "offset": self.rng.randrange(0, MAX_OFFSET, PAGE_SIZE), **params}
+        return f"{PREFIX}/{resource}/?{urlencode(params)}"
+
+    def word(self, rows):
+        return self.rng.choice(self.rng.choice(rows)[1].split()).strip(".,").lower()
+
+    def request(self, name):
+        resource, _, action = name.partition("-")
+        rows = {"artists": self.artists, "albums": self.albums, "songs": self.songs}.get(resource)
+        method, body = "GET", None
+        if action == "list":
+            path = self.page(resource)
+        elif action == "retrieve":
+            path = f"{PREFIX}/{resource}/{self.rng.choice(rows)[0]}/"
+        elif action == "update":
+            # Название не меняется, но запись сохраняется со всеми сигналами и сбросом кэша
+            pk, title = self.rng.choice(rows)
+            method, path, body = "PATCH", f"{PREFIX}/{resource}/{pk}/", {"title": title}
+        elif resource == "artists":
+            path = f"{PREFIX}/artists/?{urlencode({'name__icontains': self.word(rows), 'limit': PAGE_SIZE})}"
+        elif resource == "albums":
+            path = f"{PREFIX}/albums/?{urlencode({'release_year': self.rng.choice(self.years), 'limit': PAGE_SIZE})}"
+        elif resource == "songs":
+            path = f"{PREFIX}/songs/?{urlencode({'title__icontains': self.word(rows), 'limit': PAGE_SIZE})}"
+        else:
+            path = f"{PREFIX}/search/?{urlencode({'q': self.word(self.songs)})}"
+        return {"name": name, "method": method, "path": path, "body": body}
+
+    def generate(self, count):
+        names = self.rng.choices(list(self.MIX), weights=list(self.MIX.values()), k=count)
+        return [self.request(name) for name in names]
+
+
+def load_mix(path):
+    with open(path, encoding="utf-8") as file:
+        mix = [json.loads(line) for line in file if line.strip()]
+    for request in mix:
+        request.setdefault("name", f"{request.get('method', 'GET')} {urlsplit(request['path']).path}")
+        request.setdefault("method", "GET")
+        request.setdefault("body", None)
+    return mix
+
+
+def encode_body(request):
+    return b"" if request["body"] is None else json.dumps(request["body"]).encode()
+
+
+class WSGIRunner:
+    def __init__(self):
+        from django.core.wsgi import get_wsgi_application
+
+        self.application = get_wsgi_application()
+
+    def call(self, request):
+        url = urlsplit(request["path"])
+        body = encode_body(request)
+        environ = {
+            "REQUEST_METHOD": request["method"],
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+            "SERVER_NAME": HOST,
+            "HTTP_HOST": HOST,
+            "HTTP_ACCEPT": "application/json",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        status = []
+        counter = [0]
+        token = queries_counter.set(counter)
+        started = time.perf_counter()
+        response = self.application(environ, lambda value, headers, exc_info=None: status.append(value))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        latency = time.perf_counter() - started
+        queries_counter.reset(token)
+        return latency, counter[0], int(status[0].split()[0])
+
+    def run(self, mix, concurrency):
+        if concurrency == 1:
+            return [self.call(request) for request in mix]
+        with ThreadPoolExecutor(concurrency) as executor:
+            return list(executor.map(self.call, mix))
+
+
+class ASGIRunner:
+    def __init__(self):
+        from django.core.asgi import get_asgi_application
+
+        self.application = get_asgi_application()
+
+    async def call(self, request):
+        url = urlsplit(request["path"])
+        body = encode_body(request)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request["method"],
+            "scheme": "http",
+            "path": url.path,
+            "raw_path": url.path.encode(),
+            "query_string": url.query.encode(),
+            "headers": [
+                (b"host", HOST.encode()),
+                (b"accept", b"application/json"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "server": (HOST, 80),
+            "client": ("127.0.0.1", 0),
+        }
+        status = []
+        finished = asyncio.Event()
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif not message.get("more_body"):
+                finished.set()
+
+        counter = [0]
+        queries_counter.set(counter)
+        started = time.perf_counter()
+        await self.application(scope, receive, send)
+        latency = time.perf_counter() - started
+        finished.set()
+        return latency, counter[0], status[0]
+
+    def run(self, mix, concurrency):
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited(request):
+                async with semaphore:
+                    # Каждый запрос в своей задаче: у неё своя копия контекста и счётчика
+                    return await self.call(request)
+
+            return await asyncio.gather(*(limited(request) for request in mix))
+
+        return asyncio.run(run_all())
+
+
+RUNNERS = {"wsgi": WSGIRunner, "asgi": ASGIRunner}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(options):
+    from django.conf import settings
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from django.test.utils import override_settings
+
+    started = time.perf_counter()
+    seed(options)
+    print(f"Наполнение каталога: {time.perf_counter() - started:.1f} с", file=sys.stderr)
+
+    rng = random.Random(options.seed)
+    if options.mix:
+        mix = load_mix(options.mix)
+    else:
+        mix = MixGenerator(rng).generate(options.requests + options.warmup)
+    if options.save_mix:
+        with open(options.save_mix, "w", encoding="utf-8") as file:
+            file.writelines(json.dumps(request, ensure_ascii=False) + "\n" for request in mix)
+    warmup, mix = mix[: options.warmup], mix[options.warmup :]
+    if not mix:
+        raise SystemExit("Нет запросов для замера: проверьте --requests, --warmup и --mix.")
+
+    # Счётчик подключается к каждому новому соединению, в том числе в потоках воркеров
+    connection_created.connect(install_query_counter)
+    connections.close_all()
+    with override_settings(ALLOWED_HOSTS=[HOST], CATALOG_CACHE_ENABLED=options.cache):
+        runner = RUNNERS[options.interface]()
+        runner.run(warmup, options.concurrency)
+        started = time.perf_counter()
+        samples = runner.run(mix, options.concurrency)
+        seconds = time.perf_counter() - started
+    connection_created.disconnect(install_query_counter)
+
+    groups = {}
+    for request, sample in zip(mix, samples, strict=True):
+        groups.setdefault(request["name"], []).append(sample)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "interface": options.interface,
+            "concurrency": options.concurrency,
+            "requests": len(mix),
+            "catalog": {"artists": options.artists, "songs": options.songs, "albums": options.albums},
+            "mix": options.mix,
+            "seed": options.seed,
+            "cache": options.cache,
+            "fast_serializers": settings.CATALOG_FAST_SERIALIZERS,
+        },
+        "total": summarize(samples, seconds),
+        "endpoints": {name: summarize(group) for name, group in sorted(groups.items())},
+    }
+
+
+def print_report(result):
+    columns = ("requests", "errors", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "queries_mean", "queries_max")
+    print(f"{'':>20}" + "".join(f"{column:>13}" for column in columns))
+    rows = [*result["endpoints"].items(), ("total", result["total"])]
+    for name, stats in rows:
+        print(f"{name:>20}" + "".join(format_value(stats[column]) for column in columns))
+    print(f"Запросов в секунду: {result['total']['rps']:.1f}")
+
+
+def format_value(value):
+    return f"{value:>13}" if isinstance(value, int) else f"{value:>13.2f}"
+
+
+def compare(result, baseline, threshold):
+    """
+    Сравнивает результат с базовой линией. Регрессия - рост p95 или падение rps больше
+    чем на threshold процентов либо рост числа SQL-запросов на запрос.
+    """
+    regressions = []
+    print(f"\nСравнение с {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}):")
+    differs = [
+        key
+        for key, value in result["meta"].items()
+        if key not in ("commit", "date", "python") and baseline["meta"].get(key) != value
+    ]
+    if differs:
+        print(f"Внимание: параметры запуска отличаются от базовой линии ({', '.join(differs)}).")
+    print(f"{'':>20}{'p95_ms':>22}{'queries_mean':>18}")
+    rows = [*result["endpoints"].items(), ("total", result["total"])]
+    for name, stats in rows:
+        old = baseline["total"] if name == "total" else baseline["endpoints"].get(name)
+        if old is None:
+            continue
+        change = (stats["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+        print(
+            f"{name:>20}{old['p95_ms']:>8.2f} -> {stats['p95_ms']:>7.2f} {change:>+4.0f}%"
+            f"{old['queries_mean']:>8.2f} -> {stats['queries_mean']:>6.2f}"
+        )
+        if change > threshold:
+            regressions.append(f"{name}: p95 {change:+.0f}%")
+        if stats["queries_mean"] > old["queries_mean"] + 0.01:
+            regressions.append(f"{name}: SQL-запросов {old['queries_mean']:.2f} -> {stats['queries_mean']:.2f}")
+    change = (result["total"]["rps"] / baseline["total"]["rps"] - 1) * 100
+    print(f"Запросов в секунду: {baseline['total']['rps']:.1f} -> {result['total']['rps']:.1f} ({change:+.0f}%)")
+    if change < -threshold:
+        regressions.append(f"rps {change:+.0f}%")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--artists", type=int, default=2000)
+    parser.add_argument("--songs", type=int, default=20000)
+    parser.add_argument("--albums", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=2000, help="Количество замеряемых запросов.")
+    parser.add_argument("--warmup", type=int, default=100, help="Запросы прогрева, не входят в замер.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Одновременных запросов.")
+    parser.add_argument("--interface", choices=RUNNERS, default="wsgi")
+    parser.add_argument("--cache", action="store_true", help="Включить кэш ответов каталога.")
+    parser.add_argument("--mix", help="JSONL-файл с запросами для воспроизведения.")
+    parser.add_argument("--save-mix", help="Сохранить набор запросов в JSONL для следующих запусков.")
+    parser.add_argument("--save", help="Сохранить результат как JSON-базовую линию.")
+    parser.add_argument("--compare", help="JSON-базовая линия для сравнения.")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Допустимое ухудшение, %%.")
+    return parser.parse_args()
+
+
+def main():
+    options = parse_args()
+    baseline = json.loads(Path(options.compare).read_text()) if options.compare else None
+    setup_django()
+    with test_database():
+        result = benchmark(options)
+    print_report(result)
+    if options.save:
+        Path(options.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(options.save).write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+    if baseline is not None:
+        regressions = compare(result, baseline, options.threshold)
+        if regressions:
+            print("Регрессии:\n" + "\n".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
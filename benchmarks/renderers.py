@@ -0,0 +1,61 @@
+"""
+Время и память кодирования страниц исполнителей в JSON стандартным рендерером DRF и orjson.
+
+Запуск: python -m benchmarks.renderers
+"""
+
+import time
+import tracemalloc
+
+from benchmarks.serializers import seed
+from benchmarks.utils import setup_django, test_database
+
+PAGE_SIZES = (10, 50, 200)
+REPEAT = 20
+
+
+def encode(renderer, data):
+    """
+    Среднее время кодирования в мс и пик выделенной при кодировании памяти в КиБ.
+    """
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        content = renderer.render(data)
+    seconds = (time.perf_counter() - started) / REPEAT
+    tracemalloc.start()
+    renderer.render(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return content, seconds * 1000, peak / 1024
+
+
+def run():
+    from rest_framework.renderers import JSONRenderer
+
+    from catalogs.prefetch import build_queryset
+    from catalogs.renderers import ORJSONRenderer
+    from catalogs.serializers import ArtistListRetrieveSerializer
+
+    seed()
+    artists = list(build_queryset(ArtistListRetrieveSerializer).order_by("id"))
+    print(
+        f"{'исполнителей':>12} {'КиБ':>7} {'json, мс':>9} {'orjson, мс':>11} {'ускорение':>10} {'json, КиБ':>10} {'orjson, КиБ':>12}"
+    )
+    for size in PAGE_SIZES:
+        # Кодируется то, что отдаёт сериализатор страницы, сериализация в замер не входит
+        data = {"count": len(artists), "next": None, "previous": None}
+        data["results"] = ArtistListRetrieveSerializer(artists[:size], many=True).data
+        content, json_ms, json_peak = encode(JSONRenderer(), data)
+        fast_content, fast_ms, fast_peak = encode(ORJSONRenderer(), data)
+        if fast_content != content:
+            raise SystemExit(f"Ответы рендереров различаются на странице из {size} исполнителей.")
+        print(
+            f"{size:>12} {len(content) / 1024:>7.0f} {json_ms:>9.2f} {fast_ms:>11.2f} "
+            f"{json_ms / fast_ms:>9.1f}x {json_peak:>10.0f} {fast_peak:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    setup_django()
+    with test_database():
+        run()
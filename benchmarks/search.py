@@ -0,0 +1,82 @@
+"""
+Время поиска по каталогу в сотни тысяч записей.
+
+Запуск: python -m benchmarks.search
+"""
+
+import itertools
+import random
+
+from benchmarks.utils import measure, setup_django, test_database
+
+ARTISTS = 20000
+ALBUMS = 100000
+SONGS = 500000
+TRACKS_PER_ALBUM = 10
+BATCH_SIZE = 10000
+QUERIES = ("кро", "звезда солнце", "ночь город", "ветер море дорога", "зим")
+REPEAT = 20
+
+SYLLABLES = ("ка", "ро", "ми", "ла", "ве", "ст", "ну", "да", "ко", "ри", "та", "зо", "пе", "си", "мо", "ля")
+WORDS = ["звезда", "солнце", "ночь", "город", "ветер", "море", "дорога", "зима", "кровь", "группа"] + [
+    "".join(parts) for parts in itertools.product(SYLLABLES, repeat=3)
+]
+
+
+def phrase(words):
+    return " ".join(random.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def seed():
+    from catalogs.models import Album, AlbumSong, Artist, Song
+
+    random.seed(0)
+    names = {f"{phrase(2)} {index}" for index in range(ARTISTS)}
+    artists = Artist.objects.bulk_create([Artist(name=name) for name in names], batch_size=BATCH_SIZE)
+    songs = Song.objects.bulk_create([Song(title=phrase(3)) for _ in range(SONGS)], batch_size=BATCH_SIZE)
+    albums = Album.objects.bulk_create(
+        [
+            Album(title=f"{phrase(2)} {index}", release_year=2000, artist=random.choice(artists))
+            for index in range(ALBUMS)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    AlbumSong.objects.bulk_create(
+        [
+            AlbumSong(album=album, song=random.choice(songs), track_number=number)
+            for album in albums
+            for number in range(1, TRACKS_PER_ALBUM + 1)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def run():
+    from django.db import connection
+
+    from catalogs.models import SearchEntry
+    from catalogs.search import build_search_query, rebuild_search_index, search
+
+    with measure() as result:
+        seed()
+    print(f"Наполнение каталога: {result['seconds']:.1f} с")
+    with measure() as result:
+        rebuild_search_index()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {SearchEntry._meta.db_table}")
+    print(f"Построение поисковой таблицы: {result['seconds']:.1f} с, {SearchEntry.objects.count()} записей")
+
+    print(f"{'запрос':>20} {'найдено':>9} {'первая страница, мс':>20}")
+    for text in QUERIES:
+        queryset = search(build_search_query(text))
+        found = queryset.count()
+        with measure() as result:
+            for _ in range(REPEAT):
+                list(queryset[:10])
+        print(f"{text:>20} {found:>9} {result['seconds'] / REPEAT * 1000:>20.1f}")
+
+
+if __name__ == "__main__":
+    setup_django()
+    with test_database():
+        run()
@@ -0,0 +1,64 @@
+"""
+Время сериализации списков через сериализаторы DRF и через скомпилированные кодировщики.
+
+Запуск: python -m benchmarks.serializers
+"""
+
+from benchmarks.utils import measure, setup_django, test_database
+
+ARTISTS = 200
+ALBUMS_PER_ARTIST = 5
+TRACKS_PER_ALBUM = 12
+REPEAT = 5
+
+
+def seed():
+    from catalogs.models import Album, AlbumSong, Artist, Song
+
+    songs = Song.objects.bulk_create([Song(title=f"Песня {index}") for index in range(TRACKS_PER_ALBUM * 10)])
+    artists = Artist.objects.bulk_create([Artist(name=f"Исполнитель {index}") for index in range(ARTISTS)])
+    albums = Album.objects.bulk_create(
+        [
+            Album(title=f"Альбом {index}", release_year=2000 + index, artist=artist)
+            for artist in artists
+            for index in range(ALBUMS_PER_ARTIST)
+        ]
+    )
+    AlbumSong.objects.bulk_create(
+        [
+            AlbumSong(album=album, song=songs[(album.pk + number) % len(songs)], track_number=number)
+            for album in albums
+            for number in range(1, TRACKS_PER_ALBUM + 1)
+        ]
+    )
+
+
+def run():
+    from catalogs.fast import get_encoder
+    from catalogs.prefetch import build_queryset
+    from catalogs.serializers import AlbumListRetvieveSerializer, ArtistListRetrieveSerializer, SongSerializer
+
+    seed()
+    print(f"{'сериализатор':>30} {'строк':>7} {'DRF, мкс/стр':>13} {'fast, мкс/стр':>14} {'ускорение':>10}")
+    for serializer_class in (ArtistListRetrieveSerializer, AlbumListRetvieveSerializer, SongSerializer):
+        # Данные загружаются один раз, замеряется только сериализация
+        objects = list(build_queryset(serializer_class))
+        encode = get_encoder(serializer_class)
+        with measure() as drf:
+            for _ in range(REPEAT):
+                _ = serializer_class(objects, many=True).data
+        with measure() as fast:
+            for _ in range(REPEAT):
+                _ = [encode(obj) for obj in objects]
+        rows = len(objects) * REPEAT
+        drf_row, fast_row = drf["seconds"] / rows * 1e6, fast["seconds"] / rows * 1e6
+        print(
+            f"{serializer_class.__name__:>30} {len(objects):>7} {drf_row:>13.1f} {fast_row:>14.1f} "
+            f"{drf_row / fast_row:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    setup_django()
+    with test_database():
+        run()
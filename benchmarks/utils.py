@@ -0,0 +1,41 @@
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Создаёт временную тестовую БД, как это делает `manage.py test`, и удаляет её после замера.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextmanager
+def measure():
+    """
+    Считает запросы к БД и время выполнения блока: `with measure() as result: ...`.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    result = {}
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        yield result
+        result["seconds"] = time.perf_counter() - started
+    result["queries"] = len(queries)
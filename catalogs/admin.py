@@ -13,6 +13,7 @@ class ArtistAdmin(ModelAdmin):
     list_display = (
         "id",
         "name",
+        "album_count",
     )
 
 
@@ -39,4 +40,5 @@ class AlbumAdmin(ModelAdmin):
         "title",
         "artist",
         "release_year",
+        "track_count",
     )
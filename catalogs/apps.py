@@ -1,7 +1,33 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_migrate
+
+# Расширения Postgres, которые нужны индексам моделей
+EXTENSIONS = ("pg_trgm",)
+
+
+def create_extensions(using, **kwargs):
+    """
+    Создаёт расширения до применения миграций: миграции генерируются при запуске
+    (makemigrations), поэтому операцию CreateExtension в них добавить нельзя.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for extension in EXTENSIONS:
+            cursor.execute(f"CREATE EXTENSION IF NOT EXISTS {extension}")
 
 
 class CatalogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "catalogs"
     verbose_name = "Каталог"
+
+    def ready(self):
+        from catalogs import cache, changes, search, signals, snapshots, summary, tasks  # noqa: F401
+        from catalogs.metrics import install_query_metrics
+
+        pre_migrate.connect(create_extensions, sender=self)
+        connection_created.connect(install_query_metrics)
@@ -0,0 +1,77 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_filters import ModelChoiceFilter, ModelMultipleChoiceFilter
+
+
+class AsyncReadMixin:
+    """
+    Асинхронное чтение каталога под ASGI (CATALOG_ASYNC_VIEWS).
+
+    Для action из async_actions представление становится корутиной и вызывает метод
+    `a<action>` (alist, aretrieve, aexport): записи читаются async ORM, сериализация
+    выполняется в цикле событий. Запросы к БД в Django 5.2 всё равно уходят в поток
+    запроса, но на время ожидания клиента и потоковой выгрузки поток воркера не занят.
+    Запись и остальные action выполняются синхронным представлением DRF в потоке.
+    """
+
+    async_actions = ("list", "retrieve", "export")
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.CATALOG_ASYNC_VIEWS or not actions or not set(actions.values()) & set(cls.async_actions):
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            method = request.method.lower()
+            action = actions.get(method) or (actions.get("get") if method == "head" else None)
+            if action not in cls.async_actions:
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            self.request = request
+            return await self.adispatch(request, *args, **kwargs)
+
+        # Атрибуты представления DRF нужны роутеру, drf-spectacular и CsrfViewMiddleware
+        for name in ("cls", "initkwargs", "actions", "csrf_exempt"):
+            setattr(async_view, name, getattr(view, name))
+        async_view.__name__ = view.__name__
+        async_view.__doc__ = view.__doc__
+        return async_view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        Асинхронный аналог APIView.dispatch для action из async_actions.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            response = await getattr(self, f"a{self.action}")(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        # Пользователя сессии или токена аутентификация читает из БД синхронно,
+        # анонимный запрос проверяется без обращения к БД
+        if "Authorization" in request.headers or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+        else:
+            self.initial(request, *args, **kwargs)
+
+    async def afilter_queryset(self, queryset):
+        # ModelChoiceFilter (например, artist у альбомов) проверяет значение запросом к БД
+        filterset_class = getattr(self, "filterset_class", None)
+        params = self.request.query_params
+        if filterset_class is not None and any(
+            name in params and isinstance(field, ModelChoiceFilter | ModelMultipleChoiceFilter)
+            for name, field in filterset_class.base_filters.items()
+        ):
+            return await sync_to_async(self.filter_queryset)(queryset)
+        return self.filter_queryset(queryset)
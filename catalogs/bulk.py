@@ -0,0 +1,194 @@
+from collections import Counter
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
+
+from catalogs.jobs import enqueue, get_job_response, prefers_background
+from catalogs.models import Album, Artist, Song
+from catalogs.parsers import NDJSONParser, ORJSONParser
+from catalogs.serializers import (
+    AlbumSerializer,
+    ArtistSerializer,
+    SongSerializer,
+    atomic_write,
+    collect_pks,
+    sync_tracks,
+)
+from catalogs.signals import catalog_changed
+
+DUPLICATE_ITEM_MESSAGE = "Запись с такими же уникальными полями передана ниже в этом же запросе."
+
+
+class BulkListSerializer(ListSerializer):
+    """
+    Базовый списочный сериализатор массовой записи.
+
+    Каждый элемент валидируется отдельно, ошибки возвращаются по элементам, а все корректные
+    элементы записываются одной транзакцией. Повторы по unique_fields внутри запроса
+    отбрасываются в пользу последнего элемента.
+    """
+
+    unique_fields = ()
+
+    def preload(self, items):
+        """
+        Загружает связанные объекты для всех элементов сразу в context["preloaded"].
+        """
+
+    def get_key(self, index, validated):
+        if not self.unique_fields:
+            return index
+        return tuple(getattr(validated[field], "pk", validated[field]) for field in self.unique_fields)
+
+    def write(self, items):
+        """
+        Записывает корректные элементы, возвращает список пар (объект, создан ли он).
+        """
+        raise NotImplementedError
+
+    def save_items(self):
+        items = self.initial_data
+        self.preload(items)
+        results = [None] * len(items)
+        valid = {}
+        for index, item in enumerate(items):
+            try:
+                validated = self.child.run_validation(item)
+            except ValidationError as exc:
+                results[index] = {"status": "error", "errors": exc.detail}
+                continue
+            key = self.get_key(index, validated)
+            if key in valid:
+                results[valid[key][0]] = {"status": "error", "errors": {"non_field_errors": [DUPLICATE_ITEM_MESSAGE]}}
+            valid[key] = (index, validated)
+        if valid:
+            with atomic_write():
+                written = self.write([validated for _, validated in valid.values()])
+            for (index, _), (instance, created) in zip(valid.values(), written, strict=True):
+                results[index] = {"status": "created" if created else "updated", "id": instance.pk}
+        return results
+
+
+class ArtistBulkListSerializer(BulkListSerializer):
+    unique_fields = ("name",)
+
+    def write(self, items):
+        artists = [Artist(**item) for item in items]
+        existing = set(
+            Artist.objects.filter(name__in=[artist.name for artist in artists]).values_list("name", flat=True)
+        )
+        Artist.objects.bulk_create(
+            artists,
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=["updated_at"],
+        )
+        catalog_changed.send(sender=Artist, instances=artists, deleted=False)
+        return [(artist, artist.name not in existing) for artist in artists]
+
+
+class SongBulkListSerializer(BulkListSerializer):
+    def write(self, items):
+        songs = Song.objects.bulk_create([Song(**item) for item in items])
+        catalog_changed.send(sender=Song, instances=songs, deleted=False)
+        return [(song, True) for song in songs]
+
+
+class AlbumBulkListSerializer(BulkListSerializer):
+    unique_fields = ("title", "artist")
+
+    def preload(self, items):
+        tracks = [track for item in items if isinstance(item, dict) for track in item.get("songs") or ()]
+        self.context["preloaded"] = {
+            Artist: Artist.objects.in_bulk(collect_pks(items, "artist")),
+            Song: Song.objects.in_bulk(collect_pks(tracks, "song")),
+        }
+
+    def write(self, items):
+        albums = [
+            Album(title=item["title"], release_year=item["release_year"], artist=item["artist"]) for item in items
+        ]
+        existing = set(
+            Album.objects.filter(
+                title__in=[album.title for album in albums],
+                artist_id__in=[album.artist_id for album in albums],
+            ).values_list("title", "artist_id")
+        )
+        Album.objects.bulk_create(
+            albums,
+            update_conflicts=True,
+            unique_fields=["title", "artist"],
+            update_fields=["release_year", "updated_at"],
+        )
+        catalog_changed.send(sender=Album, instances=albums, deleted=False)
+        sync_tracks({album: item["songs"] for album, item in zip(albums, items, strict=True)})
+        return [(album, (album.title, album.artist_id) not in existing) for album in albums]
+
+
+class ArtistBulkSerializer(ArtistSerializer):
+    class Meta(ArtistSerializer.Meta):
+        list_serializer_class = ArtistBulkListSerializer
+        # Существующее имя - не ошибка, а обновление записи
+        extra_kwargs = {"name": {"validators": []}}
+
+
+class SongBulkSerializer(SongSerializer):
+    class Meta(SongSerializer.Meta):
+        list_serializer_class = SongBulkListSerializer
+
+
+class AlbumBulkSerializer(AlbumSerializer):
+    class Meta(AlbumSerializer.Meta):
+        list_serializer_class = AlbumBulkListSerializer
+        # Существующая пара (title, artist) - не ошибка, а обновление записи
+        validators = []
+
+
+def get_bulk_result(results):
+    counts = Counter(result["status"] for result in results)
+    return {
+        "created": counts["created"],
+        "updated": counts["updated"],
+        "errors": counts["error"],
+        "results": results,
+    }
+
+
+class BulkMixin:
+    """
+    Action `bulk` - массовое создание и обновление записей списком в JSON или NDJSON.
+
+    С заголовком `Prefer: respond-async` список записывает воркер задачей `bulk`,
+    а запрос сразу отвечает 202 с задачей.
+    """
+
+    bulk_serializer_class = None
+
+    @action(
+        detail=False,
+        methods=["post"],
+        parser_classes=[ORJSONParser if settings.CATALOG_ORJSON else JSONParser, NDJSONParser],
+    )
+    def bulk(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({"non_field_errors": ["Ожидается список объектов."]})
+        if len(items) > settings.CATALOG_BULK_MAX_ITEMS:
+            raise ValidationError(
+                {"non_field_errors": [f"За один запрос можно передать не больше {settings.CATALOG_BULK_MAX_ITEMS}."]}
+            )
+        if prefers_background(request):
+            return get_job_response(enqueue("bulk", {"model": self.model._meta.model_name, "items": items}))
+        serializer = self.bulk_serializer_class(data=items, many=True, context=self.get_serializer_context())
+        result = get_bulk_result(serializer.save_items())
+        return Response(
+            result,
+            status=status.HTTP_400_BAD_REQUEST
+            if result["results"] and result["errors"] == len(result["results"])
+            else status.HTTP_200_OK,
+        )
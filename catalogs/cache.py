@@ -0,0 +1,244 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from catalogs.compression import get_accepted_encoding, get_encoded_contents, set_encoding
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.routers import reads_from_replica
+from catalogs.signals import catalog_changed, get_affected_parents
+
+KEY_PREFIX = "catalog"
+METRICS = ("hit", "miss", "invalidation")
+# Время последнего сброса тегов, то есть последней записи в каталог
+WRITTEN_KEY = f"{KEY_PREFIX}:written_at"
+# Счётчик сбросов тегов: ответ сохраняется, только если за время его построения каталог не менялся
+GENERATION_KEY = f"{KEY_PREFIX}:generation"
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def get_tag_key(tag):
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+def get_tag_versions(tags):
+    """
+    Текущие версии тегов. Тег, которого нет в кэше, инициализируется новой версией.
+    """
+    cache = get_cache()
+    keys = {get_tag_key(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, time.time_ns(), timeout=None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_tags(tags):
+    """
+    Меняет версии тегов, после чего все записи кэша, зависящие от них, считаются устаревшими.
+    """
+    if not tags:
+        return
+    cache = get_cache()
+    for key in [get_tag_key(tag) for tag in tags] + [GENERATION_KEY]:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+    cache.set(WRITTEN_KEY, time.time(), timeout=None)
+    increment_metric("invalidation", len(tags))
+
+
+def get_generation():
+    return get_cache().get(GENERATION_KEY)
+
+
+def is_recently_written():
+    """
+    Каталог менялся в последние POSTGRES_REPLICA_PIN_SECONDS секунд, и реплики могут отставать.
+    """
+    return time.time() - get_cache().get(WRITTEN_KEY, 0) < settings.POSTGRES_REPLICA_PIN_SECONDS
+
+
+def get_metric_key(name):
+    return f"{KEY_PREFIX}:metrics:{name}"
+
+
+def increment_metric(name, delta=1):
+    cache = get_cache()
+    key = get_metric_key(name)
+    if not cache.add(key, delta, timeout=None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, timeout=None)
+
+
+def get_metric_values(names):
+    keys = {get_metric_key(name): name for name in names}
+    values = get_cache().get_many(keys)
+    return {name: values.get(key, 0) for key, name in keys.items()}
+
+
+def get_cache_metrics():
+    """
+    Счётчики попаданий, промахов и инвалидаций кэша ответов.
+    """
+    return get_metric_values(METRICS)
+
+
+def get_invalidation_tags(sender, instances, deleted):
+    """
+    Теги записей кэша, которые устаревают при изменении instances.
+
+    Кроме самих объектов устаревают альбомы и исполнители, в которые они вложены,
+    а при изменении исполнителя - его альбомы, так как в них выводится исполнитель.
+    Тег коллекции (`artist:*`) меняется только при изменении записей самой модели.
+    """
+    tags = set()
+    album_ids, artist_ids = get_affected_parents(sender, instances)
+    if sender is Artist:
+        ids = [instance.pk for instance in instances]
+        artist_ids |= set(ids)
+        if not deleted:
+            album_ids |= set(Album.objects.filter(artist_id__in=ids).values_list("pk", flat=True))
+        tags.add("artist:*")
+    elif sender is Album:
+        album_ids |= {instance.pk for instance in instances}
+        tags.add("album:*")
+    elif sender is Song:
+        tags |= {f"song:{instance.pk}" for instance in instances}
+        tags.add("song:*")
+    tags |= {f"album:{pk}" for pk in album_ids}
+    tags |= {f"artist:{pk}" for pk in artist_ids}
+    return tags
+
+
+@receiver(catalog_changed)
+def invalidate_cache(sender, instances, deleted, **kwargs):
+    if sender not in (Artist, Album, AlbumSong, Song):
+        return
+    tags = get_invalidation_tags(sender, instances, deleted)
+    # Сбрасываем сразу и ещё раз после коммита: между ними читатели могли сохранить в кэш старые данные
+    bump_tags(tags)
+    transaction.on_commit(lambda: bump_tags(tags))
+
+
+class CacheResponseMixin:
+    """
+    Кэш ответов action LIST и RETRIEVE.
+
+    Ключ строится из пути, отсортированных параметров запроса и формата ответа. Запись
+    хранит готовое тело ответа и версии тегов объектов, попавших в ответ; при изменении
+    любого из них (см. invalidate_cache) запись перестаёт считаться действительной.
+    Поколение каталога (GENERATION_KEY) запоминается до построения ответа: если за это время
+    какая-то запись сбросила теги, ответ мог быть прочитан до её коммита и не сохраняется.
+    Тело хранится и сжатым (catalogs.compression), поэтому попадание в кэш не сжимает ответ заново.
+    """
+
+    cache_tag = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(super().aretrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request):
+        params = sorted((key, value) for key, values in request.query_params.lists() for value in values if value)
+        raw = f"{request.path}?{params}&format={request.accepted_renderer.format}"
+        return f"{KEY_PREFIX}:response:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    def get_cache_tags(self, response):
+        # Ответ из готовых документов (catalogs.snapshots) знает id записей без декодирования тела
+        ids = getattr(response, "object_ids", None)
+        if ids is None:
+            data = response.data
+            ids = [item["id"] for item in (data["results"] if "results" in data else [data])]
+        return {f"{self.cache_tag}:*"} | {f"{self.cache_tag}:{pk}" for pk in ids}
+
+    def is_cacheable(self, request):
+        return settings.CATALOG_CACHE_ENABLED and request.accepted_renderer.format == "json"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        response = self.get_cached_response(request, key)
+        if response is not None:
+            return response
+        generation = get_generation()
+        return self.store_response(handler(request, *args, **kwargs), key, generation)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return await handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        # Кэш Django синхронный (его async-методы - те же вызовы в потоке),
+        # поэтому чтение записи с проверкой тегов выполняется одним переходом в поток
+        response = await sync_to_async(self.get_cached_response)(request, key)
+        if response is not None:
+            return response
+        generation = await sync_to_async(get_generation)()
+        response = await handler(request, *args, **kwargs)
+        return await sync_to_async(self.store_response)(response, key, generation)
+
+    def get_cached_response(self, request, key):
+        entry = get_cache().get(key)
+        if entry is not None and get_tag_versions(entry["tags"]) == entry["tags"]:
+            increment_metric("hit")
+            encoding = get_accepted_encoding(request)
+            encoded = entry.get("encoded", {})
+            response = HttpResponse(encoded.get(encoding, entry["content"]), content_type=entry["content_type"])
+            if entry.get("etag"):
+                response["ETag"] = entry["etag"]
+            if encoding in encoded:
+                set_encoding(response, encoding)
+            response["X-Cache"] = "HIT"
+            return response
+        increment_metric("miss")
+        return None
+
+    def store_response(self, response, key, generation):
+        """
+        Сохраняет ответ в кэш после рендеринга вместе с текущими версиями его тегов.
+
+        Версии тегов читаются уже после запросов к БД, поэтому ответ сохраняется, только если
+        поколение не изменилось с момента до построения ответа (generation): иначе запись,
+        закоммиченная между чтением данных и чтением версий, оставила бы в кэше старое тело
+        под новыми версиями. Ответ, прочитанный с реплики вскоре после записи, тоже не
+        сохраняется: версии тегов уже новые, а реплика могла ещё не получить изменения.
+        """
+        if response.status_code == 200 and not (reads_from_replica() and is_recently_written()):
+            versions = get_tag_versions(self.get_cache_tags(response))
+
+            def store(rendered):
+                if get_generation() != generation:
+                    return
+                entry = {
+                    "content": rendered.content,
+                    "encoded": get_encoded_contents(rendered.content),
+                    "content_type": rendered["Content-Type"],
+                    "etag": rendered.get("ETag"),
+                    "tags": versions,
+                }
+                get_cache().set(key, entry, timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+            response.add_post_render_callback(store)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,166 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from catalogs.models import Album, AlbumSong, Artist, ChangeEvent, Song
+from catalogs.signals import catalog_changed, get_affected_parents
+
+MODEL_NAMES = {
+    Artist: ChangeEvent.ARTIST,
+    Album: ChangeEvent.ALBUM,
+    Song: ChangeEvent.SONG,
+}
+# id текущей транзакции (xid8 с эпохой, поэтому не повторяется) и граница ленты: транзакции
+# с меньшими id завершены, и новых событий с такими id уже не появится
+CURRENT_TRANSACTION = "pg_current_xact_id()::text::bigint"
+HORIZON = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+INSERT = f"""
+    INSERT INTO {{event}} (transaction_id, model, object_id, deleted, created_at)
+    SELECT {CURRENT_TRANSACTION}, *, now() FROM unnest(%(models)s::text[], %(ids)s::bigint[], %(deleted)s::boolean[])
+"""
+# Записи, изменённые загрузкой каталога (catalogs.transfer), по её временным таблицам changed_*
+INSERT_MERGED = f"""
+    INSERT INTO {{event}} (transaction_id, model, object_id, deleted, created_at)
+    SELECT {CURRENT_TRANSACTION}, model, id, false, now() FROM (
+        SELECT 'artist' AS model, id FROM changed_artist
+        UNION SELECT 'artist', artist_id FROM {{album}} WHERE id IN (SELECT id FROM changed_album)
+        UNION SELECT 'album', id FROM changed_album
+        UNION SELECT 'song', id FROM changed_song
+    ) changed
+"""
+SINCE_ERROR = "Передайте sequence последнего полученного события или 0."
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = (
+        "События после этой позиции уже удалены из журнала, прочитайте каталог заново и начните с since=0."
+    )
+    default_code = "cursor_expired"
+
+
+def get_change_events(sender, instances, deleted):
+    """
+    События {(model, id): deleted} для изменения instances.
+
+    Кроме самих записей изменёнными считаются альбомы и исполнители, в представление
+    которых они вложены, как при сбросе кэша: потребителю ленты не нужно самому искать,
+    какие страницы перечитать. Треки отдельных событий не дают - они часть альбома.
+    """
+    album_ids, artist_ids = get_affected_parents(sender, instances)
+    if sender is Artist and not deleted:
+        album_ids |= set(Album.objects.filter(artist__in=instances).values_list("pk", flat=True))
+    events = {(ChangeEvent.ALBUM, pk): False for pk in album_ids}
+    events |= {(ChangeEvent.ARTIST, pk): False for pk in artist_ids}
+    if sender in MODEL_NAMES:
+        events |= {(MODEL_NAMES[sender], instance.pk): deleted for instance in instances}
+    return events
+
+
+def record_events(events):
+    if not events:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            INSERT.format(event=ChangeEvent._meta.db_table),
+            {
+                "models": [model for model, _ in events],
+                "ids": [pk for _, pk in events],
+                "deleted": list(events.values()),
+            },
+        )
+
+
+def record_merged_changes():
+    """
+    Записывает события загрузки каталога, которая меняет таблицы в обход catalog_changed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(INSERT_MERGED.format(event=ChangeEvent._meta.db_table, album=Album._meta.db_table))
+
+
+@receiver(catalog_changed)
+def record_changes(sender, instances, deleted, **kwargs):
+    if sender in (Artist, Album, AlbumSong, Song):
+        record_events(get_change_events(sender, instances, deleted))
+
+
+def parse_sequence(value):
+    """
+    Позиция (transaction_id, id) из параметра `since`; `0` - начало журнала.
+    """
+    if value in (None, "", "0"):
+        return 0, 0
+    transaction_id, _, pk = value.partition(".")
+    try:
+        return int(transaction_id), int(pk)
+    except ValueError:
+        raise ValidationError({"since": [SINCE_ERROR]}) from None
+
+
+def get_limit(value):
+    if value in (None, ""):
+        return settings.CATALOG_CHANGES_MAX_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= settings.CATALOG_CHANGES_MAX_LIMIT:
+        raise ValidationError({"limit": [f"Допустимые значения: от 1 до {settings.CATALOG_CHANGES_MAX_LIMIT}."]})
+    return limit
+
+
+def get_changes_queryset(since):
+    """
+    События после позиции since в порядке ленты, только из завершённых транзакций.
+
+    id событий выдаются при вставке, а видны после коммита, который у параллельных
+    транзакций может случиться в другом порядке. Поэтому лента упорядочена по id
+    транзакции и обрывается на самой старой незавершённой: всё, что до неё, уже не изменится.
+    """
+    transaction_id, pk = since
+    return (
+        ChangeEvent.objects.filter(transaction_id__lt=RawSQL(HORIZON, []))
+        .filter(Q(transaction_id__gt=transaction_id) | Q(transaction_id=transaction_id, id__gt=pk))
+        .order_by("transaction_id", "id")
+    )
+
+
+def check_sequence(since):
+    """
+    Отклоняет позицию, события после которой удалены purge_changes: журнал хранит
+    непрерывный хвост ленты, и позиция раньше самого старого события означает пропуск.
+    """
+    if since == (0, 0):
+        return
+    oldest = ChangeEvent.objects.order_by("transaction_id", "id").values_list("transaction_id", "id").first()
+    if oldest is not None and since < oldest:
+        raise CursorExpired()
+
+
+def purge_changes():
+    """
+    Удаляет события ленты до последнего события старше CATALOG_CHANGES_RETENTION_DAYS,
+    чтобы журнал оставался непрерывным хвостом ленты. Само это событие остаётся: позиция
+    на нём - конец прочитанного клиентом журнала, и check_sequence её не отклоняет.
+    """
+    expired = timezone.now() - datetime.timedelta(days=settings.CATALOG_CHANGES_RETENTION_DAYS)
+    boundary = (
+        ChangeEvent.objects.filter(created_at__lt=expired)
+        .order_by("-transaction_id", "-id")
+        .values_list("transaction_id", "id")
+        .first()
+    )
+    if boundary is None:
+        return
+    transaction_id, pk = boundary
+    ChangeEvent.objects.filter(
+        Q(transaction_id__lt=transaction_id) | Q(transaction_id=transaction_id, id__lt=pk)
+    ).delete()
@@ -0,0 +1,160 @@
+import gzip
+import zlib
+
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from catalogs.conditional import encode_etag
+
+# Типы содержимого, которые имеет смысл сжимать: JSON, NDJSON выгрузки, схема, HTML браузерного API
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/vnd.oai.openapi", "text/")
+
+
+def compress_brotli(content):
+    return brotli.compress(content, quality=settings.CATALOG_BROTLI_QUALITY)
+
+
+def compress_gzip(content):
+    return gzip.compress(content, compresslevel=settings.CATALOG_GZIP_LEVEL, mtime=0)
+
+
+def get_stream_compressor(encoding):
+    """
+    Функции сжатия очередной порции потока и завершения потока.
+
+    Каждая порция сбрасывается сразу (flush у brotli, Z_SYNC_FLUSH у gzip), чтобы клиент
+    получал выгрузку по мере чтения из БД, а не после заполнения окна компрессора.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.CATALOG_BROTLI_QUALITY)
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+    # wbits 31 - формат gzip
+    compressor = zlib.compressobj(settings.CATALOG_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+def stream(chunks, encoding):
+    process, finish = get_stream_compressor(encoding)
+    for chunk in chunks:
+        yield process(chunk)
+    yield finish()
+
+
+async def astream(chunks, encoding):
+    process, finish = get_stream_compressor(encoding)
+    async for chunk in chunks:
+        yield process(chunk)
+    yield finish()
+
+
+# Кодировки в порядке предпочтения сервера: brotli сжимает JSON каталога сильнее gzip при той же скорости
+ENCODINGS = {
+    "br": compress_brotli,
+    "gzip": compress_gzip,
+}
+
+
+def get_accepted_encoding(request):
+    """
+    Кодировка ответа по заголовку Accept-Encoding или None, если сжимать не нужно.
+
+    Из кодировок с наибольшим q выбирается первая по ENCODINGS; `*` относится
+    ко всем кодировкам, которые не перечислены явно, `q=0` запрещает кодировку.
+    """
+    if not settings.CATALOG_COMPRESSION:
+        return None
+    weights = {}
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = item.partition(";")
+        name, weight = name.strip().lower(), 1.0
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        if name:
+            weights[name] = weight
+    default = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, default)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def is_compressible(response):
+    content_type = response.get("Content-Type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and "no-transform" not in response.get("Cache-Control", "")
+
+
+def compress(content, encoding):
+    return ENCODINGS[encoding](content)
+
+
+def get_encoded_contents(content):
+    """
+    Тело ответа во всех кодировках для записи кэша; ответы меньше порога не сжимаются.
+    """
+    if not settings.CATALOG_COMPRESSION or len(content) < settings.CATALOG_COMPRESSION_MIN_SIZE:
+        return {}
+    return {encoding: compress(content, encoding) for encoding in ENCODINGS}
+
+
+def set_encoding(response, encoding):
+    """
+    Отмечает тело ответа как сжатое. К ETag добавляется суффикс кодировки (encode_etag):
+    сжатое тело - другое представление, и строгий ETag у него свой.
+    """
+    response["Content-Encoding"] = encoding
+    if response.has_header("ETag"):
+        response["ETag"] = encode_etag(response["ETag"], encoding)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов brotli или gzip по заголовку Accept-Encoding.
+
+    Ответы меньше CATALOG_COMPRESSION_MIN_SIZE байт и несжимаемые типы отдаются как есть,
+    потоковые ответы (выгрузка) сжимаются по порциям, и каждая порция сразу уходит клиенту.
+    Ответы кэша (catalogs.cache) приходят уже сжатыми и не сжимаются повторно.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress_response(request, await self.get_response(request))
+
+    def compress_response(self, request, response):
+        if response.has_header("Content-Encoding") or response.status_code != 200 or not is_compressible(response):
+            return response
+        encoding = None
+        if response.streaming or len(response.content) >= settings.CATALOG_COMPRESSION_MIN_SIZE:
+            encoding = get_accepted_encoding(request)
+        if encoding is None:
+            patch_vary_headers(response, ("Accept-Encoding",))
+            return response
+        if not response.streaming:
+            response.content = compress(response.content, encoding)
+            response["Content-Length"] = str(len(response.content))
+        elif response.is_async:
+            response.streaming_content = astream(response.streaming_content, encoding)
+        else:
+            response.streaming_content = stream(response.streaming_content, encoding)
+        return set_encoding(response, encoding)
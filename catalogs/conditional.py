@@ -0,0 +1,131 @@
+import datetime
+import re
+
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.UTC)
+# Суффикс кодировки сжатого представления в ETag: "<id>-<время>-br"
+ENCODING_SUFFIX = re.compile(r'-[a-z]+"$')
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "Запись была изменена другим запросом, получите актуальную версию."
+    default_code = "precondition_failed"
+
+
+def make_etag(pk, updated_at):
+    """
+    Строгий ETag записи: id и время последнего изменения в микросекундах.
+    """
+    return quote_etag(f"{pk}-{(updated_at - EPOCH) // datetime.timedelta(microseconds=1)}")
+
+
+def encode_etag(etag, encoding):
+    """
+    ETag сжатого представления: тела в разных кодировках различаются побайтно,
+    поэтому строгий ETag у каждого свой - с суффиксом кодировки.
+    """
+    return ENCODING_SUFFIX.sub('"', etag)[:-1] + f'-{encoding}"'
+
+
+def match_etag(header, etag, weak=False):
+    """
+    Значение из заголовка If-None-Match или If-Match, совпавшее с ETag записи, или None.
+
+    Суффикс кодировки (encode_etag) при сравнении отбрасывается: условие относится
+    к версии записи, в какой бы кодировке клиент её ни получил.
+    """
+    for value in parse_etags(header):
+        if value == "*":
+            return etag
+        candidate = value.removeprefix("W/") if weak else value
+        if ENCODING_SUFFIX.sub('"', candidate) == etag:
+            return value
+    return None
+
+
+def etag_matches(header, etag, weak=False):
+    return match_etag(header, etag, weak) is not None
+
+
+class ConditionalMixin:
+    """
+    Условные запросы к записи по ETag, построенному из updated_at.
+
+    RETRIEVE с `If-None-Match` отвечает 304 после одного запроса по первичному ключу,
+    без сериализации. UPDATE и PARTIAL_UPDATE с `If-Match` выполняются, только если запись
+    не менялась с момента получения ETag (оптимистичная блокировка), иначе - 412.
+    """
+
+    def get_etag_queryset(self, queryset=None):
+        queryset = self.model.objects.all() if queryset is None else queryset
+        return queryset.filter(pk=self.kwargs["pk"]).values_list("updated_at", flat=True)
+
+    def get_etag(self, queryset=None):
+        updated_at = self.get_etag_queryset(queryset).first()
+        return None if updated_at is None else make_etag(self.kwargs["pk"], updated_at)
+
+    async def aget_etag(self, queryset=None):
+        updated_at = await self.get_etag_queryset(queryset).afirst()
+        return None if updated_at is None else make_etag(self.kwargs["pk"], updated_at)
+
+    def get_object(self):
+        instance = super().get_object()
+        self.etag = make_etag(self.kwargs["pk"], instance.updated_at)
+        return instance
+
+    async def aget_object(self):
+        instance = await super().aget_object()
+        self.etag = make_etag(self.kwargs["pk"], instance.updated_at)
+        return instance
+
+    def retrieve(self, request, *args, **kwargs):
+        self.etag = None
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            self.etag = self.get_etag()
+            matched = None if self.etag is None else match_etag(if_none_match, self.etag, weak=True)
+            if matched is not None:
+                return self.get_not_modified_response(matched)
+        return self.set_etag(super().retrieve(request, *args, **kwargs))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        self.etag = None
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            self.etag = await self.aget_etag()
+            matched = None if self.etag is None else match_etag(if_none_match, self.etag, weak=True)
+            if matched is not None:
+                return self.get_not_modified_response(matched)
+        return self.set_etag(await super().aretrieve(request, *args, **kwargs))
+
+    def get_not_modified_response(self, etag):
+        """
+        304 с ETag представления, которое есть у клиента (в той же кодировке).
+        """
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    def set_etag(self, response):
+        if self.etag is not None and response.status_code == status.HTTP_200_OK and not response.has_header("ETag"):
+            response["ETag"] = self.etag
+        return response
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            if_match = request.headers.get("If-Match")
+            if if_match is not None:
+                etag = self.get_etag(self.model.objects.select_for_update())
+                if etag is not None and not etag_matches(if_match, etag):
+                    raise PreconditionFailed()
+            response = super().update(request, *args, **kwargs)
+        etag = self.get_etag()
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
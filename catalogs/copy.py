@@ -0,0 +1,104 @@
+import csv
+import io
+
+from django.db import connection, transaction
+
+# Размер порции при передаче файла в COPY через psycopg 3
+BUFFER_SIZE = 1024 * 1024
+
+
+def copy_from_file(sql, file, using=connection):
+    """
+    Выполняет COPY ... FROM STDIN, читая данные из file порциями.
+
+    Поддерживает оба драйвера Postgres, с которыми работает Django: psycopg2
+    (copy_expert) и psycopg 3 (cursor.copy).
+    """
+    with using.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):
+            raw.copy_expert(sql, file, size=BUFFER_SIZE)
+        else:
+            with raw.copy(sql) as copy:
+                while data := file.read(BUFFER_SIZE):
+                    copy.write(data)
+        return raw.rowcount
+
+
+def copy_to_file(sql, file, using=connection):
+    """
+    Выполняет COPY ... TO STDOUT и записывает результат в бинарный file по мере получения.
+    """
+    with using.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):
+            raw.copy_expert(sql, file, size=BUFFER_SIZE)
+        else:
+            with raw.copy(sql) as copy:
+                for data in copy:
+                    file.write(bytes(data))
+        return raw.rowcount
+
+
+def copy_rows(table, columns, rows, using=connection):
+    """
+    Записывает строки в таблицу командой COPY ... FROM STDIN в формате CSV.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    quote = using.ops.quote_name
+    sql = f"COPY {quote(table)} ({', '.join(quote(column) for column in columns)}) FROM STDIN WITH (FORMAT csv)"
+    return copy_from_file(sql, buffer, using=using)
+
+
+def reserve_ids(model, count, using=connection):
+    """
+    Резервирует в последовательности первичного ключа непрерывный диапазон из count id.
+
+    Строки с этими id можно записывать через COPY, в том числе из нескольких процессов:
+    последовательность уже сдвинута, и другие вставки эти id не получат.
+    """
+    if not count:
+        return range(0)
+    table = model._meta.db_table
+    with transaction.atomic(using=using.alias), using.cursor() as cursor:
+        # Пока таблица заблокирована, никто не вызовет nextval между двумя запросами
+        cursor.execute(f"LOCK TABLE {using.ops.quote_name(table)} IN EXCLUSIVE MODE")
+        cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, 'id'))", [table])
+        start = cursor.fetchone()[0]
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", [table, start + count - 1])
+    return range(start, start + count)
+
+
+class ProgressFile:
+    """
+    Обёртка файла для COPY, которая сообщает callback о каждых step переданных байтах.
+    """
+
+    def __init__(self, file, callback, step=64 * 1024 * 1024):
+        self.file = file
+        self.callback = callback
+        self.step = step
+        self.total = 0
+        self.reported = 0
+
+    def advance(self, size):
+        self.total += size
+        if self.total - self.reported >= self.step:
+            self.reported = self.total
+            self.callback(self.total)
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.advance(len(data))
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.advance(len(data))
+        return data
+
+    def write(self, data):
+        self.file.write(data)
+        self.advance(len(data))
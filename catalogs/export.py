@@ -0,0 +1,100 @@
+import datetime
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.decorators import action
+
+from catalogs.fast import get_encoder, get_selected_encoder
+from catalogs.fieldsets import get_field_selection, select_fields
+from catalogs.prefetch import build_queryset
+from catalogs.renderers import get_json_renderer
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+def get_ndjson_encoder(serializer_class, selection=None):
+    renderer = get_json_renderer()
+    if settings.CATALOG_FAST_SERIALIZERS:
+        encode = (
+            get_encoder(serializer_class) if selection is None else get_selected_encoder(serializer_class, selection)
+        )
+    else:
+        serializer = serializer_class() if selection is None else select_fields(serializer_class(), selection)
+
+        def encode(instance):
+            return serializer.to_representation(instance)
+
+    return lambda instance: renderer.render(encode(instance)) + b"\n"
+
+
+def iter_ndjson(queryset, serializer_class, chunk_size, selection=None):
+    """
+    Построчно сериализует queryset в NDJSON.
+
+    Записи читаются серверным курсором порциями по chunk_size, prefetch_related
+    выполняется отдельно для каждой порции, поэтому память не зависит от размера каталога.
+    """
+    encode = get_ndjson_encoder(serializer_class, selection)
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield encode(instance)
+
+
+async def aiter_ndjson(queryset, serializer_class, chunk_size, selection=None):
+    """
+    Асинхронный вариант iter_ndjson для ASGI: поток отдаётся без буферизации всего тела.
+    """
+    encode = get_ndjson_encoder(serializer_class, selection)
+    async for instance in queryset.aiterator(chunk_size=chunk_size):
+        yield encode(instance)
+
+
+class ExportMixin:
+    """
+    Action `export` - потоковая выгрузка всех записей в формате NDJSON.
+
+    Поддерживает инкрементальную выгрузку: при заголовке `If-Modified-Since` выгружаются
+    только записи, изменённые после указанной даты, а `Last-Modified` ответа можно
+    передать в следующий запрос. Параметры fields, expand и depth обрезают записи так же,
+    как в LIST (catalogs.fieldsets).
+    """
+
+    export_serializer_class = None
+
+    @action(detail=False, methods=["get"])
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.model.objects.order_by("id"))
+        last_modified = queryset.aggregate(last_modified=Max("updated_at"))["last_modified"]
+        return self.get_export_response(queryset, last_modified, iter_ndjson)
+
+    async def aexport(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.model.objects.order_by("id"))
+        last_modified = (await queryset.aaggregate(last_modified=Max("updated_at")))["last_modified"]
+        return self.get_export_response(queryset, last_modified, aiter_ndjson)
+
+    def get_export_response(self, queryset, last_modified, stream):
+        serializer_class = self.export_serializer_class
+        # Выбор полей проверяется до начала потока: ошибку в середине потока клиенту уже не вернуть
+        selection = get_field_selection(self.request.query_params)
+        serializer = serializer_class() if selection is None else select_fields(serializer_class(), selection)
+        since = parse_http_date_safe(self.request.headers.get("If-Modified-Since", ""))
+        if since is not None:
+            # Last-Modified округляется до секунд, поэтому граничные записи могут прийти повторно
+            since = datetime.datetime.fromtimestamp(since, tz=datetime.UTC)
+            if last_modified is None or last_modified <= since:
+                return HttpResponseNotModified()
+            queryset = queryset.filter(updated_at__gt=since)
+        chunk_size = settings.CATALOG_EXPORT_CHUNK_SIZE
+        # Поток читается уже после выхода из представления, поэтому БД запроса (реплика)
+        # фиксируется заранее; prefetch_related читает из той же БД, что и основные записи
+        queryset = build_queryset(serializer, queryset=queryset.using(queryset.db))
+        response = StreamingHttpResponse(
+            stream(queryset, serializer_class, chunk_size, selection),
+            content_type=NDJSON_CONTENT_TYPE,
+        )
+        # nginx передаёт поток клиенту по мере чтения, не накапливая его во временном файле
+        response["X-Accel-Buffering"] = "no"
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
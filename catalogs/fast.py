@@ -0,0 +1,94 @@
+import functools
+
+from rest_framework import fields
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from catalogs.fieldsets import select_fields
+
+# Поля, у которых to_representation не меняет значение, уже приведённое моделью к нужному типу
+PASSTHROUGH_FIELDS = (
+    fields.BooleanField,
+    fields.CharField,
+    fields.IntegerField,
+)
+
+
+@functools.cache
+def get_encoder(serializer_class):
+    """
+    Возвращает скомпилированную функцию obj -> dict с тем же результатом, что и
+    serializer_class(obj).data, но без обхода полей DRF на каждый объект.
+    """
+    return compile_encoder(serializer_class())
+
+
+@functools.lru_cache(maxsize=256)
+def get_selected_encoder(serializer_class, selection):
+    """
+    Кодировщик serializer_class, обрезанного по выбору полей запроса (catalogs.fieldsets).
+    Выбор задаёт клиент, поэтому кэш ограничен.
+    """
+    return compile_encoder(select_fields(serializer_class(), selection))
+
+
+def compile_encoder(serializer):
+    """
+    Генерирует исходный код функции вида
+    `def encode(obj): return {"id": obj.id, "albums": [encode_1(item) for item in obj.albums.all()]}`.
+
+    Простые поля читаются атрибутом напрямую, вложенные сериализаторы компилируются
+    рекурсивно, остальные поля вызывают свой to_representation.
+    """
+    namespace = {}
+    items = []
+    for index, (name, field) in enumerate(serializer.fields.items()):
+        if field.write_only:
+            continue
+        source = field.source
+        simple_source = source.isidentifier()
+        if isinstance(field, ListSerializer) and simple_source:
+            namespace[f"encode_{index}"] = compile_encoder(field.child)
+            value = f"[encode_{index}(item) for item in obj.{source}.all()]"
+        elif isinstance(field, BaseSerializer) and simple_source:
+            namespace[f"encode_{index}"] = compile_encoder(field)
+            value = f"None if obj.{source} is None else encode_{index}(obj.{source})"
+        elif isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None and simple_source:
+            value = f"obj.{source}_id"
+        elif type(field) in PASSTHROUGH_FIELDS and simple_source:
+            value = f"obj.{source}"
+        else:
+            namespace[f"field_{index}"] = field
+            value = f"_represent(field_{index}, obj)"
+        items.append(f"{name!r}: {value}")
+    namespace["_represent"] = _represent
+    code = "def encode(obj):\n    return {" + ", ".join(items) + "}\n"
+    exec(compile(code, f"<encoder {type(serializer).__name__}>", "exec"), namespace)
+    return namespace["encode"]
+
+
+def _represent(field, obj):
+    attribute = field.get_attribute(obj)
+    return None if attribute is None else field.to_representation(attribute)
+
+
+class FastSerializer:
+    """
+    Замена сериализатора для чтения: отдаёт `.data` через скомпилированный кодировщик.
+    """
+
+    def __init__(self, serializer_class, instance, many=False, selection=None):
+        self.serializer_class = serializer_class
+        self.instance = instance
+        self.many = many
+        self.selection = selection
+
+    @property
+    def data(self):
+        if self.selection is None:
+            encode = get_encoder(self.serializer_class)
+        else:
+            encode = get_selected_encoder(self.serializer_class, self.selection)
+        if self.many:
+            return [encode(obj) for obj in self.instance]
+        return encode(self.instance)
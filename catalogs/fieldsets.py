@@ -0,0 +1,116 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+# Значение fields, которое выбирает краткий сериализатор представления, а не список полей
+SUMMARY = "summary"
+
+
+def parse_paths(value, param):
+    """
+    Разбирает список путей через запятую (`id,albums.title`) в кортежи имён.
+    """
+    paths = []
+    for item in value.split(","):
+        path = tuple(name.strip() for name in item.split("."))
+        if not all(path):
+            raise ValidationError({param: [f"Некорректный путь «{item.strip()}»."]})
+        paths.append(path)
+    return paths
+
+
+def freeze_tree(paths):
+    """
+    Дерево путей в виде вложенных отсортированных кортежей: ((имя, поддерево), ...).
+    Пустое поддерево - все поля вложенного сериализатора.
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        for name in path:
+            node = node.setdefault(name, {})
+
+    def freeze(node):
+        return tuple(sorted((name, freeze(child)) for name, child in node.items()))
+
+    return freeze(tree)
+
+
+def get_field_selection(query_params, summary=False):
+    """
+    Выбор полей из параметров запроса: (fields, expand, depth) или None без параметров.
+
+    fields - дерево запрошенных путей или None (все поля), expand - дерево путей связей,
+    раскрываемых независимо от depth, depth - глубина вложенных объектов или None (без
+    ограничения). Значение хешируемое: по нему кэшируются скомпилированные кодировщики.
+    summary - fields=summary уже выбрал краткий сериализатор и не является списком полей.
+    """
+    fields = query_params.get("fields") or None
+    expand = query_params.get("expand") or None
+    depth = query_params.get("depth") or None
+    if summary and fields == SUMMARY:
+        fields = None
+    if fields is None and expand is None and depth is None:
+        return None
+    if depth is not None:
+        if not depth.isdigit():
+            raise ValidationError({"depth": ["Ожидается целое неотрицательное число."]})
+        depth = int(depth)
+    return (
+        None if fields is None else freeze_tree(parse_paths(fields, "fields")),
+        () if expand is None else freeze_tree(parse_paths(expand, "expand")),
+        depth,
+    )
+
+
+def select_fields(serializer, selection):
+    """
+    Обрезает дерево полей сериализатора по выбору get_field_selection и возвращает его.
+
+    Поля вне fields и expand удаляются, `id` верхнего уровня остаётся всегда: по нему строятся
+    теги кэша. Вложенные сериализаторы глубже depth, не указанные в fields или expand, убираются:
+    связь с одним объектом заменяется его первичным ключом, список - удаляется. Так
+    prefetch.build_queryset по обрезанному сериализатору не загружает ненужные связи.
+    """
+    fields, expand, depth = selection
+    if fields is not None and "id" in serializer.fields:
+        fields = dict(fields)
+        fields.setdefault("id", ())
+    errors = []
+    prune(serializer, None if fields is None else dict(fields), dict(expand), depth, (), errors)
+    if errors:
+        raise ValidationError({"fields": errors})
+    return serializer
+
+
+def prune(serializer, fields, expand, depth, path, errors):
+    readable = {name: field for name, field in serializer.fields.items() if not field.write_only}
+    nested = {
+        name: (field.child if isinstance(field, ListSerializer) else field)
+        for name, field in readable.items()
+        if isinstance(field, BaseSerializer)
+    }
+    for name, children in (fields or {}).items():
+        if name not in readable:
+            errors.append(f"Неизвестное поле «{'.'.join((*path, name))}».")
+        elif name not in nested and children:
+            errors.append(f"Поле «{'.'.join((*path, name))}» не содержит вложенных полей.")
+    for name in expand:
+        if name not in nested:
+            errors.append(f"Поле «{'.'.join((*path, name))}» не является связью.")
+    for name, field in readable.items():
+        requested = (fields is not None and name in fields) or name in expand
+        if fields is not None and not requested:
+            del serializer.fields[name]
+            continue
+        if name not in nested:
+            continue
+        if depth is None or depth > 0 or requested:
+            children = dict(fields[name]) if fields is not None and fields.get(name) else None
+            child_depth = None if depth is None else max(depth - 1, 0)
+            prune(nested[name], children, dict(expand.get(name, ())), child_depth, (*path, name), errors)
+        elif isinstance(field, ListSerializer):
+            del serializer.fields[name]
+        else:
+            source = {} if field.source == name else {"source": field.source}
+            serializer.fields[name] = PrimaryKeyRelatedField(read_only=True, **source)
@@ -0,0 +1,53 @@
+from django.db.models.functions import Upper
+from django_filters import CharFilter, FilterSet
+from django_filters.constants import EMPTY_VALUES
+
+from catalogs.models import Album, Artist, Job, Song
+
+TEXT_LOOKUPS = ["exact", "icontains", "istartswith"]
+
+
+class TrigramSimilarFilter(CharFilter):
+    """
+    Нечёткий поиск по сходству триграмм (оператор `%` из pg_trgm).
+
+    Сравнивается UPPER(поля), как в lookup icontains и istartswith, поэтому все три
+    используют один GIN-индекс из Meta.indexes модели. Сходство триграмм не зависит
+    от регистра, так что результат тот же, что и по исходному полю.
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        alias = f"{self.field_name}_upper"
+        return qs.alias(**{alias: Upper(self.field_name)}).filter(**{f"{alias}__trigram_similar": value})
+
+
+class ArtistFilter(FilterSet):
+    name__similar = TrigramSimilarFilter(field_name="name")
+
+    class Meta:
+        model = Artist
+        fields = {"name": TEXT_LOOKUPS}
+
+
+class SongFilter(FilterSet):
+    title__similar = TrigramSimilarFilter(field_name="title")
+
+    class Meta:
+        model = Song
+        fields = {"title": TEXT_LOOKUPS}
+
+
+class AlbumFilter(FilterSet):
+    title__similar = TrigramSimilarFilter(field_name="title")
+
+    class Meta:
+        model = Album
+        fields = {"title": TEXT_LOOKUPS, "release_year": ["exact"], "artist": ["exact"]}
+
+
+class JobFilter(FilterSet):
+    class Meta:
+        model = Job
+        fields = {"status": ["exact"], "kind": ["exact"]}
@@ -0,0 +1,248 @@
+import datetime
+import logging
+import signal
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from catalogs.changes import purge_changes
+from catalogs.models import Job
+from catalogs.serializers import JobSerializer
+
+logger = logging.getLogger(__name__)
+
+# Зарегистрированные обработчики задач: тип задачи -> функция payload -> результат (JSON)
+TASKS = {}
+# Как часто простаивающий воркер удаляет завершённые задачи старше CATALOG_JOBS_RETENTION_DAYS
+# и события журнала изменений старше CATALOG_CHANGES_RETENTION_DAYS, секунды
+PURGE_INTERVAL = 3600
+
+
+def task(kind):
+    """
+    Регистрирует обработчик задач типа kind. Обработчик выполняется в транзакции вместе
+    с отметкой о завершении задачи, поэтому его изменения и статус коммитятся вместе.
+    """
+
+    def register(handler):
+        TASKS[kind] = handler
+        return handler
+
+    return register
+
+
+def enqueue(kind, payload):
+    """
+    Ставит задачу в очередь. Внутри транзакции задача станет видна воркеру только после
+    её коммита, а при откате исчезнет вместе с остальными изменениями.
+    """
+    if kind not in TASKS:
+        raise LookupError(f"Неизвестный тип задачи {kind}")
+    return Job.objects.create(kind=kind, payload=payload)
+
+
+def claim_job():
+    """
+    Забирает первую задачу из очереди и отмечает её запущенной, или возвращает None.
+
+    Строки, заблокированные другими воркерами, пропускаются (SKIP LOCKED), поэтому воркеры
+    не ждут друг друга и не получают одну задачу дважды. Выполняемую задачу воркер держит
+    заблокированной до конца (run_job), поэтому незаблокированная задача в статусе running
+    потеряна - её воркер остановлен посреди выполнения - и запускается снова, пока не исчерпает
+    CATALOG_JOBS_MAX_ATTEMPTS. CATALOG_JOBS_TIMEOUT - только пауза между отметкой о запуске
+    и блокировкой в run_job, в которую задачу ещё нельзя считать потерянной.
+    """
+    while True:
+        now = timezone.now()
+        lost = now - datetime.timedelta(seconds=settings.CATALOG_JOBS_TIMEOUT)
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(Q(status=Job.QUEUED) | Q(status=Job.RUNNING, started_at__lt=lost))
+                .order_by("id")
+                .first()
+            )
+            if job is None:
+                return None
+            if job.attempts >= settings.CATALOG_JOBS_MAX_ATTEMPTS:
+                finish_job(job, Job.FAILED, {"non_field_errors": ["Превышено количество запусков задачи."]})
+                continue
+            job.status = Job.RUNNING
+            job.attempts += 1
+            job.started_at = now
+            job.save(update_fields=["status", "attempts", "started_at"])
+            return job
+
+
+def finish_job(job, status, result):
+    job.status = status
+    job.result = result
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "result", "finished_at"])
+
+
+def get_error_result(exc):
+    """
+    Результат задачи, завершённой ошибкой API: ошибки проверки - как тело ответа 400,
+    остальные (например, 412 при изменённой записи) - с кодом ответа, который вернул бы запрос.
+    """
+    if isinstance(exc, ValidationError):
+        return exc.detail
+    return {"detail": str(exc.detail), "status_code": exc.status_code}
+
+
+def run_job(job):
+    try:
+        with transaction.atomic():
+            # Блокировка строки задачи держится до коммита результата: пока воркер жив, claim_job
+            # её пропускает. Если задачу уже забрал другой воркер (attempts изменился), она не выполняется
+            claimed = Job.objects.select_for_update(skip_locked=True).filter(
+                pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+            )
+            if claimed.values_list("pk", flat=True).first() is None:
+                return
+            result = TASKS[job.kind](job.payload)
+            finish_job(job, Job.DONE, result)
+    except APIException as exc:
+        finish_job(job, Job.FAILED, get_error_result(exc))
+    except Exception as exc:
+        logger.exception("Задача %s завершилась ошибкой", job)
+        finish_job(job, Job.FAILED, {"non_field_errors": [traceback.format_exception_only(exc)[-1].strip()]})
+
+
+def purge_jobs():
+    finished = timezone.now() - datetime.timedelta(days=settings.CATALOG_JOBS_RETENTION_DAYS)
+    Job.objects.filter(status__in=(Job.DONE, Job.FAILED), finished_at__lt=finished).delete()
+
+
+def run_pending_jobs(stop=None):
+    """
+    Выполняет задачи, пока очередь не опустеет (или не установлен stop), и возвращает их количество.
+    """
+    count = 0
+    while stop is None or not stop.is_set():
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def work(stop, once=False, poll_interval=None):
+    """
+    Цикл потока воркера: выполняет задачи, пока не установлен stop. С once завершается,
+    когда очередь пуста. Ошибки БД (например, таблица ещё не создана миграциями)
+    не останавливают воркер: он повторяет попытку после паузы.
+    """
+    poll_interval = settings.CATALOG_JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+    purged_at = None
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                run_pending_jobs(stop)
+                if once:
+                    return
+                if purged_at is None or timezone.now() - purged_at > datetime.timedelta(seconds=PURGE_INTERVAL):
+                    purge_jobs()
+                    purge_changes()
+                    purged_at = timezone.now()
+            except Exception:
+                if once:
+                    raise
+                logger.exception("Ошибка воркера фоновых задач")
+            stop.wait(poll_interval)
+    finally:
+        connection.close()
+
+
+def run_worker(concurrency=None, once=False, poll_interval=None):
+    """
+    Запускает concurrency потоков воркера и ждёт их завершения. SIGTERM и SIGINT
+    останавливают воркер после текущих задач. Один поток работает в вызывающем потоке.
+    """
+    concurrency = concurrency or settings.CATALOG_JOBS_CONCURRENCY
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stop.set())
+    if concurrency == 1:
+        work(stop, once, poll_interval)
+        return
+    threads = [
+        threading.Thread(target=work, args=(stop, once, poll_interval), name=f"catalog-worker-{index}")
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def prefers_background(request):
+    """
+    Клиент просит выполнить запрос в фоне заголовком `Prefer: respond-async` (RFC 7240).
+    """
+    preferences = request.headers.get("Prefer", "")
+    return "respond-async" in (token.split(";")[0].strip().lower() for token in preferences.split(","))
+
+
+def get_request_payload(request):
+    # Параметры задачи хранятся в JSON, форма приводится к словарю последних значений
+    return request.data.dict() if hasattr(request.data, "dict") else request.data
+
+
+def get_job_response(job):
+    """
+    Ответ 202 с задачей и адресом её статуса в заголовке Location.
+    """
+    return Response(
+        JobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={"Location": reverse("job-detail", args=[job.pk])},
+    )
+
+
+class BackgroundWriteMixin:
+    """
+    CREATE, UPDATE и PARTIAL_UPDATE в фоне по заголовку `Prefer: respond-async`.
+
+    Данные проверяются в запросе (ошибки возвращаются сразу с 400), а запись выполняет
+    воркер задачей `write`, которая проверяет данные ещё раз на момент выполнения.
+    Запрос отвечает 202 с задачей, результат - id записи - виден в `/jobs/<id>/`.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not prefers_background(request):
+            return super().create(request, *args, **kwargs)
+        self.get_serializer(data=request.data).is_valid(raise_exception=True)
+        return self.enqueue_write(request, pk=None, partial=False)
+
+    def update(self, request, *args, **kwargs):
+        if not prefers_background(request):
+            return super().update(request, *args, **kwargs)
+        partial = kwargs.pop("partial", False)
+        instance = self.get_object()
+        self.get_serializer(instance, data=request.data, partial=partial).is_valid(raise_exception=True)
+        # If-Match проверяется и при постановке в очередь (ConditionalMixin), и задачей перед записью:
+        # запись могла измениться, пока задача ждала воркера
+        return self.enqueue_write(request, pk=instance.pk, partial=partial, if_match=request.headers.get("If-Match"))
+
+    def enqueue_write(self, request, pk, partial, if_match=None):
+        payload = {
+            "model": self.model._meta.model_name,
+            "pk": pk,
+            "partial": partial,
+            "data": get_request_payload(request),
+            "if_match": if_match,
+        }
+        return get_job_response(enqueue("write", payload))
@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+from django.core.management import BaseCommand
+
+from catalogs.transfer import ProgressReport, export_csv, export_ndjson
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+
+def get_format(path, value):
+    if value:
+        return value
+    if path == "-" or Path(path).suffix in NDJSON_SUFFIXES:
+        return "ndjson"
+    return "csv"
+
+
+class Command(BaseCommand):
+    """
+    Команда для выгрузки каталога: CSV-файлы по таблицам в каталоге или один NDJSON-файл.
+
+    Данные передаются из Postgres потоком (COPY или серверный курсор), память не зависит
+    от размера каталога. Прогресс выводится в stderr.
+    """
+
+    help = "Выгрузка каталога в CSV (каталог с файлами по таблицам) или NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Каталог для CSV, файл .ndjson/.jsonl или - для stdout.")
+        parser.add_argument("--format", choices=("csv", "ndjson"), help="Формат выгрузки, по умолчанию по имени.")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        report = ProgressReport(self.stderr)
+        if get_format(output, options["format"]) == "csv":
+            export_csv(Path(output), report)
+        elif output == "-":
+            export_ndjson(sys.stdout.buffer, report)
+        else:
+            with open(output, "wb") as file:
+                export_ndjson(file, report)
+        self.stderr.write(self.style.SUCCESS("Выгрузка завершена."))
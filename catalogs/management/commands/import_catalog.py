@@ -0,0 +1,40 @@
+import functools
+import sys
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from catalogs.management.commands.export_catalog import get_format
+from catalogs.transfer import ProgressReport, import_catalog, load_csv, load_ndjson
+
+
+class Command(BaseCommand):
+    """
+    Команда для загрузки выгрузки export_catalog в каталог.
+
+    Файлы загружаются через COPY во временные staging-таблицы и сливаются с каталогом
+    SQL-запросами по естественным ключам (см. catalogs.transfer), одной транзакцией.
+    """
+
+    help = "Загрузка каталога из выгрузки export_catalog (CSV или NDJSON)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Каталог с CSV, файл .ndjson/.jsonl или - для stdin.")
+        parser.add_argument("--format", choices=("csv", "ndjson"), help="Формат выгрузки, по умолчанию по имени.")
+
+    def handle(self, *args, **options):
+        source = options["input"]
+        report = ProgressReport(self.stderr)
+        fmt = options["format"] or ("csv" if Path(source).is_dir() else get_format(source, None))
+        try:
+            if fmt == "csv":
+                import_catalog(functools.partial(load_csv, Path(source)), report)
+            elif source == "-":
+                import_catalog(functools.partial(load_ndjson, sys.stdin.buffer), report)
+            else:
+                with open(source, "rb") as file:
+                    import_catalog(functools.partial(load_ndjson, file), report)
+        except (OSError, ValueError, DatabaseError) as exc:
+            raise CommandError(f"Каталог не изменён: {exc}") from exc
+        self.stderr.write(self.style.SUCCESS("Загрузка завершена."))
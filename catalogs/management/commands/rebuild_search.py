@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from catalogs.models import SearchEntry
+from catalogs.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """
+    Команда для полного перестроения поисковой таблицы.
+    """
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"В поисковой таблице {SearchEntry.objects.count()} записей."))
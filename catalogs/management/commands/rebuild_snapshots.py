@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from catalogs.models import Snapshot
+from catalogs.snapshots import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    """
+    Команда для полного построения готовых JSON-документов исполнителей и альбомов.
+    """
+
+    def handle(self, *args, **options):
+        rebuild_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"Построено {Snapshot.objects.count()} документов."))
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from catalogs.models import Album, Artist
+from catalogs.summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    """
+    Команда для полного пересчёта сводных колонок альбомов и исполнителей.
+    """
+
+    def handle(self, *args, **options):
+        rebuild_summaries()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пересчитаны сводки {Album.objects.count()} альбомов и {Artist.objects.count()} исполнителей."
+            )
+        )
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from catalogs.jobs import run_worker
+
+
+class Command(BaseCommand):
+    """
+    Команда воркера фоновых задач: выполняет задачи из очереди в Postgres до SIGTERM или SIGINT.
+    """
+
+    help = "Воркер фоновых задач каталога."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.CATALOG_JOBS_CONCURRENCY,
+            help="Количество потоков, каждый со своим соединением с БД.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.CATALOG_JOBS_POLL_INTERVAL,
+            help="Пауза между опросами пустой очереди, секунды.",
+        )
+        parser.add_argument("--once", action="store_true", help="Выполнить задачи из очереди и завершиться.")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency должен быть не меньше 1.")
+        self.stdout.write(f"Воркер запущен, потоков: {options['concurrency']}.")
+        run_worker(options["concurrency"], once=options["once"], poll_interval=options["poll_interval"])
+        self.stdout.write(self.style.SUCCESS("Воркер остановлен."))
@@ -1,103 +1,228 @@
+import functools
+import multiprocessing
 import os
 import random
+import time
 
 from django.contrib.auth.models import User
-from django.core.management import BaseCommand
-from django.db import transaction
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
 from faker import Faker
 
+from catalogs.cache import bump_tags
+from catalogs.copy import copy_rows, reserve_ids
 from catalogs.models import Album, AlbumSong, Artist, Song
 
+MIN_TRACKS_PER_ALBUM = 3
+
+
+@functools.cache
+def get_faker():
+    return Faker("ru_RU")  # Русская локализация
+
+
+def seeded(seed):
+    """
+    Генераторы случайных данных пакета. Пакеты генерируются с собственным seed,
+    поэтому результат не зависит от количества процессов и порядка их выполнения.
+    """
+    fake = get_faker()
+    fake.seed_instance(seed)
+    return random.Random(seed), fake
+
+
+def unique(value, seen, max_length):
+    """
+    Добавляет к value номер, если такое значение уже встречалось.
+    """
+    number = 1
+    result = value
+    while result in seen:
+        number += 1
+        suffix = f" {number}"
+        result = value[: max_length - len(suffix)] + suffix
+    seen.add(result)
+    return result
+
+
+def write_songs(task):
+    ids, seed = task
+    _, fake = seeded(seed)
+    now = timezone.now()
+    copy_rows(
+        Song._meta.db_table,
+        ("id", "title", "updated_at"),
+        ((pk, fake.sentence(nb_words=3, variable_nb_words=True), now) for pk in ids),
+    )
+    return len(ids)
+
+
+def distribute(total, parts):
+    """
+    Делит total поровну на parts частей, остаток достаётся первым частям.
+    """
+    if not parts:
+        return []
+    share, remainder = divmod(total, parts)
+    return [share + (index < remainder) for index in range(parts)]
+
+
+def write_albums(task):
+    """
+    Альбомы пакета исполнителей и их треклисты. Все альбомы исполнителя генерируются
+    в одном пакете, поэтому уникальность (title, artist) проверяется в памяти.
+    Сводные колонки альбома известны при генерации и пишутся сразу.
+    """
+    artists, album_counts, album_ids, song_ids, tracks_per_album, seed = task
+    rng, fake = seeded(seed)
+    now = timezone.now()
+    albums = []
+    tracks = []
+    album_ids = iter(album_ids)
+    max_length = Album._meta.get_field("title").max_length
+    for (artist_id, artist_name), count in zip(artists, album_counts, strict=True):
+        titles = set()
+        for _ in range(count):
+            album_id = next(album_ids)
+            title = unique(fake.sentence(nb_words=2, variable_nb_words=True), titles, max_length)
+            release_year = rng.randint(1970, now.year)
+            songs = []
+            if tracks_per_album and song_ids:
+                size = min(rng.randint(min(MIN_TRACKS_PER_ALBUM, tracks_per_album), tracks_per_album), len(song_ids))
+                songs = rng.sample(song_ids, size)
+                tracks.extend((album_id, song_id, number) for number, song_id in enumerate(songs, start=1))
+            albums.append((album_id, title, release_year, artist_id, artist_name, len(songs), len(set(songs)), now))
+    copy_rows(
+        Album._meta.db_table,
+        ("id", "title", "release_year", "artist_id", "artist_name", "track_count", "songs_count", "updated_at"),
+        albums,
+    )
+    copy_rows(AlbumSong._meta.db_table, ("album_id", "song_id", "track_number"), tracks)
+    return len(albums)
+
 
 class Command(BaseCommand):
     """
     Команда для добавления данных и создание админа.
+
+    Данные генерируются пакетами и записываются через COPY, id заранее резервируются
+    в последовательностях, поэтому пакеты можно записывать параллельно (--workers).
+    Пакеты фиксируются по отдельности: при ошибке уже записанные пакеты остаются в БД.
+    Сигналы моделей не вызываются, после загрузки нужно перестроить поиск (rebuild_search);
+    сводные колонки альбомов и исполнителей записываются сразу.
     """
 
+    def add_arguments(self, parser):
+        parser.add_argument("--artists", type=int, default=10, help="Количество исполнителей.")
+        parser.add_argument("--songs", type=int, default=100, help="Количество песен.")
+        parser.add_argument("--albums", type=int, default=23, help="Количество альбомов.")
+        parser.add_argument(
+            "--tracks-per-album",
+            type=int,
+            default=7,
+            help=f"Максимум треков в альбоме, в каждом альбоме от {MIN_TRACKS_PER_ALBUM} до этого числа.",
+        )
+        parser.add_argument("--seed", type=int, default=None, help="Seed для воспроизводимой генерации.")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Строк в одном пакете COPY.")
+        parser.add_argument("--workers", type=int, default=1, help="Количество процессов для записи пакетов.")
+
     def handle(self, *args, **options):
-        self.fake = Faker("ru_RU")  # Русская локализация
-        self.max_attempts = 10  # Максимальное количество попыток для уникальности
-        with transaction.atomic():
-            self.create_admin()
-            artists = self.add_artist(10)
-            songs = self.add_song(100)
-            self.add_album(23, artists, songs)
-
-    def add_artist(self, count):
+        for name in ("artists", "songs", "albums", "tracks_per_album"):
+            if options[name] < 0:
+                raise CommandError(f"--{name.replace('_', '-')} не может быть отрицательным.")
+        if options["batch_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--batch-size и --workers должны быть положительными.")
+        if options["albums"] and not options["artists"]:
+            raise CommandError("Для альбомов нужен хотя бы один исполнитель (--artists).")
+        self.batch_size = options["batch_size"]
+        self.workers = options["workers"]
+        self.seed = random.randrange(2**32) if options["seed"] is None else options["seed"]
+
+        self.create_admin()
+        artists = self.add_artist(options["artists"], options["albums"])
+        song_ids = self.add_song(options["songs"])
+        self.add_album(options["albums"], artists, song_ids, options["tracks_per_album"])
+        # Записи добавлены в обход catalog_changed, поэтому кэш списков сбрасывается вручную
+        bump_tags({"artist:*", "album:*", "song:*"})
+
+    def batches(self, ids):
+        return [ids[start : start + self.batch_size] for start in range(0, len(ids), self.batch_size)]
+
+    def run(self, label, func, tasks, total):
+        """
+        Выполняет пакеты в текущем процессе или в пуле процессов и выводит прогресс.
+        """
+        if not tasks:
+            return
+        started = time.perf_counter()
+        if self.workers > 1:
+            # Дочерние процессы не должны наследовать открытые соединения с БД и пул соединений
+            connections.close_all()
+            for connection in connections.all():
+                connection.close_pool()
+            with multiprocessing.get_context("fork").Pool(self.workers) as pool:
+                self.report(label, pool.imap_unordered(func, tasks), total, started)
+        else:
+            self.report(label, map(func, tasks), total, started)
+
+    def report(self, label, results, total, started):
+        done = step = 0
+        for count in results:
+            done += count
+            if done * 10 // total > step or done == total:
+                step = done * 10 // total
+                self.stdout.write(f"{label}: {done}/{total}, {time.perf_counter() - started:.1f} с")
+
+    def add_artist(self, count, album_total):
+        """
+        Имена исполнителей генерируются в одном процессе: уникальность проверяется
+        по всем новым именам в памяти и по существующим в БД одним запросом на пакет.
+        Возвращает пары (id, имя) для альбомов.
+        """
+        ids = reserve_ids(Artist, count)
+        album_counts = iter(distribute(album_total, count))
         artists = []
-        for _ in range(count):
-            attempts = 0
-            while attempts < self.max_attempts:
-                name = self.fake.name()
-                if not Artist.objects.filter(name=name).exists():
-                    artists.append(Artist(name=name))
-                    break
-                attempts += 1
-            else:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"Не удалось сгенерировать уникальное имя для исполнителя после {self.max_attempts} попыток"
-                    )
-                )
-        if artists:
-            Artist.objects.bulk_create(artists, ignore_conflicts=True)
-        self.stdout.write(self.style.SUCCESS(f"Добавлено {len(artists)} исполнителей."))
-        return list(Artist.objects.order_by("-id")[: len(artists)])
+        _, fake = seeded(f"{self.seed}:artists")
+        max_length = Artist._meta.get_field("name").max_length
+        seen = set()
+        now = timezone.now()
+        for batch in self.batches(ids):
+            names = [unique(fake.name(), seen, max_length) for _ in batch]
+            while existing := set(Artist.objects.filter(name__in=names).values_list("name", flat=True)):
+                names = [unique(name, seen, max_length) if name in existing else name for name in names]
+            rows = [(pk, name, next(album_counts), now) for pk, name in zip(batch, names, strict=True)]
+            copy_rows(Artist._meta.db_table, ("id", "name", "album_count", "updated_at"), rows)
+            artists.extend(zip(batch, names, strict=True))
+        self.stdout.write(self.style.SUCCESS(f"Добавлено {count} исполнителей."))
+        return artists
 
     def add_song(self, count):
-        songs = [
-            Song(
-                title=self.fake.sentence(nb_words=3, variable_nb_words=True),
-            )
-            for _ in range(count)
-        ]
-        Song.objects.bulk_create(songs, ignore_conflicts=True)
-        self.stdout.write(self.style.SUCCESS(f"Добавлено {len(songs)} песен."))
-        return list(Song.objects.order_by("-id")[: len(songs)])
+        ids = reserve_ids(Song, count)
+        tasks = [(batch, f"{self.seed}:songs:{index}") for index, batch in enumerate(self.batches(ids))]
+        self.run("Песни", write_songs, tasks, count)
+        self.stdout.write(self.style.SUCCESS(f"Добавлено {count} песен."))
+        return ids
 
-    def add_album(self, count, artists, songs):
-        albums = []
-        album_songs = []
-
-        for _ in range(count):
-            artist = random.choice(artists)
-            attempts = 0
-            while attempts < self.max_attempts:
-                try:
-                    title = self.fake.sentence(
-                        nb_words=2,
-                        variable_nb_words=True,
-                    )
-                    if not Album.objects.filter(title=title, artist=artist).exists():
-                        album = Album.objects.create(
-                            title=title,
-                            release_year=random.randint(1970, 2025),
-                            artist=artist,
-                        )
-                        albums.append(album)
-                        selected_songs = random.sample(
-                            songs,
-                            min(random.randint(3, 7), len(songs)),
-                        )
-                        for index, song in enumerate(selected_songs, start=1):
-                            album_songs.append(AlbumSong(album=album, song=song, track_number=index))
-                        break
-                except self.fake.unique.UniqueException:
-                    attempts += 1
-            else:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"Не удалось сгенерировать уникальное название альбома "
-                        f"для {artist.name} после {self.max_attempts} попыток"
-                    )
-                )
-        if albums:
-            Album.objects.bulk_create(albums, ignore_conflicts=True)
-        if album_songs:
-            AlbumSong.objects.bulk_create(album_songs, ignore_conflicts=True)
-            self.stdout.write(self.style.SUCCESS(f"Добавлено {len(album_songs)} связей альбом-песня."))
-        self.stdout.write(self.style.SUCCESS(f"Добавлено {len(albums)} альбомов."))
-        return albums
+    def add_album(self, count, artists, song_ids, tracks_per_album):
+        if not count:
+            return
+        ids = reserve_ids(Album, count)
+        # Альбомы распределяются между исполнителями так же, как album_count в add_artist
+        album_counts = distribute(count, len(artists))
+        artists_per_task = max(1, self.batch_size // max(1, album_counts[0]))
+        tasks = []
+        offset = 0
+        for index, start in enumerate(range(0, len(artists), artists_per_task)):
+            counts = album_counts[start : start + artists_per_task]
+            task_ids = ids[offset : offset + sum(counts)]
+            offset += len(task_ids)
+            seed = f"{self.seed}:albums:{index}"
+            tasks.append(
+                (artists[start : start + artists_per_task], counts, task_ids, song_ids, tracks_per_album, seed)
+            )
+        self.run("Альбомы", write_albums, tasks, count)
+        self.stdout.write(self.style.SUCCESS(f"Добавлено {count} альбомов."))
 
     def create_admin(self):
         username = os.getenv("ADMIN_USERNAME")
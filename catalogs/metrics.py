@@ -0,0 +1,330 @@
+import hmac
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+from catalogs.cache import METRICS, get_cache_metrics, get_metric_values, increment_metric
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы длительности запросов, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Счётчики представления: имя в кэше, имя метрики Prometheus, множитель и описание
+COUNTERS = (
+    ("requests", "catalog_requests_total", 1, "Количество запросов."),
+    ("queries", "catalog_db_queries_total", 1, "Количество SQL-запросов."),
+    ("db_us", "catalog_db_seconds_total", 1e-6, "Время выполнения SQL-запросов."),
+    ("serializer_us", "catalog_serializer_seconds_total", 1e-6, "Время сериализации ответов."),
+    ("response_bytes", "catalog_response_bytes_total", 1, "Размер тел ответов."),
+    ("budget_exceeded", "catalog_query_budget_exceeded_total", 1, "Превышения бюджета SQL-запросов."),
+)
+# Счётчики пулов соединений psycopg 3 (ConnectionPool.pop_stats): статистика, метрика, множитель, описание
+POOL_COUNTERS = (
+    ("requests_num", "catalog_db_pool_requests_total", 1, "Запросы соединения из пула."),
+    ("requests_queued", "catalog_db_pool_requests_queued_total", 1, "Запросы, ожидавшие свободное соединение."),
+    ("requests_wait_ms", "catalog_db_pool_wait_seconds_total", 1e-3, "Время ожидания соединения из пула."),
+    ("requests_errors", "catalog_db_pool_errors_total", 1, "Запросы соединения с ошибкой или по таймауту."),
+    ("connections_num", "catalog_db_pool_connections_total", 1, "Соединения с БД, открытые пулом."),
+)
+OTHER_VIEW = "other"
+
+current_metrics = ContextVar("current_metrics", default=None)
+
+
+class QueryBudgetError(Exception):
+    pass
+
+
+class RequestMetrics:
+    """
+    Показатели одного HTTP-запроса.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.view = OTHER_VIEW
+        self.budget = None
+        self.view_started_queries = 0
+
+    @property
+    def view_queries(self):
+        return self.queries - self.view_started_queries
+
+    def get_server_timing(self, duration, size):
+        parts = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} SQL"',
+            f"serializer;dur={self.serializer_time * 1000:.1f}",
+            f"app;dur={duration * 1000:.1f}",
+        ]
+        if size is not None:
+            parts.append(f'response;desc="{size} B"')
+        return ", ".join(parts)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_metrics(sender, connection, **kwargs):
+    """
+    Подключает счётчик SQL-запросов к соединению (сигнал connection_created).
+
+    Соединения Django привязаны к потоку, а под ASGI запросы к БД выполняются в потоках
+    sync_to_async, поэтому счётчик стоит на каждом соединении постоянно, а запрос,
+    к которому относятся показатели, определяется по contextvar current_metrics.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def get_pool_aliases():
+    return [alias for alias, database in settings.DATABASES.items() if database.get("OPTIONS", {}).get("pool")]
+
+
+def pop_pool_stats():
+    """
+    Счётчики пулов соединений процесса, накопленные с прошлого вызова: {(alias, name): value}.
+    """
+    stats = {}
+    for alias in get_pool_aliases():
+        values = connections[alias].pool.pop_stats()
+        stats.update(((alias, name), values.get(name, 0)) for name, *_ in POOL_COUNTERS)
+    return stats
+
+
+def start_view(view):
+    """
+    Запоминает представление запроса и его бюджет SQL-запросов. Запросы, выполненные
+    до представления (сессия, аутентификация), в бюджет не входят.
+    """
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.view = f"{getattr(view, 'basename', None) or type(view).__name__}.{view.action}"
+        metrics.budget = view.query_budget.get(view.action)
+        metrics.view_started_queries = metrics.queries
+
+
+@contextmanager
+def measure_serializer():
+    metrics = current_metrics.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+class MetricsBuffer:
+    """
+    Счётчики процесса, которые сбрасываются в кэш каталога не чаще раза
+    в CATALOG_METRICS_FLUSH_INTERVAL секунд. В кэше (Redis) счётчики всех воркеров
+    суммируются, поэтому endpoint метрик отдаёт общие значения.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = Counter()
+        self.flushed = time.monotonic()
+
+    def add(self, metrics, duration, size, exceeded):
+        """
+        Добавляет показатели запроса. Возвращает True, если пора сбросить счётчики в кэш.
+        """
+        bucket = next((bound for bound in BUCKETS if duration <= bound), "inf")
+        with self.lock:
+            values = self.values
+            values[metrics.view, "requests"] += 1
+            values[metrics.view, "queries"] += metrics.queries
+            values[metrics.view, "db_us"] += round(metrics.db_time * 1e6)
+            values[metrics.view, "serializer_us"] += round(metrics.serializer_time * 1e6)
+            values[metrics.view, "duration_us"] += round(duration * 1e6)
+            values[metrics.view, f"bucket:{bucket}"] += 1
+            values[metrics.view, "response_bytes"] += size or 0
+            values[metrics.view, "budget_exceeded"] += exceeded
+            return time.monotonic() - self.flushed >= settings.CATALOG_METRICS_FLUSH_INTERVAL
+
+    def flush(self):
+        with self.lock:
+            values, self.values = self.values, Counter()
+            self.flushed = time.monotonic()
+        for (view, name), delta in values.items():
+            if delta:
+                increment_metric(f"view:{view}:{name}", delta)
+        for (alias, name), delta in pop_pool_stats().items():
+            if delta:
+                increment_metric(f"pool:{alias}:{name}", delta)
+
+
+buffer = MetricsBuffer()
+
+
+class QueryMetricsMiddleware:
+    """
+    Считает для каждого запроса SQL-запросы, время БД и сериализации и размер ответа.
+
+    Показатели отдаются заголовком Server-Timing (CATALOG_SERVER_TIMING) и копятся
+    для endpoint метрик. Если представление превысило бюджет SQL-запросов (query_budget),
+    это логируется, а при CATALOG_QUERY_BUDGET_STRICT запрос завершается исключением -
+    так бюджеты проверяются в тестах. Потоковые ответы измеряются до начала передачи тела.
+    Middleware работает и в синхронном, и в асинхронном стеке без переключения потоков.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        if self.finish(request, response, metrics, time.perf_counter() - started):
+            buffer.flush()
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        if self.finish(request, response, metrics, time.perf_counter() - started):
+            await sync_to_async(buffer.flush)()
+        return response
+
+    def finish(self, request, response, metrics, duration):
+        size = None if response.streaming else len(response.content)
+        if settings.CATALOG_SERVER_TIMING:
+            response["Server-Timing"] = metrics.get_server_timing(duration, size)
+        exceeded = metrics.budget is not None and metrics.view_queries > metrics.budget
+        due = buffer.add(metrics, duration, size, exceeded)
+        if exceeded:
+            message = f"{metrics.view}: {metrics.view_queries} SQL-запросов при бюджете {metrics.budget}"
+            logger.warning("%s (%s %s)", message, request.method, request.get_full_path())
+            if settings.CATALOG_QUERY_BUDGET_STRICT:
+                raise QueryBudgetError(message)
+        return due
+
+
+class MetricsMixin:
+    """
+    Бюджет SQL-запросов по action (`query_budget = {"list": 4}`) и замер времени сериализации.
+    """
+
+    query_budget = {}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        start_view(self)
+
+    def serialize(self, *args, **kwargs):
+        serializer = self.get_serializer(*args, **kwargs)
+        with measure_serializer():
+            return serializer.data
+
+
+def get_view_names():
+    """
+    Имена представлений для метрик: basename и action всех маршрутов каталога.
+    """
+    from catalogs.urls import router
+
+    names = []
+    for _, viewset, basename in router.registry:
+        for route in router.get_routes(viewset):
+            names.extend(f"{basename}.{action}" for action in route.mapping.values())
+    return [*dict.fromkeys(names), OTHER_VIEW]
+
+
+def get_view_metrics():
+    """
+    Накопленные счётчики представлений из кэша: {view: {name: value}}.
+    """
+    buffer.flush()
+    names = ["requests", "duration_us", *(name for name, *_ in COUNTERS[1:])]
+    names += [f"bucket:{bound}" for bound in (*BUCKETS, "inf")]
+    keys = {f"view:{view}:{name}": (view, name) for view in get_view_names() for name in names}
+    result = {}
+    for key, value in get_metric_values(keys).items():
+        view, name = keys[key]
+        result.setdefault(view, {})[name] = value
+    return {view: counters for view, counters in result.items() if counters["requests"]}
+
+
+def render_metrics():
+    """
+    Метрики в текстовом формате Prometheus.
+    """
+    views = get_view_metrics()
+    lines = []
+    for name, metric, scale, description in COUNTERS:
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+        lines += [f'{metric}{{view="{view}"}} {counters[name] * scale:g}' for view, counters in views.items()]
+    metric = "catalog_request_duration_seconds"
+    lines += [f"# HELP {metric} Длительность запросов.", f"# TYPE {metric} histogram"]
+    for view, counters in views.items():
+        total = 0
+        for bound in (*BUCKETS, "inf"):
+            total += counters[f"bucket:{bound}"]
+            le = "+Inf" if bound == "inf" else f"{bound:g}"
+            lines.append(f'{metric}_bucket{{view="{view}",le="{le}"}} {total}')
+        lines.append(f'{metric}_sum{{view="{view}"}} {counters["duration_us"] * 1e-6:g}')
+        lines.append(f'{metric}_count{{view="{view}"}} {counters["requests"]}')
+    aliases = get_pool_aliases()
+    pool_metrics = get_metric_values([f"pool:{alias}:{name}" for alias in aliases for name, *_ in POOL_COUNTERS])
+    for name, metric, scale, description in POOL_COUNTERS:
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+        lines += [f'{metric}{{alias="{alias}"}} {pool_metrics[f"pool:{alias}:{name}"] * scale:g}' for alias in aliases]
+    cache_metrics = get_cache_metrics()
+    for name in METRICS:
+        metric = f"catalog_cache_{name}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {cache_metrics[name]}"]
+    return "\n".join(lines) + "\n"
+
+
+def has_metrics_access(request):
+    """
+    Метрики отдаются сборщику с токеном CATALOG_METRICS_TOKEN (Authorization: Bearer <токен>)
+    и сотрудникам, вошедшим в админку. Без токена в настройках доступ есть только у сотрудников.
+    """
+    token = settings.CATALOG_METRICS_TOKEN
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    if token and scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), token.encode()):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def metrics_view(request):
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,14 +1,36 @@
 import datetime
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db.models import (
     CASCADE,
+    BigIntegerField,
+    BinaryField,
+    BooleanField,
     CharField,
+    DateTimeField,
     ForeignKey,
+    Index,
+    JSONField,
     ManyToManyField,
     Model,
     PositiveIntegerField,
+    PositiveSmallIntegerField,
+    Q,
 )
+from django.db.models.functions import Upper
+
+
+def trigram_index(field, name):
+    """
+    GIN-индекс pg_trgm по UPPER(field) - выражению, в которое Django превращает
+    icontains и istartswith, поэтому индекс подходит и для них, и для сходства триграмм.
+
+    Каталог читается намного чаще, чем пишется, поэтому очередь отложенных вставок
+    (fastupdate) отключена: с ней поиск до ближайшего VACUUM читает всю очередь.
+    """
+    return GinIndex(OpClass(Upper(field), name="gin_trgm_ops"), name=name, fastupdate=False)
 
 
 class Artist(Model):
@@ -18,10 +40,24 @@ class Artist(Model):
         verbose_name="Имя исполнителя",
         help_text="Введите имя исполнителя",
     )
+    album_count = PositiveIntegerField(
+        default=0,
+        db_default=0,
+        editable=False,
+        verbose_name="Количество альбомов",
+        help_text="Поддерживается catalogs.summary при изменении альбомов",
+    )
+    updated_at = DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения",
+        help_text="Дата последнего изменения записи или вложенных в неё данных",
+    )
 
     class Meta:
         verbose_name = "Исполнитель"
         verbose_name_plural = "Исполнители"
+        indexes = [trigram_index("name", "artist_name_trgm_idx")]
 
     def __str__(self):
         return self.name
@@ -33,10 +69,20 @@ class Song(Model):
         verbose_name="Название песни",
         help_text="Введите название песни",
     )
+    updated_at = DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения",
+        help_text="Дата последнего изменения записи или вложенных в неё данных",
+    )
 
     class Meta:
         verbose_name = "Песня"
         verbose_name_plural = "Песни"
+        indexes = [
+            Index(fields=["title"], name="song_title_idx"),
+            trigram_index("title", "song_title_trgm_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -70,6 +116,32 @@ class Album(Model):
         verbose_name="Песни",
         help_text="Выберите песни",
     )
+    # Сводка для карточек альбома, чтобы не читать треки и исполнителя (см. catalogs.summary)
+    artist_name = CharField(
+        max_length=55,
+        default="",
+        db_default="",
+        editable=False,
+        verbose_name="Имя исполнителя (копия)",
+    )
+    track_count = PositiveIntegerField(
+        default=0,
+        db_default=0,
+        editable=False,
+        verbose_name="Количество треков",
+    )
+    songs_count = PositiveIntegerField(
+        default=0,
+        db_default=0,
+        editable=False,
+        verbose_name="Количество разных песен",
+    )
+    updated_at = DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения",
+        help_text="Дата последнего изменения записи или вложенных в неё данных",
+    )
 
     class Meta:
         verbose_name = "Альбом"
@@ -78,6 +150,11 @@ class Album(Model):
             "title",
             "artist",
         )
+        # Точный поиск по title обслуживает индекс unique_together, он начинается с title
+        indexes = [
+            Index(fields=["release_year"], name="album_release_year_idx"),
+            trigram_index("title", "album_title_trgm_idx"),
+        ]
 
     def __str__(self):
         return f"{self.artist.name} - {self.release_year}"
@@ -112,3 +189,215 @@ class AlbumSong(Model):
 
     def __str__(self):
         return f"{self.song.title} (#{self.track_number} в {self.album})"
+
+
+class SearchEntry(Model):
+    """
+    Строка поисковой таблицы: исполнитель, альбом или песня с готовым tsvector.
+
+    Таблица заполняется и обновляется в catalogs.search по сигналу catalog_changed.
+    """
+
+    ARTIST = "artist"
+    ALBUM = "album"
+    SONG = "song"
+    KIND_CHOICES = (
+        (ARTIST, "Исполнитель"),
+        (ALBUM, "Альбом"),
+        (SONG, "Песня"),
+    )
+
+    kind = CharField(
+        max_length=6,
+        choices=KIND_CHOICES,
+        verbose_name="Тип записи",
+    )
+    object_id = BigIntegerField(
+        verbose_name="ID записи",
+    )
+    title = CharField(
+        max_length=128,
+        verbose_name="Название",
+    )
+    search_vector = SearchVectorField(
+        verbose_name="Поисковый вектор",
+    )
+
+    class Meta:
+        verbose_name = "Поисковая запись"
+        verbose_name_plural = "Поисковые записи"
+        unique_together = (
+            "kind",
+            "object_id",
+        )
+        indexes = [GinIndex(fields=["search_vector"], name="search_vector_idx", fastupdate=False)]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+
+class Snapshot(Model):
+    """
+    Готовое JSON-представление исполнителя или альбома для чтения без сериализации.
+
+    Документ строится в catalogs.snapshots после коммита изменений и действителен, пока
+    source_updated_at совпадает с updated_at записи.
+    """
+
+    ARTIST = "artist"
+    ALBUM = "album"
+    KIND_CHOICES = (
+        (ARTIST, "Исполнитель"),
+        (ALBUM, "Альбом"),
+    )
+
+    kind = CharField(
+        max_length=6,
+        choices=KIND_CHOICES,
+        verbose_name="Тип записи",
+    )
+    object_id = BigIntegerField(
+        verbose_name="ID записи",
+    )
+    content = BinaryField(
+        verbose_name="JSON-документ",
+    )
+    source_updated_at = DateTimeField(
+        verbose_name="Дата изменения записи",
+        help_text="updated_at записи, по состоянию на которую построен документ",
+    )
+
+    class Meta:
+        verbose_name = "Снимок представления"
+        verbose_name_plural = "Снимки представлений"
+        unique_together = (
+            "kind",
+            "object_id",
+        )
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class Job(Model):
+    """
+    Задача фоновой очереди: запись в таблице, которую воркер (`run_worker`) забирает
+    через SELECT ... FOR UPDATE SKIP LOCKED, см. catalogs.jobs.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    kind = CharField(
+        max_length=50,
+        verbose_name="Тип задачи",
+    )
+    payload = JSONField(
+        default=dict,
+        verbose_name="Параметры задачи",
+    )
+    status = CharField(
+        max_length=7,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name="Статус",
+    )
+    result = JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Результат",
+        help_text="Результат выполненной задачи или ошибки невыполненной",
+    )
+    attempts = PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Количество запусков",
+    )
+    created_at = DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата постановки в очередь",
+    )
+    started_at = DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Дата запуска",
+    )
+    finished_at = DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Дата завершения",
+    )
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            # Воркер ищет только незавершённые задачи, завершённые в индекс не попадают
+            Index(fields=["id"], condition=Q(status__in=["queued", "running"]), name="job_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class ChangeEvent(Model):
+    """
+    Событие журнала изменений каталога для инкрементальной синхронизации (`/changes/`).
+
+    Пишется в той же транзакции, что и изменение (catalogs.changes). transaction_id - id
+    транзакции Postgres: лента упорядочена по нему и id и отдаёт только события завершённых
+    транзакций, поэтому событие транзакции, закоммиченной позже, не окажется перед курсором.
+    """
+
+    ARTIST = "artist"
+    ALBUM = "album"
+    SONG = "song"
+    MODEL_CHOICES = (
+        (ARTIST, "Исполнитель"),
+        (ALBUM, "Альбом"),
+        (SONG, "Песня"),
+    )
+
+    transaction_id = BigIntegerField(
+        verbose_name="ID транзакции",
+    )
+    model = CharField(
+        max_length=6,
+        choices=MODEL_CHOICES,
+        verbose_name="Тип записи",
+    )
+    object_id = BigIntegerField(
+        verbose_name="ID записи",
+    )
+    deleted = BooleanField(
+        default=False,
+        verbose_name="Запись удалена",
+    )
+    created_at = DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата изменения",
+    )
+
+    class Meta:
+        verbose_name = "Изменение каталога"
+        verbose_name_plural = "Изменения каталога"
+        indexes = [
+            Index(fields=["transaction_id", "id"], name="change_event_position_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} ({self.sequence})"
+
+    @property
+    def sequence(self):
+        """
+        Позиция события в ленте: параметр `since` следующего запроса.
+        """
+        return f"{self.transaction_id}.{self.pk}"
@@ -1,21 +1,234 @@
+import base64
+import binascii
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
 
 
 class CustomLOPagination(LimitOffsetPagination):
+    """
+    Пагинация limit/offset с жёстким ограничением размера страницы.
+
+    Дополнительно поддерживает keyset-режим (параметр `cursor`): страница выбирается
+    условием по ключу сортировки и `id`, а не смещением, поэтому глубокие страницы
+    не заставляют Postgres читать и отбрасывать строки.
+    Параметр `count` управляет подсчётом записей: `exact`, `estimate` (оценка из
+    `pg_class.reltuples`) или `none`.
+    """
+
+    max_limit = settings.CATALOG_PAGINATION_MAX_LIMIT
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    count_query_param = "count"
+    invalid_cursor_message = "Некорректный курсор."
+
     def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.count = self.get_count_value(queryset, request)
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.get_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Асинхронный вариант paginate_queryset: запросы к БД выполняются через async ORM.
+        """
+        self.request = request
         self.limit = self.get_limit(request)
+        self.count = await self.aget_count_value(queryset, request)
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.get_page([instance async for instance in queryset])
 
-        # Если limit и offset не указаны, возвращаем все объекты
-        if self.limit is None:
-            self.count = queryset.count()
-            return list(queryset)
+    def get_page_queryset(self, queryset, request, view):
+        """
+        Запрос строк страницы (на одну больше limit, чтобы узнать, есть ли следующая).
+        """
+        if self.cursor_query_param and self.cursor_query_param in request.query_params:
+            return self.get_keyset_queryset(queryset, request, view)
+        self.keyset = False
+        self.offset = self.get_offset(request)
+        return queryset[self.offset : self.offset + self.limit + 1]
 
-        return super().paginate_queryset(queryset, request, view)
+    def get_page(self, rows):
+        if self.keyset:
+            return self.get_keyset_page(rows)
+        self.has_next = len(rows) > self.limit
+        return rows[: self.limit]
 
     def get_paginated_response(self, data):
-        # Если пагинация отключена, возвращаем все объекты с метаданными
-        if self.limit is None:
-            return Response({"count": self.count, "next": None, "previous": None, "results": data})
+        return Response(
+            {
+                "count": self.count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"]["nullable"] = True
+        return response_schema
+
+    def get_next_link(self):
+        if self.keyset:
+            return self.keyset_next
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_previous_link(self):
+        if self.keyset:
+            return self.keyset_previous
+        return super().get_previous_link()
+
+    # Подсчёт количества записей
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(self.count_query_param, settings.CATALOG_PAGINATION_COUNT)
+        if mode not in COUNT_MODES:
+            raise ValidationError({self.count_query_param: f"Допустимые значения: {', '.join(COUNT_MODES)}."})
+        return mode
+
+    def get_count_value(self, queryset, request):
+        mode = self.get_count_mode(request)
+        if mode == COUNT_NONE:
+            return None
+        if mode == COUNT_ESTIMATE and not queryset.query.where:
+            estimate = self.estimate_count(queryset.model)
+            if estimate is not None:
+                return estimate
+        return self.get_count(queryset)
+
+    async def aget_count_value(self, queryset, request):
+        mode = self.get_count_mode(request)
+        if mode == COUNT_NONE:
+            return None
+        if mode == COUNT_ESTIMATE and not queryset.query.where:
+            estimate = await sync_to_async(self.estimate_count)(queryset.model)
+            if estimate is not None:
+                return estimate
+        return await queryset.acount()
+
+    @staticmethod
+    def estimate_count(model):
+        """
+        Оценка количества строк таблицы по статистике планировщика Postgres.
+        """
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        # reltuples = -1, если таблица ещё ни разу не анализировалась
+        if row is None or row[0] < 0:
+            return None
+        return int(row[0])
+
+    # Keyset-пагинация
+
+    def get_keyset_ordering(self, request, queryset, view):
+        ordering = request.query_params.get(self.ordering_query_param, "id")
+        field_name = ordering.removeprefix("-")
+        if field_name not in self.get_keyset_fields(queryset.model, view):
+            raise ValidationError({self.ordering_query_param: f"Сортировка по полю {field_name} недоступна."})
+        return ordering
+
+    @staticmethod
+    def get_keyset_fields(model, view):
+        allowed = getattr(view, "ordering_fields", None) or ("id",)
+        fields = [field.attname for field in model._meta.concrete_fields if not field.null]
+        if allowed == "__all__":
+            return fields
+        return [field for field in fields if field in allowed or field == "id"]
+
+    def encode_cursor(self, ordering, instance, reverse):
+        field_name = ordering.removeprefix("-")
+        position = {"o": ordering, "v": getattr(instance, field_name), "id": instance.pk, "r": reverse}
+        raw = json.dumps(position, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            position = json.loads(raw)
+            return position["o"], position["v"], position["id"], bool(position.get("r"))
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message) from None
+
+    def get_keyset_queryset(self, queryset, request, view):
+        self.keyset = True
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        if position is None:
+            ordering, reverse = self.get_keyset_ordering(request, queryset, view), False
+        else:
+            ordering, value, pk, reverse = position
+            if ordering.removeprefix("-") not in self.get_keyset_fields(queryset.model, view):
+                raise NotFound(self.invalid_cursor_message)
+        self.keyset_position = ordering, position is not None, reverse
+        field_name = ordering.removeprefix("-")
+        descending = ordering.startswith("-") != reverse
+        order = ("-" if descending else "") + field_name
+        order_pk = "-id" if descending else "id"
+        lookup = "lt" if descending else "gt"
+        if field_name == "id":
+            if position is not None:
+                queryset = queryset.filter(**{f"id__{lookup}": pk})
+            queryset = queryset.order_by(order_pk)
+        else:
+            if position is not None:
+                queryset = queryset.filter(
+                    Q(**{f"{field_name}__{lookup}": value}) | Q(**{field_name: value, f"id__{lookup}": pk}),
+                )
+            queryset = queryset.order_by(order, order_pk)
+        return queryset[: self.limit + 1]
+
+    def get_keyset_page(self, page):
+        request = self.request
+        ordering, has_position, reverse = self.keyset_position
+        has_more = len(page) > self.limit
+        page = page[: self.limit]
+        if reverse:
+            page.reverse()
+
+        url = remove_query_param(request.build_absolute_uri(), self.offset_query_param)
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        has_next = has_more if not reverse else has_position
+        has_previous = has_position if not reverse else has_more
+        self.keyset_next = (
+            replace_query_param(url, self.cursor_query_param, self.encode_cursor(ordering, page[-1], False))
+            if has_next and page
+            else None
+        )
+        self.keyset_previous = (
+            replace_query_param(url, self.cursor_query_param, self.encode_cursor(ordering, page[0], True))
+            if has_previous and page
+            else None
+        )
+        return page
+
+
+class SearchPagination(CustomLOPagination):
+    """
+    Пагинация поисковой выдачи: записи упорядочены по релевантности, которой нет
+    в таблице, поэтому keyset-режим не поддерживается, только limit/offset.
+    """
 
-        return super().get_paginated_response(data)
+    cursor_query_param = None
@@ -0,0 +1,61 @@
+import re
+
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.utils import json
+
+from catalogs.renderers import ORJSONRenderer
+
+# orjson разбирает целые больше 64 бит как float. Тело с числом от 19 цифр разбирает json:
+# он возвращает такие числа точно, а цифры внутри строк лишь замедляют разбор, не меняя результат
+LONG_INTEGER = re.compile(rb"\d{19,}")
+
+
+def loads(content):
+    """
+    JSON из байтов через orjson или json, если в них могут быть целые больше 64 бит.
+    NaN и Infinity отклоняются в обоих случаях (json DRF разбирает их строго).
+    """
+    if LONG_INTEGER.search(content):
+        return json.loads(content)
+    return orjson.loads(content)
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser на orjson. Как и JSONParser со STRICT_JSON, отклоняет NaN и Infinity;
+    тело в кодировке, отличной от UTF-8, разбирает стандартный парсер, а тело с длинными
+    целыми - json (loads).
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}") from None
+
+
+class NDJSONParser(BaseParser):
+    """
+    Парсер NDJSON: один JSON-объект на строку, результат - список объектов.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        items = []
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(loads(line))
+            except ValueError as exc:
+                raise ParseError(f"Ошибка разбора NDJSON в строке {number}: {exc}") from None
+        return items
@@ -0,0 +1,82 @@
+from django.db.models import Prefetch
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def _readable_nested_fields(serializer):
+    """
+    Возвращает вложенные сериализаторы, которые участвуют в чтении: (source, child, many).
+    """
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*" or "." in field.source:
+            continue
+        if isinstance(field, ListSerializer):
+            yield field.source, field.child, True
+        elif isinstance(field, BaseSerializer):
+            yield field.source, field, False
+
+
+def _get_relation(model, source):
+    """
+    Находит поле модели по атрибуту, включая менеджеры обратных связей вида `albumsong_set`.
+    """
+    for field in model._meta.get_fields():
+        name = field.get_accessor_name() if field.auto_created and not field.concrete else field.name
+        if name == source:
+            return field
+    raise LookupError(f"{model.__name__} не содержит связи {source}")
+
+
+def get_related_lookups(serializer, exclude=None):
+    """
+    Строит по дереву сериализатора пару (select_related, prefetch_related).
+
+    Прямые FK попадают в select_related, обратные FK и M2M - в Prefetch со своим queryset,
+    который строится рекурсивно по вложенному сериализатору.
+    Сортировка вложенных записей берётся из атрибута `ordering` в Meta вложенного сериализатора.
+    """
+    model = serializer.Meta.model
+    select_related = []
+    prefetch_related = []
+    for source, child, many in _readable_nested_fields(serializer):
+        if source == exclude:
+            continue
+        field = _get_relation(model, source)
+        if not many and (field.many_to_one or field.one_to_one) and field.concrete:
+            select_related.append(source)
+            child_select, child_prefetch = get_related_lookups(child)
+            select_related.extend(f"{source}__{lookup}" for lookup in child_select)
+            prefetch_related.extend(_prefix_prefetch(source, prefetch) for prefetch in child_prefetch)
+            continue
+        # Для обратного FK родительский объект проставляется Django сам, JOIN на него не нужен
+        back_reference = field.field.name if field.one_to_many and field.auto_created else None
+        prefetch_related.append(
+            Prefetch(source, queryset=build_queryset(child, exclude=back_reference)),
+        )
+    return select_related, prefetch_related
+
+
+def _prefix_prefetch(prefix, prefetch):
+    return Prefetch(
+        f"{prefix}__{prefetch.prefetch_through}",
+        queryset=prefetch.queryset,
+        to_attr=prefetch.to_attr,
+    )
+
+
+def build_queryset(serializer, queryset=None, exclude=None):
+    """
+    Возвращает queryset модели сериализатора с жадной загрузкой всех вложенных связей.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if queryset is None:
+        queryset = serializer.Meta.model._default_manager.all()
+    select_related, prefetch_related = get_related_lookups(serializer, exclude=exclude)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    ordering = getattr(serializer.Meta, "ordering", None)
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+    return queryset
@@ -0,0 +1,76 @@
+import math
+
+import orjson
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+# orjson пишет U+2028 и U+2029 как есть, а JSONRenderer экранирует их, чтобы ответ был подмножеством JavaScript
+LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+class JSONFloat(float):
+    """
+    float, который orjson записал бы не так, как json: NaN и бесконечности (null вместо ошибки)
+    и числа в экспоненциальной записи (`1e-5` и `1e20` вместо `1e-05` и `1e+20`).
+    orjson не кодирует подклассы float сам, и ORJSONRenderer отдаёт такой ответ JSONRenderer.
+    """
+
+
+def json_float(value):
+    """
+    Значение float-поля ответа (JSONFloatField): число, которое orjson записывает так же,
+    как json, остаётся float, остальные отмечаются JSONFloat.
+    """
+    value = float(value)
+    if math.isfinite(value) and "e" not in repr(value):
+        return value
+    return JSONFloat(value)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson с тем же выводом байт в байт, что и у стандартного.
+
+    Типы, которые orjson не поддерживает (Decimal, timedelta, ленивые строки, QuerySet),
+    кодируются через default энкодера DRF, datetime в UTC записывается с `Z`, как у DRF.
+    Отступы (`; indent=4`, браузерный API), ensure_ascii, числа больше 64 бит и ответы
+    с JSONFloat кодирует стандартный JSONRenderer. float в ответах каталога отдаются только
+    через JSONFloatField (релевантность поиска): обычный float orjson записывает в своей
+    записи, поэтому полям с float нужен JSONFloatField.
+    """
+
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(data, default=self.get_default(), option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in rendered:
+                rendered = rendered.replace(separator, escaped)
+        return rendered
+
+    def get_default(self):
+        """
+        default энкодера DRF; на JSONFloat кодирование прерывается, и ответ кодирует JSONRenderer.
+        """
+        encode = self.encoder_class().default
+
+        def default(obj):
+            if isinstance(obj, JSONFloat):
+                raise TypeError("JSONFloat кодирует JSONRenderer")
+            return encode(obj)
+
+        return default
+
+
+def get_json_renderer():
+    """
+    Рендерер для JSON, который собирается вне ответа DRF (выгрузка, готовые документы).
+    """
+    return ORJSONRenderer() if settings.CATALOG_ORJSON else JSONRenderer()
@@ -0,0 +1,107 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+# Cookie клиента, который недавно писал: его запросы читают с основной БД
+PIN_COOKIE = "catalog_primary"
+
+current_database = ContextVar("current_database", default=None)
+
+
+class ReadDatabase:
+    """
+    БД для чтения в текущем запросе. alias выбирает представление (ReplicaMixin),
+    None - основная БД.
+    """
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.alias = None
+
+
+def reads_from_replica():
+    state = current_database.get()
+    return state is not None and state.alias is not None
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение запроса на реплику, выбранную представлением; запись, чтение вне
+    HTTP-запроса (команды, сигналы) и миграции идут в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_database.get()
+        return None if state is None else state.alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - физические копии основной БД, связи между их объектами допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Read-your-writes для чтения с реплик.
+
+    После успешного запроса на запись клиент получает cookie PIN_COOKIE на
+    POSTGRES_REPLICA_PIN_SECONDS секунд, и пока она есть, его запросы читают с основной
+    БД: реплики могут ещё не получить его изменения. Клиенты без cookie читают с реплик.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_database.set(ReadDatabase(PIN_COOKIE in request.COOKIES))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_database.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = current_database.set(ReadDatabase(PIN_COOKIE in request.COOKIES))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_database.reset(token)
+        return self.pin(request, response)
+
+    def pin(self, request, response):
+        if settings.CATALOG_READ_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=settings.POSTGRES_REPLICA_PIN_SECONDS, httponly=True, samesite="Lax"
+            )
+        return response
+
+
+class ReplicaMixin:
+    """
+    Чтение action из replica_actions со случайной реплики (CATALOG_READ_REPLICAS).
+    """
+
+    replica_actions = ("list", "retrieve", "export")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = current_database.get()
+        replicas = settings.CATALOG_READ_REPLICAS
+        if state is not None and not state.pinned and replicas and self.action in self.replica_actions:
+            state.alias = random.choice(replicas)
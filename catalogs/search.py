@@ -0,0 +1,180 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import F, Q, Subquery
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from catalogs.models import Album, AlbumSong, Artist, SearchEntry, Song
+from catalogs.signals import catalog_changed
+
+# Документы поисковой таблицы. Вес A - собственное название записи, B и C - названия
+# альбомов и имена исполнителей, в которые она входит: песню находит и слово из названия
+# её альбома, но ниже, чем песню с этим словом в названии.
+DOCUMENTS = {
+    SearchEntry.ARTIST: """
+        SELECT %(kind)s, artist.id, artist.name,
+               setweight(to_tsvector(%(config)s::regconfig, artist.name), 'A')
+        FROM {artist} artist
+        WHERE {condition}
+    """,
+    SearchEntry.ALBUM: """
+        SELECT %(kind)s, album.id, album.title,
+               setweight(to_tsvector(%(config)s::regconfig, album.title), 'A')
+               || setweight(to_tsvector(%(config)s::regconfig, artist.name), 'B')
+        FROM {album} album
+        JOIN {artist} artist ON artist.id = album.artist_id
+        WHERE {condition}
+    """,
+    SearchEntry.SONG: """
+        SELECT %(kind)s, song.id, song.title,
+               setweight(to_tsvector(%(config)s::regconfig, song.title), 'A')
+               || setweight(to_tsvector(%(config)s::regconfig, coalesce(string_agg(DISTINCT album.title, ' '), '')), 'B')
+               || setweight(to_tsvector(%(config)s::regconfig, coalesce(string_agg(DISTINCT artist.name, ' '), '')), 'C')
+        FROM {song} song
+        LEFT JOIN {album_song} track ON track.song_id = song.id
+        LEFT JOIN {album} album ON album.id = track.album_id
+        LEFT JOIN {artist} artist ON artist.id = album.artist_id
+        WHERE {condition}
+        GROUP BY song.id
+    """,
+}
+UPSERT = """
+    INSERT INTO {search} (kind, object_id, title, search_vector)
+    {document}
+    ON CONFLICT (kind, object_id) DO UPDATE
+    SET title = EXCLUDED.title, search_vector = EXCLUDED.search_vector
+"""
+TABLES = {
+    "artist": Artist._meta.db_table,
+    "album": Album._meta.db_table,
+    "song": Song._meta.db_table,
+    "album_song": AlbumSong._meta.db_table,
+    "search": SearchEntry._meta.db_table,
+}
+
+
+def index_entries(kind, ids=None, subquery=None):
+    """
+    Пересчитывает поисковые записи одного типа одним запросом: по списку id,
+    по SQL-подзапросу, возвращающему id (subquery), или все.
+    """
+    if ids is not None and not ids:
+        return
+    if subquery is not None:
+        condition = f"{kind}.id IN ({subquery})"
+    else:
+        condition = "TRUE" if ids is None else f"{kind}.id = ANY(%(ids)s)"
+    document = DOCUMENTS[kind].format(condition=condition, **TABLES)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT.format(document=document, **TABLES),
+            {"kind": kind, "config": settings.CATALOG_SEARCH_CONFIG, "ids": list(ids or ())},
+        )
+
+
+def remove_entries(kind, ids):
+    if ids:
+        SearchEntry.objects.filter(kind=kind, object_id__in=ids).delete()
+
+
+def rebuild_search_index():
+    """
+    Полностью перестраивает поисковую таблицу, например после загрузки данных без сигналов.
+    """
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+        for kind in DOCUMENTS:
+            index_entries(kind)
+
+
+@receiver(pre_delete, sender=Album)
+@receiver(pre_delete, sender=Artist)
+def remember_songs(sender, instance, origin=None, **kwargs):
+    # После каскадного удаления треков уже не узнать, в документы каких песен входило название.
+    # Альбомы, удаляемые вместе с исполнителем, покрываются запросом по самому исполнителю.
+    if sender is Album and isinstance(origin, Artist):
+        return
+    lookup = "album" if sender is Album else "album__artist"
+    instance._search_song_ids = set(AlbumSong.objects.filter(**{lookup: instance}).values_list("song_id", flat=True))
+
+
+@receiver(catalog_changed)
+def update_search_index(sender, instances, deleted, **kwargs):
+    """
+    Обновляет поисковые записи изменённых объектов и всех песен и альбомов,
+    в документы которых входят их названия.
+    """
+    if sender not in (Artist, Album, AlbumSong, Song):
+        return
+    ids = {instance.pk for instance in instances}
+    album_ids, song_ids = set(), set()
+    if sender is AlbumSong:
+        song_ids = {instance.song_id for instance in instances}
+    elif deleted:
+        remove_entries(sender._meta.model_name, ids)
+        for instance in instances:
+            song_ids |= getattr(instance, "_search_song_ids", set())
+    elif sender is Song:
+        song_ids = ids
+    elif sender is Album:
+        album_ids = ids
+        song_ids = set(AlbumSong.objects.filter(album_id__in=ids).values_list("song_id", flat=True))
+    elif sender is Artist:
+        index_entries(SearchEntry.ARTIST, ids)
+        album_ids = set(Album.objects.filter(artist_id__in=ids).values_list("pk", flat=True))
+        song_ids = set(AlbumSong.objects.filter(album_id__in=album_ids).values_list("song_id", flat=True))
+    index_entries(SearchEntry.ALBUM, album_ids)
+    index_entries(SearchEntry.SONG, song_ids)
+
+
+def build_search_query(text, weights="", prefix=True):
+    """
+    Запрос по всем словам строки; последнее слово ищется как префикс (prefix), чтобы поиск работал
+    по мере ввода. weights ограничивает совпадения весами вектора, например "A" - только
+    собственным названием записи. Возвращает None, если в строке нет ни одного слова.
+    """
+    words = re.findall(r"[^\W_]+", text)
+    if not words:
+        return None
+    labels = [weights] * len(words)
+    if prefix:
+        labels[-1] = f"*{weights}"
+    terms = [f"{word}:{label}" if label else word for word, label in zip(words, labels, strict=True)]
+    return SearchQuery(" & ".join(terms), config=settings.CATALOG_SEARCH_CONFIG, search_type="raw")
+
+
+# Группы кандидатов поиска от самых релевантных: все слова целиком в собственном названии,
+# то же с префиксом последнего слова, любые совпадения. Аргументы build_search_query.
+CANDIDATE_TIERS = (("A", False), ("A", True), ("", True))
+
+
+def search(text, kind=None):
+    """
+    Записи поисковой таблицы, подходящие под строку text, по убыванию релевантности.
+    Возвращает None, если в строке нет ни одного слова.
+
+    SearchRank читает вектор каждой ранжируемой записи, и запрос из частого слова или короткого
+    префикса ранжировал бы сотни тысяч строк. Поэтому кандидаты собираются группами
+    CANDIDATE_TIERS, не больше CATALOG_SEARCH_CANDIDATES из каждой: совпадения в собственном
+    названии записи попадают в ранжирование раньше, чем совпадения только в названиях альбомов
+    и именах исполнителей, которые заполняют остаток. Выдача - не больше
+    CATALOG_SEARCH_CANDIDATES лучших кандидатов. Запросы с меньшим числом совпадений
+    ранжируются полностью.
+    """
+    query = build_search_query(text)
+    if query is None:
+        return None
+    limit = settings.CATALOG_SEARCH_CANDIDATES
+    entries = SearchEntry.objects.filter(kind=kind) if kind else SearchEntry.objects.all()
+    candidates = Q()
+    for weights, prefix in CANDIDATE_TIERS:
+        tier = entries.filter(search_vector=build_search_query(text, weights, prefix))
+        candidates |= Q(pk__in=Subquery(tier.values("pk")[:limit]))
+    return (
+        SearchEntry.objects.filter(candidates)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "id")[:limit]
+    )
@@ -1,9 +1,15 @@
 import datetime
+from collections import Counter
+from contextlib import contextmanager
 
-from django.core.exceptions import ValidationError
-from rest_framework.serializers import ModelSerializer
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.serializers import CharField, FloatField, IntegerField, ListSerializer, ModelSerializer
 
-from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.models import Album, AlbumSong, Artist, ChangeEvent, Job, SearchEntry, Song
+from catalogs.renderers import json_float
+from catalogs.signals import batch_changes, catalog_changed
 
 
 class ArtistSerializer(ModelSerializer):
@@ -32,31 +38,151 @@ class SongSerializer(ModelSerializer):
         )
 
 
+def collect_pks(items, field_name):
+    """
+    Собирает из сырых данных корректные первичные ключи поля field_name.
+    """
+    pks = set()
+    for item in items if isinstance(items, list) else ():
+        pk = item.get(field_name) if isinstance(item, dict) else None
+        if isinstance(pk, int | str) and not isinstance(pk, bool) and str(pk).isdigit():
+            pks.add(int(pk))
+    return pks
+
+
+class PreloadedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    Поле первичного ключа, которое берёт объекты из `context["preloaded"][модель]`, заранее
+    заполненного списочным сериализатором одним запросом, вместо запроса на каждую запись.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get("preloaded", {}).get(self.queryset.model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return preloaded[int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class AlbumSongListSerializer(ListSerializer):
+    """
+    Списочный сериализатор треков альбома.
+
+    Песни всех треков загружаются одним запросом, номера треков проверяются одним запросом
+    для всего альбома. Ошибки возвращаются отдельно для каждого трека.
+    """
+
+    def to_internal_value(self, data):
+        self.preload_songs(data)
+        value = super().to_internal_value(data)
+        errors = self.get_track_number_errors(value)
+        if any(errors):
+            raise ValidationError(errors)
+        return value
+
+    def preload_songs(self, data):
+        preloaded = self.context.setdefault("preloaded", {})
+        # При массовой загрузке альбомов песни уже загружены для всех альбомов сразу
+        if Song not in preloaded:
+            preloaded[Song] = Song.objects.in_bulk(collect_pks(data, "song"))
+
+    def get_track_number_errors(self, value):
+        track_numbers = [item["track_number"] for item in value]
+        repeated = {number for number, count in Counter(track_numbers).items() if count > 1}
+        # Номера, уже занятые в альбоме из контекста (при добавлении треков к существующему альбому)
+        album = self.context.get("album")
+        taken = set()
+        if album is not None:
+            taken = set(
+                AlbumSong.objects.filter(album=album, track_number__in=track_numbers).values_list(
+                    "track_number", flat=True
+                )
+            )
+        errors = []
+        for number in track_numbers:
+            if number in repeated:
+                errors.append({"track_number": [f"Трек с номером {number} повторяется в списке."]})
+            elif number in taken:
+                errors.append({"track_number": [f"Трек с номером {number} уже существует в этом альбоме."]})
+            else:
+                errors.append({})
+        return errors
+
+
 class AlbumSongSerializer(ModelSerializer):
     """
     Промежуточный сериализатор альбома для action CREATE, UPDATE, PARTIAL_UPDATE, DESTROY.
     """
 
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     class Meta:
         model = AlbumSong
         fields = (
             "song",
             "track_number",
         )
+        list_serializer_class = AlbumSongListSerializer
+
+
+@contextmanager
+def atomic_write():
+    """
+    Запись в транзакции. Окончательно уникальность проверяет БД (unique_together),
+    нарушение ограничения возвращается клиенту как ошибка валидации.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError:
+        raise ValidationError({"songs": "Альбом или трек с таким номером уже существует."}) from None
 
-    def validate(self, data):
-        # Проверяем уникальность track_number для альбома
-        album = self.context.get("album")
-        track_number = data.get("track_number")
-        if (
-            album
-            and AlbumSong.objects.filter(
-                album=album,
-                track_number=track_number,
-            ).exists()
-        ):
-            raise ValidationError({"track_number": f"Трек с номером {track_number} уже существует в этом альбоме."})
-        return data
+
+def sync_tracks(tracks_by_album):
+    """
+    Приводит треклисты альбомов к переданным спискам, изменяя только отличающиеся строки.
+
+    tracks_by_album - словарь {альбом: [{"song": Song, "track_number": int}, ...]}.
+    Треки сопоставляются по track_number: лишние номера удаляются, у совпавших номеров
+    меняется песня, новые номера добавляются. Каждый вид изменений выполняется сразу
+    для всех альбомов, и catalog_changed отправляется один раз на вид изменений.
+    """
+    existing = {}
+    for track in AlbumSong.objects.filter(album__in=list(tracks_by_album)):
+        existing[track.album_id, track.track_number] = track
+    desired = {
+        (album.pk, song_data["track_number"]): (album, song_data["song"])
+        for album, songs_data in tracks_by_album.items()
+        for song_data in songs_data
+    }
+    removed = [track for key, track in existing.items() if key not in desired]
+    changed = []
+    for key, track in existing.items():
+        if key in desired and track.song_id != desired[key][1].pk:
+            track.song = desired[key][1]
+            changed.append(track)
+    added = [
+        AlbumSong(album=album, song=song, track_number=track_number)
+        for (_, track_number), (album, song) in desired.items()
+        if (album.pk, track_number) not in existing
+    ]
+    if removed:
+        # post_delete каждого трека не отправляет catalog_changed: удалённые треки - одно изменение
+        with batch_changes():
+            AlbumSong.objects.filter(pk__in=[track.pk for track in removed]).delete()
+        catalog_changed.send(sender=AlbumSong, instances=removed, deleted=True)
+    if changed:
+        AlbumSong.objects.bulk_update(changed, ["song"])
+    if added:
+        AlbumSong.objects.bulk_create(added)
+    if changed or added:
+        catalog_changed.send(sender=AlbumSong, instances=changed + added, deleted=False)
 
 
 class AlbumSongListRetrieveSerializer(ModelSerializer):
@@ -72,6 +198,7 @@ class AlbumSongListRetrieveSerializer(ModelSerializer):
             "song",
             "track_number",
         )
+        ordering = ("track_number",)
 
 
 class AlbumSerializer(ModelSerializer):
@@ -79,6 +206,7 @@ class AlbumSerializer(ModelSerializer):
     Сериализатор альбома для action CREATE, UPDATE, PARTIAL_UPDATE, DESTROY.
     """
 
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
     songs = AlbumSongSerializer(many=True, write_only=True)
 
     class Meta:
@@ -93,33 +221,30 @@ class AlbumSerializer(ModelSerializer):
 
     def validate(self, data):
         release_year = data.get("release_year")
-        songs_data = data.get("songs", [])
-        track_numbers = [s["track_number"] for s in songs_data]
         if release_year:
             if release_year < 1900:
                 raise ValidationError({"release_year": "Год выпуска альбома не может быть меньше 1900."})
             if release_year > datetime.date.today().year:
                 raise ValidationError({"release_year": "Год выпуска альбома не может быть больше текущего года."})
-        if len(track_numbers) != len(set(track_numbers)):
-            raise ValidationError({"songs": "Трек с таким номером уже есть в альбоме."})
         return data
 
     def create(self, validated_data):
         songs_data = validated_data.pop("songs")
-        album = Album.objects.create(**validated_data)
-        for song_data in songs_data:
-            AlbumSong.objects.create(album=album, **song_data)
+        with atomic_write():
+            album = Album.objects.create(**validated_data)
+            created = AlbumSong.objects.bulk_create([AlbumSong(album=album, **song_data) for song_data in songs_data])
+            if created:
+                catalog_changed.send(sender=AlbumSong, instances=created, deleted=False)
         return album
 
     def update(self, instance, validated_data):
         songs_data = validated_data.pop("songs", None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        if songs_data is not None:
-            instance.albumsong_set.all().delete()
-            for song_data in songs_data:
-                AlbumSong.objects.create(album=instance, **song_data)
+        with atomic_write():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            if songs_data is not None:
+                sync_tracks({instance: songs_data})
         return instance
 
 
@@ -135,6 +260,27 @@ class AlbumListRetvieveSerializer(AlbumSerializer):
         fields = AlbumSerializer.Meta.fields
 
 
+class AlbumSummarySerializer(ModelSerializer):
+    """
+    Краткий сериализатор альбома для карточек (`?fields=summary`).
+
+    Имя исполнителя и счётчики треков хранятся в колонках альбома, поэтому
+    представление читается из одной таблицы без треков и исполнителя.
+    """
+
+    class Meta:
+        model = Album
+        fields = (
+            "id",
+            "title",
+            "release_year",
+            "artist",
+            "artist_name",
+            "track_count",
+            "songs_count",
+        )
+
+
 class ArtistListRetrieveSerializer(ArtistSerializer):
     """
     Сериализатор Исполнителя для action LIST и RETRIEVE.
@@ -144,3 +290,77 @@ class ArtistListRetrieveSerializer(ArtistSerializer):
 
     class Meta(ArtistSerializer.Meta):
         fields = ArtistSerializer.Meta.fields + ("albums",)
+
+
+class ArtistSummarySerializer(ArtistSerializer):
+    """
+    Краткий сериализатор Исполнителя для карточек (`?fields=summary`) - без альбомов.
+    """
+
+    class Meta(ArtistSerializer.Meta):
+        fields = ArtistSerializer.Meta.fields + ("album_count",)
+
+
+class JSONFloatField(FloatField):
+    """
+    FloatField, значения которого ORJSONRenderer записывает так же, как JSONRenderer (json_float).
+    """
+
+    def to_representation(self, value):
+        return json_float(super().to_representation(value))
+
+
+class SearchEntrySerializer(ModelSerializer):
+    """
+    Сериализатор результата поиска: тип, id и название найденной записи с релевантностью.
+    """
+
+    type = CharField(source="kind")
+    id = IntegerField(source="object_id")
+    rank = JSONFloatField()
+
+    class Meta:
+        model = SearchEntry
+        fields = (
+            "type",
+            "id",
+            "title",
+            "rank",
+        )
+
+
+class JobSerializer(ModelSerializer):
+    """
+    Сериализатор фоновой задачи для ответа 202 и action LIST и RETRIEVE задач.
+    """
+
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "kind",
+            "status",
+            "result",
+            "attempts",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+
+
+class ChangeEventSerializer(ModelSerializer):
+    """
+    Сериализатор события журнала изменений для ленты `/changes/`.
+    """
+
+    sequence = CharField(read_only=True)
+
+    class Meta:
+        model = ChangeEvent
+        fields = (
+            "sequence",
+            "model",
+            "object_id",
+            "deleted",
+            "created_at",
+        )
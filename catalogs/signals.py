@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+
+# Единый сигнал об изменении каталога: sender - модель, instances - изменённые объекты, deleted - удаление.
+# Массовые операции (bulk_create, bulk_update, update) сигналы моделей не вызывают,
+# поэтому они должны отправлять catalog_changed сами.
+catalog_changed = Signal()
+# Внутри batch_changes сигналы моделей не отправляют catalog_changed за каждый объект
+sending_batch = ContextVar("sending_batch", default=False)
+
+
+@contextmanager
+def batch_changes():
+    """
+    Изменения объектов по одному (например, удаление по queryset, которое вызывает post_delete
+    для каждой строки) без catalog_changed на каждый объект: вызывающий код отправляет
+    его сам одним вызовом для всех объектов.
+    """
+    token = sending_batch.set(True)
+    try:
+        yield
+    finally:
+        sending_batch.reset(token)
+
+
+def get_affected_parents(sender, instances):
+    """
+    Возвращает id альбомов и исполнителей, представление которых включает изменённые объекты.
+    """
+    album_ids = set()
+    artist_ids = set()
+    if sender is AlbumSong:
+        album_ids = {instance.album_id for instance in instances}
+    elif sender is Album:
+        # Если альбом перенесли к другому исполнителю, меняется и представление прежнего исполнителя
+        artist_ids = {instance.artist_id for instance in instances}
+        artist_ids |= {getattr(instance, "_loaded_artist_id", None) for instance in instances} - {None}
+    elif sender is Song:
+        song_ids = [instance.pk for instance in instances]
+        album_ids = set(AlbumSong.objects.filter(song_id__in=song_ids).values_list("album_id", flat=True))
+    if album_ids:
+        artist_ids |= set(Album.objects.filter(pk__in=album_ids).values_list("artist_id", flat=True))
+    return album_ids, artist_ids
+
+
+@receiver(post_init, sender=Album)
+def remember_album_artist(sender, instance, **kwargs):
+    instance._loaded_artist_id = instance.artist_id
+
+
+@receiver(catalog_changed)
+def touch_parents(sender, instances, deleted, **kwargs):
+    """
+    Обновляет updated_at у альбомов и исполнителей, в которые вложены изменённые объекты.
+    Альбом выводит своего исполнителя, поэтому изменение исполнителя обновляет и его альбомы.
+    """
+    album_ids, artist_ids = get_affected_parents(sender, instances)
+    now = timezone.now()
+    if sender is Artist and not deleted:
+        Album.objects.filter(artist__in=instances).update(updated_at=now)
+    if album_ids:
+        Album.objects.filter(pk__in=album_ids).update(updated_at=now)
+    if artist_ids:
+        Artist.objects.filter(pk__in=artist_ids).update(updated_at=now)
+
+
+@receiver(post_save, sender=Artist)
+@receiver(post_save, sender=Album)
+@receiver(post_save, sender=AlbumSong)
+@receiver(post_save, sender=Song)
+def instance_saved(sender, instance, raw=False, **kwargs):
+    if not raw and not sending_batch.get():
+        catalog_changed.send(sender=sender, instances=[instance], deleted=False)
+
+
+@receiver(post_delete, sender=Artist)
+@receiver(post_delete, sender=Album)
+@receiver(post_delete, sender=AlbumSong)
+@receiver(post_delete, sender=Song)
+def instance_deleted(sender, instance, origin=None, **kwargs):
+    # Треки, удалённые каскадом вместе с альбомом или исполнителем, покрываются сигналом самого родителя
+    if sending_batch.get() or (sender is AlbumSong and isinstance(origin, Album | Artist)):
+        return
+    catalog_changed.send(sender=sender, instances=[instance], deleted=True)
+
+
+@receiver(m2m_changed, sender=AlbumSong)
+def album_songs_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    lookup, other = ("song", "album") if reverse else ("album", "song")
+    if action == "pre_clear":
+        # После очистки связей уже не узнать, какие альбомы были затронуты
+        instance._cleared_album_songs = list(AlbumSong.objects.filter(**{lookup: instance}))
+        return
+    if action == "post_clear":
+        instances = getattr(instance, "_cleared_album_songs", [])
+    elif action in ("post_add", "post_remove"):
+        instances = [AlbumSong(**{f"{lookup}_id": instance.pk, f"{other}_id": pk}) for pk in pk_set]
+    else:
+        return
+    catalog_changed.send(sender=AlbumSong, instances=instances, deleted=action != "post_add")
@@ -0,0 +1,267 @@
+import json
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, prefetch_related_objects
+from django.db.models.query import aprefetch_related_objects
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from catalogs.fast import get_encoder
+from catalogs.jobs import enqueue
+from catalogs.metrics import measure_serializer
+from catalogs.models import Album, AlbumSong, Artist, Snapshot, Song
+from catalogs.prefetch import build_queryset, get_related_lookups
+from catalogs.renderers import get_json_renderer
+from catalogs.serializers import AlbumListRetvieveSerializer, ArtistListRetrieveSerializer
+from catalogs.signals import catalog_changed, get_affected_parents
+
+logger = logging.getLogger(__name__)
+
+# Модель и сериализатор LIST и RETRIEVE, по которому строится документ каждого типа
+SNAPSHOTS = {
+    Snapshot.ARTIST: (Artist, ArtistListRetrieveSerializer),
+    Snapshot.ALBUM: (Album, AlbumListRetvieveSerializer),
+}
+BATCH_SIZE = 500
+# Документ, построенный раньше уже сохранённого (параллельные коммиты), не перезаписывает его
+UPSERT = """
+    INSERT INTO {snapshot} (kind, object_id, content, source_updated_at)
+    SELECT %(kind)s, * FROM unnest(%(ids)s::bigint[], %(contents)s::bytea[], %(updated_at)s::timestamptz[])
+    ON CONFLICT (kind, object_id) DO UPDATE
+    SET content = EXCLUDED.content, source_updated_at = EXCLUDED.source_updated_at
+    WHERE {snapshot}.source_updated_at <= EXCLUDED.source_updated_at
+"""
+
+
+def get_document_encoder(serializer_class):
+    """
+    Функция instance -> bytes: JSON записи в том же виде, что и ответ RETRIEVE.
+    """
+    renderer = get_json_renderer()
+    if settings.CATALOG_FAST_SERIALIZERS:
+        encode = get_encoder(serializer_class)
+    else:
+        encode = serializer_class().to_representation
+    return lambda instance: renderer.render(encode(instance))
+
+
+def build_snapshots(kind, ids):
+    """
+    Строит и сохраняет документы записей kind с переданными id порциями по BATCH_SIZE.
+
+    updated_at каждой записи читается основным запросом раньше связей, поэтому документ
+    может оказаться только новее своей метки, но не старше: изменение, закоммиченное между
+    запросами, меняет и updated_at, и такой документ просто считается устаревшим.
+    """
+    model, serializer_class = SNAPSHOTS[kind]
+    encode = get_document_encoder(serializer_class)
+    ids = sorted(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        instances = list(
+            build_queryset(serializer_class, queryset=model.objects.filter(pk__in=ids[start : start + BATCH_SIZE]))
+        )
+        if not instances:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                UPSERT.format(snapshot=Snapshot._meta.db_table),
+                {
+                    "kind": kind,
+                    "ids": [instance.pk for instance in instances],
+                    "contents": [encode(instance) for instance in instances],
+                    "updated_at": [instance.updated_at for instance in instances],
+                },
+            )
+
+
+def remove_snapshots(kind, ids):
+    if ids:
+        Snapshot.objects.filter(kind=kind, object_id__in=ids).delete()
+
+
+def rebuild_snapshots():
+    """
+    Строит документы всех исполнителей и альбомов и удаляет документы удалённых записей,
+    например после загрузки данных без сигналов или включения CATALOG_SNAPSHOTS.
+    """
+    for kind, (model, _) in SNAPSHOTS.items():
+        Snapshot.objects.filter(kind=kind).exclude(object_id__in=Subquery(model.objects.values("pk"))).delete()
+        build_snapshots(kind, list(model.objects.values_list("pk", flat=True)))
+
+
+def build_after_commit(album_ids, artist_ids):
+    # Ошибка построения не должна превращать уже закоммиченную запись в ошибку запроса:
+    # устаревший документ не отдаётся, вместо него запись сериализуется заново
+    try:
+        build_snapshots(Snapshot.ALBUM, album_ids)
+        build_snapshots(Snapshot.ARTIST, artist_ids)
+    except Exception:
+        logger.exception("Не удалось построить снимки представлений")
+
+
+@receiver(catalog_changed)
+def update_snapshots(sender, instances, deleted, **kwargs):
+    """
+    Удаляет документы удалённых записей и после коммита перестраивает документы
+    исполнителей и альбомов, в которые входят изменённые объекты.
+    """
+    if not settings.CATALOG_SNAPSHOTS or sender not in (Artist, Album, AlbumSong, Song):
+        return
+    ids = {instance.pk for instance in instances}
+    album_ids, artist_ids = get_affected_parents(sender, instances)
+    if sender is Artist:
+        if deleted:
+            remove_snapshots(Snapshot.ARTIST, ids)
+        else:
+            artist_ids |= ids
+            album_ids |= set(Album.objects.filter(artist_id__in=ids).values_list("pk", flat=True))
+    elif sender is Album:
+        if deleted:
+            remove_snapshots(Snapshot.ALBUM, ids)
+        else:
+            album_ids |= ids
+    schedule_snapshots(album_ids, artist_ids)
+
+
+def schedule_snapshots(album_ids, artist_ids):
+    """
+    Планирует построение документов: после коммита в том же процессе или задачей
+    фоновой очереди (CATALOG_SNAPSHOTS_BACKGROUND), которая коммитится вместе с изменением.
+    """
+    if not album_ids and not artist_ids:
+        return
+    if settings.CATALOG_SNAPSHOTS_BACKGROUND:
+        enqueue("snapshots", {"albums": sorted(album_ids), "artists": sorted(artist_ids)})
+    else:
+        transaction.on_commit(lambda: build_after_commit(album_ids, artist_ids))
+
+
+def annotate_snapshots(queryset, kind):
+    """
+    Добавляет к записям действительный документ (`snapshot`) или None, если документа
+    нет или он построен по другой версии записи.
+    """
+    documents = Snapshot.objects.filter(kind=kind, object_id=OuterRef("pk"), source_updated_at=OuterRef("updated_at"))
+    return queryset.annotate(snapshot=Subquery(documents.values("content")))
+
+
+class DocumentResponse(Response):
+    """
+    Ответ с готовым JSON-телом: рендерер его не вызывается, а data декодируется
+    из тела только по требованию (браузерный API, тесты).
+    """
+
+    def __init__(self, document, object_ids, **kwargs):
+        self.document = document
+        self.object_ids = object_ids
+        self._data = None
+        super().__init__(None, **kwargs)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.document)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        self["Content-Type"] = self.accepted_renderer.media_type
+        return self.document
+
+
+class SnapshotMixin:
+    """
+    LIST и RETRIEVE из готовых документов (CATALOG_SNAPSHOTS).
+
+    Страница выбирается обычным запросом с фильтрами и пагинацией, документ добавляется
+    к каждой записи подзапросом, и тело ответа собирается из байтов документов без
+    вложенных объектов и сериализации. Записи без действительного документа
+    сериализуются как обычно, недостающие связи загружаются только для них.
+    Выбор полей (fields, expand, depth) и форматы кроме JSON идут обычным путём.
+    """
+
+    snapshot_kind = None
+
+    def uses_snapshots(self):
+        request = self.request
+        return (
+            settings.CATALOG_SNAPSHOTS
+            and self.action in ("list", "retrieve")
+            and isinstance(getattr(request, "accepted_renderer", None), JSONRenderer)
+            and self.get_serializer_class() is SNAPSHOTS[self.snapshot_kind][1]
+            and self.get_field_selection() is None
+        )
+
+    def get_queryset(self):
+        if not self.uses_snapshots():
+            return super().get_queryset()
+        # Связи загружаются только для записей без действительного документа, см. get_fallback_lookups
+        queryset = super().get_queryset().select_related(None).prefetch_related(None)
+        return annotate_snapshots(queryset, self.snapshot_kind)
+
+    def list(self, request, *args, **kwargs):
+        if not self.uses_snapshots():
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        stale = self.get_stale(page)
+        prefetch_related_objects(stale, *self.get_fallback_lookups())
+        return self.get_document_response(page, many=True)
+
+    async def alist(self, request, *args, **kwargs):
+        if not self.uses_snapshots():
+            return await super().alist(request, *args, **kwargs)
+        queryset = await self.afilter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        await aprefetch_related_objects(self.get_stale(page), *self.get_fallback_lookups())
+        return self.get_document_response(page, many=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.uses_snapshots():
+            return super().retrieve(request, *args, **kwargs)
+        instance = self.get_object()
+        prefetch_related_objects(self.get_stale([instance]), *self.get_fallback_lookups())
+        return self.get_document_response([instance])
+
+    async def aretrieve(self, request, *args, **kwargs):
+        if not self.uses_snapshots():
+            return await super().aretrieve(request, *args, **kwargs)
+        instance = await self.aget_object()
+        await aprefetch_related_objects(self.get_stale([instance]), *self.get_fallback_lookups())
+        return self.get_document_response([instance])
+
+    @staticmethod
+    def get_stale(instances):
+        return [instance for instance in instances if instance.snapshot is None]
+
+    def get_fallback_lookups(self):
+        # Записи уже загружены, поэтому связи, которые обычно идут в select_related,
+        # догружаются отдельным запросом вместе с остальными
+        select_related, prefetch_related = get_related_lookups(self.get_serializer_class()())
+        return [*select_related, *prefetch_related]
+
+    def get_document_response(self, instances, many=False):
+        encode = None
+        documents = []
+        with measure_serializer():
+            for instance in instances:
+                if instance.snapshot is None:
+                    encode = encode or get_document_encoder(self.get_serializer_class())
+                    documents.append(encode(instance))
+                else:
+                    documents.append(bytes(instance.snapshot))
+        ids = [instance.pk for instance in instances]
+        if not many:
+            return DocumentResponse(documents[0], ids)
+        # Конверт пагинации рендерится как обычно, а список документов дописывается в него байтами
+        envelope = self.paginator.get_paginated_response([]).data
+        del envelope["results"]
+        renderer = self.request.accepted_renderer
+        head = renderer.render(envelope, self.request.accepted_media_type, self.get_renderer_context())
+        return DocumentResponse(head[:-1] + b',"results":[' + b",".join(documents) + b"]}", ids)
@@ -0,0 +1,87 @@
+from django.db import connection, transaction
+from django.dispatch import receiver
+
+from catalogs.models import Album, AlbumSong, Artist
+from catalogs.signals import catalog_changed
+
+# Пересчёт сводных колонок. Строки сначала блокируются: подзапрос UPDATE видит снимок
+# начала запроса, и без блокировки параллельная транзакция, добавившая треки в тот же
+# альбом, могла бы закоммититься между снимком и записью. FOR NO KEY UPDATE не конфликтует
+# с блокировкой FK, которую берут вставки треков и альбомов, поэтому взаимоблокировки нет.
+SUMMARIES = {
+    "album": (
+        "SELECT 1 FROM {album} album WHERE {condition} ORDER BY album.id FOR NO KEY UPDATE",
+        """
+        UPDATE {album} album
+        SET artist_name = artist.name,
+            (track_count, songs_count) = (
+                SELECT count(*), count(DISTINCT track.song_id)
+                FROM {album_song} track WHERE track.album_id = album.id
+            )
+        FROM {artist} artist
+        WHERE artist.id = album.artist_id AND {condition}
+        """,
+    ),
+    "artist": (
+        "SELECT 1 FROM {artist} artist WHERE {condition} ORDER BY artist.id FOR NO KEY UPDATE",
+        """
+        UPDATE {artist} artist
+        SET album_count = (SELECT count(*) FROM {album} album WHERE album.artist_id = artist.id)
+        WHERE {condition}
+        """,
+    ),
+}
+TABLES = {
+    "artist": Artist._meta.db_table,
+    "album": Album._meta.db_table,
+    "album_song": AlbumSong._meta.db_table,
+}
+
+
+def update_summaries(kind, ids=None, subquery=None, condition=None):
+    """
+    Пересчитывает сводные колонки альбомов (artist_name, track_count, songs_count) или
+    исполнителей (album_count) одним запросом: по списку id, по SQL-подзапросу,
+    возвращающему id (subquery), по готовому условию на строку `kind` или все.
+    """
+    if ids is not None and not ids:
+        return
+    if subquery is not None:
+        condition = f"{kind}.id IN ({subquery})"
+    elif condition is None:
+        condition = "TRUE" if ids is None else f"{kind}.id = ANY(%(ids)s)"
+    with connection.cursor() as cursor:
+        for sql in SUMMARIES[kind]:
+            cursor.execute(sql.format(condition=condition, **TABLES), {"ids": list(ids or ())})
+
+
+def rebuild_summaries():
+    """
+    Пересчитывает сводные колонки всего каталога, например после загрузки данных без сигналов.
+    """
+    with transaction.atomic():
+        update_summaries("album")
+        update_summaries("artist")
+
+
+@receiver(catalog_changed)
+def update_changed_summaries(sender, instances, deleted, **kwargs):
+    """
+    Пересчитывает сводки альбомов и исполнителей, затронутых изменением, в той же транзакции.
+    Пересчитываются и сами сохранённые записи: save() пишет все колонки, в том числе
+    сводные значения, прочитанные до изменения треков.
+    """
+    ids = [instance.pk for instance in instances]
+    if sender is AlbumSong:
+        update_summaries("album", {instance.album_id for instance in instances})
+    elif sender is Album:
+        if not deleted:
+            update_summaries("album", ids)
+        # Перенос альбома меняет количество альбомов и у прежнего исполнителя
+        artist_ids = {instance.artist_id for instance in instances}
+        artist_ids |= {getattr(instance, "_loaded_artist_id", None) for instance in instances} - {None}
+        update_summaries("artist", artist_ids)
+    elif sender is Artist and not deleted:
+        # Имя исполнителя скопировано в его альбомы
+        update_summaries("album", ids, condition="album.artist_id = ANY(%(ids)s)")
+        update_summaries("artist", ids)
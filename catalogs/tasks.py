@@ -0,0 +1,57 @@
+from catalogs.bulk import AlbumBulkSerializer, ArtistBulkSerializer, SongBulkSerializer, get_bulk_result
+from catalogs.conditional import PreconditionFailed, etag_matches, make_etag
+from catalogs.jobs import task
+from catalogs.models import Snapshot
+from catalogs.serializers import AlbumSerializer, ArtistSerializer, SongSerializer
+from catalogs.snapshots import build_snapshots
+
+# Сериализаторы записи по имени модели из параметров задачи
+WRITE_SERIALIZERS = {
+    "artist": ArtistSerializer,
+    "album": AlbumSerializer,
+    "song": SongSerializer,
+}
+BULK_SERIALIZERS = {
+    "artist": ArtistBulkSerializer,
+    "album": AlbumBulkSerializer,
+    "song": SongBulkSerializer,
+}
+
+
+@task("write")
+def write(payload):
+    """
+    Создание (pk None) или изменение записи, как в CREATE, UPDATE и PARTIAL_UPDATE.
+
+    ETag из If-Match запроса сверяется с записью, заблокированной до конца задачи:
+    если запись изменили после постановки задачи в очередь, задача завершается ошибкой 412.
+    """
+    serializer_class = WRITE_SERIALIZERS[payload["model"]]
+    instance = None
+    if payload["pk"] is not None:
+        instance = serializer_class.Meta.model.objects.select_for_update().get(pk=payload["pk"])
+        if_match = payload.get("if_match")
+        if if_match is not None and not etag_matches(if_match, make_etag(instance.pk, instance.updated_at)):
+            raise PreconditionFailed()
+    serializer = serializer_class(instance, data=payload["data"], partial=payload["partial"])
+    serializer.is_valid(raise_exception=True)
+    return {"id": serializer.save().pk}
+
+
+@task("bulk")
+def bulk(payload):
+    """
+    Массовая запись списка объектов; результат в том же виде, что и ответ action `bulk`.
+    """
+    serializer = BULK_SERIALIZERS[payload["model"]](data=payload["items"], many=True)
+    return get_bulk_result(serializer.save_items())
+
+
+@task("snapshots")
+def snapshots(payload):
+    """
+    Перестраивает готовые документы альбомов и исполнителей (CATALOG_SNAPSHOTS_BACKGROUND).
+    """
+    build_snapshots(Snapshot.ALBUM, payload["albums"])
+    build_snapshots(Snapshot.ARTIST, payload["artists"])
+    return {"albums": len(payload["albums"]), "artists": len(payload["artists"])}
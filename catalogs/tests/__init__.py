@@ -0,0 +1,25 @@
+from asgiref.sync import async_to_sync
+from django.test import override_settings
+
+# Тесты чтения каталога не зависят от .env: ответы не приходят из кэша предыдущих тестов,
+# данные TestCase из незавершённой транзакции читаются с основной БД (реплике они не видны),
+# а превышение бюджета SQL-запросов завершает запрос ошибкой
+catalog_reads = override_settings(
+    CATALOG_CACHE_ENABLED=False,
+    CATALOG_QUERY_BUDGET_STRICT=True,
+    CATALOG_READ_REPLICAS=[],
+)
+
+
+def read_chunks(response):
+    """
+    Порции потокового ответа. При CATALOG_ASYNC_VIEWS=True выгрузку отдаёт асинхронное
+    представление, и его поток читается в цикле событий.
+    """
+    if not response.is_async:
+        return list(response.streaming_content)
+
+    async def collect():
+        return [chunk async for chunk in response.streaming_content]
+
+    return async_to_sync(collect)()
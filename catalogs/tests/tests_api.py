@@ -4,8 +4,10 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.tests import catalog_reads
 
 
+@catalog_reads
 class TestArtistAPI(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -44,6 +46,7 @@ class TestArtistAPI(TestCase):
         self.assertEqual(self.artist.name, "Обновлённый Исполнитель")
 
 
+@catalog_reads
 class TestSongAPI(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -70,6 +73,7 @@ class TestSongAPI(TestCase):
         self.assertEqual(self.song.title, "Обновлённая Песня")
 
 
+@catalog_reads
 class TestAlbumAPI(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -130,6 +134,22 @@ class TestAlbumAPI(TestCase):
         }
         response = self.client.post(reverse("album-list"), data, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("track_number", response.data["songs"][1])
+
+    def test_create_album_unknown_song(self):
+        data = {
+            "title": "Новый Альбом",
+            "release_year": 2021,
+            "artist": self.artist.id,
+            "songs": [
+                {"song": self.song1.id, "track_number": 1},
+                {"song": 0, "track_number": 2},
+            ],
+        }
+        response = self.client.post(reverse("album-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["songs"][0], {})
+        self.assertIn("song", response.data["songs"][1])
 
     def test_update_album(self):
         data = {
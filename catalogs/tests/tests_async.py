@@ -0,0 +1,109 @@
+import gzip
+import json
+from io import StringIO
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import include, path, resolve, reverse
+from rest_framework.routers import DefaultRouter
+
+from catalogs.models import Album, AlbumSong, Artist, Snapshot, Song
+from catalogs.tests import catalog_reads
+from catalogs.views import AlbumViewSet, ArtistViewSet, SongViewSet
+
+# Те же маршруты каталога, что и в catalogs.urls, но с асинхронными представлениями чтения
+with override_settings(CATALOG_ASYNC_VIEWS=True):
+    router = DefaultRouter()
+    router.register(r"artists", ArtistViewSet)
+    router.register(r"albums", AlbumViewSet)
+    router.register(r"songs", SongViewSet)
+    urlpatterns = [path("api/v1/catalogs/", include(router.urls))]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+@catalog_reads
+class TestAsyncViews(TestCase):
+    def setUp(self):
+        self.async_client = AsyncClient()
+        songs = [Song.objects.create(title=f"Песня {index}") for index in range(4)]
+        self.artist = Artist.objects.create(name="Исполнитель")
+        Artist.objects.create(name="Другой исполнитель")
+        self.album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        for number, song in enumerate(songs, start=1):
+            AlbumSong.objects.create(album=self.album, song=song, track_number=number)
+        Album.objects.create(title="Сингл", release_year=2021, artist=self.artist)
+
+    def get_sync(self, url, params=None, **kwargs):
+        with self.settings(ROOT_URLCONF="config.urls"):
+            return self.client.get(url, params, **kwargs)
+
+    async def assert_same(self, url, params=None):
+        expected = await sync_to_async(self.get_sync)(url, params)
+        response = await self.async_client.get(url, params)
+        self.assertEqual(response.status_code, expected.status_code, url)
+        self.assertEqual(response.json(), expected.json(), url)
+        return response
+
+    def test_read_views_are_async(self):
+        self.assertTrue(iscoroutinefunction(resolve(reverse("album-list")).func))
+        self.assertTrue(iscoroutinefunction(resolve(reverse("song-detail", args=[1])).func))
+        self.assertFalse(iscoroutinefunction(resolve(reverse("album-bulk")).func))
+
+    async def test_same_responses(self):
+        await self.assert_same(reverse("artist-list"))
+        await self.assert_same(reverse("album-list"), {"artist": self.artist.id, "ordering": "-title"})
+        await self.assert_same(reverse("album-list"), {"artist": 0})
+        await self.assert_same(reverse("song-list"), {"limit": 2, "offset": 1, "count": "none"})
+        await self.assert_same(reverse("song-list"), {"title__icontains": "песня", "count": "bad"})
+        await self.assert_same(reverse("album-detail", args=[self.album.id]))
+        await self.assert_same(reverse("artist-detail", args=[0]))
+
+    async def test_cursor_pages(self):
+        response = await self.assert_same(reverse("song-list"), {"limit": 3, "cursor": ""})
+        response = await self.assert_same(response.json()["next"])
+        self.assertEqual([song["title"] for song in response.json()["results"]], ["Песня 3"])
+
+    async def test_not_modified(self):
+        url = reverse("album-detail", args=[self.album.id])
+        etag = (await self.async_client.get(url))["ETag"]
+        response = await self.async_client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(CATALOG_CACHE_ENABLED=True)
+    async def test_cache(self):
+        await caches["catalog"].aclear()
+        url = reverse("artist-detail", args=[self.artist.id])
+        self.assertEqual((await self.async_client.get(url))["X-Cache"], "MISS")
+        response = await self.async_client.get(url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json()["name"], "Исполнитель")
+
+    async def test_export(self):
+        response = await self.async_client.get(reverse("album-export"))
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) async for line in response.streaming_content]
+        self.assertEqual([line["title"] for line in lines], ["Альбом", "Сингл"])
+        self.assertEqual(len(lines[0]["songs"]), 4)
+        response = await self.async_client.get(reverse("album-export"), headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        content = gzip.decompress(b"".join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual([json.loads(line)["title"] for line in content.splitlines()], ["Альбом", "Сингл"])
+
+    async def test_write_uses_sync_view(self):
+        response = await self.async_client.post(
+            reverse("song-list"), {"title": "Новая песня"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Song.objects.filter(title="Новая песня").aexists())
+
+    @override_settings(CATALOG_SNAPSHOTS=True)
+    async def test_snapshots(self):
+        await sync_to_async(call_command)("rebuild_snapshots", stdout=StringIO())
+        # Альбом без документа сериализуется по ходу запроса
+        await Snapshot.objects.filter(object_id=self.album.id, kind=Snapshot.ALBUM).adelete()
+        await self.assert_same(reverse("album-list"), {"limit": 1, "cursor": ""})
+        await self.assert_same(reverse("album-list"))
+        await self.assert_same(reverse("artist-detail", args=[self.artist.id]))
+        await self.assert_same(reverse("album-detail", args=[self.album.id]))
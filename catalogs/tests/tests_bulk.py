@@ -0,0 +1,105 @@
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+
+
+class TestBulkArtists(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Существующий")
+
+    def test_bulk_upsert(self):
+        data = [{"name": "Существующий"}, {"name": "Новый"}, {"name": ""}]
+        response = self.client.post(reverse("artist-bulk"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["created"], response.data["updated"], response.data["errors"]), (1, 1, 1))
+        results = response.data["results"]
+        self.assertEqual(results[0], {"status": "updated", "id": self.artist.id})
+        self.assertEqual(results[1]["status"], "created")
+        self.assertIn("name", results[2]["errors"])
+        self.assertEqual(Artist.objects.count(), 2)
+
+    def test_bulk_duplicates_in_request(self):
+        data = [{"name": "Повтор"}, {"name": "Повтор"}]
+        response = self.client.post(reverse("artist-bulk"), data, format="json")
+        self.assertEqual([result["status"] for result in response.data["results"]], ["error", "created"])
+        self.assertEqual(Artist.objects.filter(name="Повтор").count(), 1)
+
+    def test_bulk_ndjson(self):
+        body = "\n".join(json.dumps({"name": f"Исполнитель {index}"}) for index in range(3))
+        response = self.client.post(reverse("artist-bulk"), body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 3)
+
+    def test_bulk_not_a_list(self):
+        response = self.client.post(reverse("artist-bulk"), {"name": "Один"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_all_invalid(self):
+        response = self.client.post(reverse("artist-bulk"), [{"name": ""}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestBulkSongs(TestCase):
+    def test_bulk_create(self):
+        data = [{"title": f"Песня {index}"} for index in range(50)]
+        response = APIClient().post(reverse("song-bulk"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 50)
+        self.assertEqual(Song.objects.count(), 50)
+
+
+class TestBulkAlbums(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.songs = Song.objects.bulk_create([Song(title=f"Песня {index}") for index in range(10)])
+        self.album = Album.objects.create(title="Альбом 0", release_year=2000, artist=self.artist)
+        AlbumSong.objects.create(album=self.album, song=self.songs[0], track_number=1)
+
+    def albums(self, count, tracks):
+        return [
+            {
+                "title": f"Альбом {index}",
+                "release_year": 2020,
+                "artist": self.artist.id,
+                "songs": [{"song": song.id, "track_number": number} for number, song in enumerate(tracks, start=1)],
+            }
+            for index in range(count)
+        ]
+
+    def test_bulk_upsert(self):
+        response = self.client.post(reverse("album-bulk"), self.albums(3, self.songs[1:4]), format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["created"], response.data["updated"]), (2, 1))
+        self.assertEqual(response.data["results"][0]["id"], self.album.id)
+        self.album.refresh_from_db()
+        self.assertEqual(self.album.release_year, 2020)
+        self.assertEqual(
+            list(self.album.albumsong_set.order_by("track_number").values_list("song_id", flat=True)),
+            [song.id for song in self.songs[1:4]],
+        )
+
+    def test_bulk_item_errors(self):
+        data = self.albums(2, self.songs[:2])
+        data[1]["songs"][1]["song"] = 0
+        response = self.client.post(reverse("album-bulk"), data, format="json")
+        self.assertEqual(response.data["results"][0]["status"], "updated")
+        self.assertEqual(response.data["results"][1]["status"], "error")
+        self.assertIn("songs", response.data["results"][1]["errors"])
+
+    def test_bulk_queries_do_not_depend_on_item_count(self):
+        counts = []
+        for count in (2, 20):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse("album-bulk"), self.albums(count, self.songs), format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
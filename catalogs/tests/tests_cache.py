@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalogs.cache import CacheResponseMixin, get_cache_metrics
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.tests import catalog_reads
+
+
+@override_settings(CATALOG_CACHE_ENABLED=True)
+@catalog_reads
+class TestResponseCache(TestCase):
+    def setUp(self):
+        caches["catalog"].clear()
+        self.client = APIClient()
+        self.song = Song.objects.create(title="Песня")
+        self.other_song = Song.objects.create(title="Другая песня")
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.other_artist = Artist.objects.create(name="Другой исполнитель")
+        self.album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.create(album=self.album, song=self.song, track_number=1)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hit_after_miss(self):
+        url = reverse("artist-detail", args=[self.artist.id])
+        self.assertEqual(self.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.get(url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json()["name"], "Исполнитель")
+        self.assertEqual(get_cache_metrics()["hit"], 1)
+
+    def test_params_are_normalized(self):
+        url = reverse("album-list")
+        self.get(url, limit=5, offset=0)
+        self.assertEqual(self.client.get(f"{url}?offset=0&limit=5&title=")["X-Cache"], "HIT")
+
+    def test_song_change_invalidates_only_containing_entities(self):
+        artist_url = reverse("artist-detail", args=[self.artist.id])
+        other_url = reverse("artist-detail", args=[self.other_artist.id])
+        album_url = reverse("album-detail", args=[self.album.id])
+        for url in (artist_url, other_url, album_url):
+            self.get(url)
+        self.song.title = "Новое название"
+        self.song.save()
+        self.assertEqual(self.get(other_url)["X-Cache"], "HIT")
+        response = self.get(artist_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["albums"][0]["songs"][0]["song"]["title"], "Новое название")
+        self.assertEqual(self.get(album_url)["X-Cache"], "MISS")
+
+    def test_write_between_read_and_store(self):
+        url = reverse("artist-detail", args=[self.artist.id])
+        store_response = CacheResponseMixin.store_response
+
+        def store_after_write(view, response, *args):
+            # Запись коммитится после того, как представление прочитало данные, но до сохранения ответа
+            if self.artist.name == "Исполнитель":
+                self.artist.name = "Новое имя"
+                self.artist.save()
+            return store_response(view, response, *args)
+
+        # Запросы записи попадают в бюджет чтения, поэтому он не проверяется
+        with (
+            mock.patch.object(CacheResponseMixin, "store_response", store_after_write),
+            override_settings(CATALOG_QUERY_BUDGET_STRICT=False),
+        ):
+            self.assertEqual(self.get(url).data["name"], "Исполнитель")
+        response = self.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["name"], "Новое имя")
+
+    def test_artist_rename_invalidates_albums(self):
+        album_url = reverse("album-detail", args=[self.album.id])
+        self.get(album_url)
+        self.artist.name = "Новое имя"
+        self.artist.save()
+        self.assertEqual(self.get(album_url).data["artist"]["name"], "Новое имя")
+
+    def test_track_change_invalidates_album_list(self):
+        url = reverse("album-list")
+        self.get(url)
+        self.album.songs.add(self.other_song, through_defaults={"track_number": 2})
+        response = self.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"][0]["songs"]), 2)
+
+    def test_create_invalidates_list(self):
+        url = reverse("song-list")
+        self.get(url)
+        self.client.post(url, {"title": "Третья песня"})
+        self.assertEqual(self.get(url).data["count"], 3)
+
+    def test_browsable_api_is_not_cached(self):
+        url = reverse("song-list")
+        self.client.get(url, HTTP_ACCEPT="text/html")
+        self.assertNotIn("X-Cache", self.client.get(url, HTTP_ACCEPT="text/html"))
@@ -0,0 +1,114 @@
+import datetime
+import threading
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.changes import purge_changes
+from catalogs.models import Album, AlbumSong, Artist, ChangeEvent, Song
+from catalogs.tests import catalog_reads
+
+
+@catalog_reads
+class TestChangeFeed(TransactionTestCase):
+    # Лента отдаёт только события завершённых транзакций, а TestCase не коммитит свою
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("change-list")
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.song = Song.objects.create(title="Песня")
+        self.album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.create(album=self.album, song=self.song, track_number=1)
+
+    def read(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def read_all(self, url, limit=None):
+        """
+        Читает ленту порциями до конца и возвращает события и ссылку для следующего опроса.
+        """
+        events = []
+        data = self.read(url if limit is None else f"{url}?limit={limit}")
+        events.extend(data["results"])
+        while data["has_more"]:
+            data = self.read(data["next"])
+            events.extend(data["results"])
+        return [(event["model"], event["object_id"], event["deleted"]) for event in events], data["next"]
+
+    def test_sync(self):
+        events, next_url = self.read_all(self.url, limit=2)
+        self.assertEqual(
+            set(events),
+            {("artist", self.artist.id, False), ("song", self.song.id, False), ("album", self.album.id, False)},
+        )
+        self.assertEqual(self.read(next_url)["results"], [])
+
+        # Песня вложена в альбом и исполнителя: потребитель узнаёт, что перечитать их тоже
+        self.song.title = "Новое название"
+        self.song.save()
+        events, next_url = self.read_all(next_url)
+        self.assertEqual(
+            set(events),
+            {("song", self.song.id, False), ("album", self.album.id, False), ("artist", self.artist.id, False)},
+        )
+        self.client.delete(reverse("album-detail", args=[self.album.id]))
+        events, _ = self.read_all(next_url)
+        self.assertIn(("album", self.album.id, True), events)
+        self.assertIn(("artist", self.artist.id, False), events)
+
+    def test_open_transaction(self):
+        _, next_url = self.read_all(self.url)
+        started, release = threading.Event(), threading.Event()
+
+        def write():
+            with transaction.atomic():
+                Song.objects.create(title="Ранняя")
+                started.set()
+                release.wait(10)
+            connection.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        started.wait(10)
+        # Более поздняя транзакция закоммичена раньше: лента ждёт раннюю, чтобы не пропустить её событие
+        late = Song.objects.create(title="Поздняя")
+        self.assertEqual(self.read(next_url)["results"], [])
+        release.set()
+        thread.join()
+        events, _ = self.read_all(next_url)
+        early = Song.objects.get(title="Ранняя")
+        self.assertEqual(events, [("song", early.id, False), ("song", late.id, False)])
+
+    def test_invalid_params(self):
+        for params in ({"since": "abc"}, {"since": "1.x"}, {"limit": 0}, {"limit": 100000}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retention(self):
+        old_url = self.read(f"{self.url}?limit=1")["next"]
+        _, next_url = self.read_all(self.url)
+        song = Song.objects.create(title="Новая")
+        expired = timezone.now() - datetime.timedelta(days=31)
+        ChangeEvent.objects.exclude(object_id=song.id, model="song").update(created_at=expired)
+        purge_changes()
+        # Осталось последнее устаревшее событие - позиция, на которой клиент закончил чтение
+        self.assertEqual(ChangeEvent.objects.count(), 2)
+        self.assertEqual(self.read_all(next_url)[0], [("song", song.id, False)])
+        self.assertEqual(self.read_all(self.url)[0][-1], ("song", song.id, False))
+        # События после старой позиции удалены: клиент должен прочитать каталог заново
+        response = self.client.get(old_url)
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(response.data["detail"].code, "cursor_expired")
+
+        _, next_url = self.read_all(next_url)
+        ChangeEvent.objects.update(created_at=expired)
+        purge_changes()
+        self.assertEqual(ChangeEvent.objects.count(), 1)
+        self.assertEqual(self.read(next_url)["results"], [])
@@ -0,0 +1,60 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Max, Min
+from django.test import TestCase, TransactionTestCase
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+
+
+def generate(**options):
+    call_command("test_data", stdout=StringIO(), **options)
+
+
+def snapshot():
+    return (
+        list(Artist.objects.order_by("id").values_list("name", flat=True)),
+        list(Song.objects.order_by("id").values_list("title", flat=True)),
+        list(Album.objects.order_by("id").values_list("title", "release_year", "artist__name")),
+        list(AlbumSong.objects.order_by("album_id", "track_number").values_list("song__title", "track_number")),
+    )
+
+
+class TestTestData(TestCase):
+    def test_counts(self):
+        Artist.objects.create(name="Существующий")
+        generate(artists=30, songs=50, albums=70, tracks_per_album=5, seed=1, batch_size=8)
+        self.assertEqual((Artist.objects.count(), Song.objects.count(), Album.objects.count()), (31, 50, 70))
+        tracks = Album.objects.annotate(tracks=Count("albumsong")).aggregate(low=Min("tracks"), high=Max("tracks"))
+        self.assertEqual((tracks["low"] >= 3, tracks["high"] <= 5), (True, True))
+        # id созданы последовательностями: обычная вставка после генерации не конфликтует
+        Song.objects.create(title="После генерации")
+        Album.objects.create(title="После генерации", release_year=2000, artist=Artist.objects.first())
+
+    def test_unique_names(self):
+        generate(artists=3000, songs=0, albums=0, seed=1)
+        generate(artists=3000, songs=0, albums=0, seed=1)
+        self.assertEqual(Artist.objects.values("name").distinct().count(), 6000)
+
+    def test_seed(self):
+        generate(artists=5, songs=20, albums=12, seed=7, batch_size=4)
+        first = snapshot()
+        for model in (Artist, Song):
+            model.objects.all().delete()
+        generate(artists=5, songs=20, albums=12, seed=7, batch_size=4)
+        self.assertEqual(snapshot(), first)
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            generate(artists=0, albums=1)
+
+
+class TestTestDataWorkers(TransactionTestCase):
+    def test_workers(self):
+        generate(artists=20, songs=40, albums=60, seed=3, batch_size=7, workers=3)
+        expected = snapshot()
+        self.assertEqual((len(expected[0]), len(expected[1]), len(expected[2])), (20, 40, 60))
+        for model in (Artist, Song):
+            model.objects.all().delete()
+        generate(artists=20, songs=40, albums=60, seed=3, batch_size=7)
+        self.assertEqual(snapshot(), expected)
@@ -0,0 +1,109 @@
+import gzip
+
+import brotli
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalogs.compression import get_accepted_encoding
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.tests import catalog_reads, read_chunks
+
+DECOMPRESS = {"br": brotli.decompress, "gzip": gzip.decompress}
+
+
+@catalog_reads
+class TestCompression(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        songs = [Song.objects.create(title=f"Песня {index}") for index in range(12)]
+        for index in range(10):
+            artist = Artist.objects.create(name=f"Исполнитель {index}")
+            album = Album.objects.create(title=f"Альбом {index}", release_year=2020, artist=artist)
+            for number, song in enumerate(songs, start=1):
+                AlbumSong.objects.create(album=album, song=song, track_number=number)
+
+    def test_negotiation(self):
+        factory = RequestFactory()
+        cases = {
+            "": None,
+            "gzip, deflate, br": "br",
+            "gzip": "gzip",
+            "br;q=0.5, gzip": "gzip",
+            "br;q=0, *": "gzip",
+            "*;q=0": None,
+            "identity": None,
+        }
+        for header, encoding in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(get_accepted_encoding(factory.get("/", HTTP_ACCEPT_ENCODING=header)), encoding)
+
+    def test_responses(self):
+        url = reverse("artist-list")
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        for encoding, decompress in DECOMPRESS.items():
+            response = self.client.get(url, headers={"Accept-Encoding": encoding})
+            self.assertEqual(response["Content-Encoding"], encoding)
+            self.assertEqual(int(response["Content-Length"]), len(response.content))
+            self.assertLess(len(response.content), len(plain.content) / 5)
+            self.assertEqual(decompress(response.content), plain.content)
+        # Ответ меньше порога и ошибки не сжимаются
+        response = self.client.get(
+            reverse("song-detail", args=[Song.objects.first().id]), headers={"Accept-Encoding": "br"}
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response = self.client.get(reverse("artist-detail", args=[0]), headers={"Accept-Encoding": "br"})
+        self.assertFalse(response.has_header("Content-Encoding"))
+        with override_settings(CATALOG_COMPRESSION=False):
+            self.assertFalse(self.client.get(url, headers={"Accept-Encoding": "br"}).has_header("Content-Encoding"))
+
+    def test_export_stream(self):
+        url = reverse("album-export")
+        plain = b"".join(read_chunks(self.client.get(url)))
+        for encoding, decompress in DECOMPRESS.items():
+            response = self.client.get(url, headers={"Accept-Encoding": encoding})
+            self.assertEqual(response["Content-Encoding"], encoding)
+            self.assertEqual(response["X-Accel-Buffering"], "no")
+            # Каждая порция выгрузки сжата отдельно и приходит клиенту сразу
+            chunks = read_chunks(response)
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(decompress(b"".join(chunks)), plain)
+
+    @override_settings(CATALOG_CACHE_ENABLED=True)
+    def test_cached_response(self):
+        caches["catalog"].clear()
+        url = reverse("artist-list")
+        plain = self.client.get(url).content
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+        for encoding, decompress in DECOMPRESS.items():
+            response = self.client.get(url, headers={"Accept-Encoding": encoding})
+            self.assertEqual((response["X-Cache"], response["Content-Encoding"]), ("HIT", encoding))
+            self.assertIn("Accept-Encoding", response["Vary"])
+            self.assertEqual(decompress(response.content), plain)
+
+    @override_settings(CATALOG_COMPRESSION_MIN_SIZE=0)
+    def test_etag(self):
+        url = reverse("artist-detail", args=[Artist.objects.first().id])
+        etag = self.client.get(url)["ETag"]
+        for encoding in DECOMPRESS:
+            response = self.client.get(url, headers={"Accept-Encoding": encoding})
+            # У сжатого тела свой строгий ETag, условия по нему относятся к той же версии записи
+            encoded = response["ETag"]
+            self.assertEqual(encoded, f'{etag[:-1]}-{encoding}"')
+            response = self.client.get(url, headers={"Accept-Encoding": encoding, "If-None-Match": encoded})
+            self.assertEqual((response.status_code, response["ETag"]), (304, encoded))
+            response = self.client.get(url, headers={"If-None-Match": f"W/{encoded}"})
+            self.assertEqual(response.status_code, 304)
+        response = self.client.patch(url, {"name": "Новое имя"}, headers={"If-Match": encoded})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(url, {"name": "Другое имя"}, headers={"If-Match": encoded})
+        self.assertEqual(response.status_code, 412)
+
+        with override_settings(CATALOG_CACHE_ENABLED=True):
+            caches["catalog"].clear()
+            etag = self.client.get(url)["ETag"]
+            response = self.client.get(url, headers={"Accept-Encoding": "br"})
+            self.assertEqual((response["X-Cache"], response["ETag"]), ("HIT", f'{etag[:-1]}-br"'))
@@ -0,0 +1,65 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.tests import catalog_reads
+
+
+@catalog_reads
+class TestConditionalRequests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.song = Song.objects.create(title="Песня")
+        self.album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.create(album=self.album, song=self.song, track_number=1)
+        self.album_url = reverse("album-detail", args=[self.album.id])
+        self.artist_url = reverse("artist-detail", args=[self.artist.id])
+
+    def get_etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response["ETag"]
+
+    def test_not_modified(self):
+        etag = self.get_etag(self.album_url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.album_url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_weak_etag_matches(self):
+        etag = self.get_etag(self.album_url)
+        response = self.client.get(self.album_url, headers={"If-None-Match": f"W/{etag}"})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_nested_changes_change_etag(self):
+        album_etag = self.get_etag(self.album_url)
+        artist_etag = self.get_etag(self.artist_url)
+        self.song.title = "Новое название"
+        self.song.save()
+        self.assertNotEqual(self.get_etag(self.album_url), album_etag)
+        self.assertNotEqual(self.get_etag(self.artist_url), artist_etag)
+
+    def test_artist_rename_changes_album_etag(self):
+        album_etag = self.get_etag(self.album_url)
+        self.artist.name = "Новое имя"
+        self.artist.save()
+        response = self.client.get(self.album_url, headers={"If-None-Match": album_etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_object(self):
+        response = self.client.get(reverse("album-detail", args=[0]), headers={"If-None-Match": "*"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_if_match_update(self):
+        etag = self.get_etag(self.artist_url)
+        response = self.client.put(self.artist_url, {"name": "Первое"}, headers={"If-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        response = self.client.patch(self.artist_url, {"name": "Второе"}, headers={"If-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.artist.refresh_from_db()
+        self.assertEqual(self.artist.name, "Первое")
@@ -0,0 +1,72 @@
+import datetime
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.tests import catalog_reads, read_chunks
+
+
+@catalog_reads
+class TestCatalogExport(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.song = Song.objects.create(title="Песня")
+        for index in range(5):
+            artist = Artist.objects.create(name=f"Исполнитель {index}")
+            album = Album.objects.create(title=f"Альбом {index}", release_year=2020, artist=artist)
+            AlbumSong.objects.create(album=album, song=self.song, track_number=1)
+
+    def read_lines(self, response):
+        content = b"".join(read_chunks(response)).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_artists(self):
+        response = self.client.get(reverse("artist-export"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn("Last-Modified", response)
+        lines = self.read_lines(response)
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0]["albums"][0]["songs"][0]["song"]["title"], "Песня")
+
+    def test_export_albums_filtered(self):
+        artist = Artist.objects.get(name="Исполнитель 3")
+        lines = self.read_lines(self.client.get(reverse("album-export"), {"artist": artist.id}))
+        self.assertEqual([line["title"] for line in lines], ["Альбом 3"])
+
+    @override_settings(CATALOG_EXPORT_CHUNK_SIZE=2)
+    def test_export_prefetches_per_chunk(self):
+        response = self.client.get(reverse("album-export"))
+        # Один серверный курсор по альбомам и по запросу треков на каждую порцию из 2 альбомов
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.read_lines(response)), 5)
+
+    def test_export_not_modified(self):
+        since = timezone.now() + datetime.timedelta(seconds=5)
+        response = self.client.get(
+            reverse("artist-export"), headers={"If-Modified-Since": http_date(since.timestamp())}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_export_incremental(self):
+        old = timezone.now() - datetime.timedelta(days=1)
+        Artist.objects.update(updated_at=old)
+        Artist.objects.filter(name="Исполнитель 1").update(updated_at=timezone.now())
+        since = http_date(old.timestamp() + 60)
+        lines = self.read_lines(self.client.get(reverse("artist-export"), headers={"If-Modified-Since": since}))
+        self.assertEqual([line["name"] for line in lines], ["Исполнитель 1"])
+
+    def test_song_change_touches_album_and_artist(self):
+        old = timezone.now() - datetime.timedelta(days=1)
+        Album.objects.update(updated_at=old)
+        Artist.objects.update(updated_at=old)
+        self.song.title = "Новая песня"
+        self.song.save()
+        self.assertFalse(Album.objects.filter(updated_at=old).exists())
+        self.assertFalse(Artist.objects.filter(updated_at=old).exists())
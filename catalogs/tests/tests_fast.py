@@ -0,0 +1,63 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalogs.fast import get_encoder
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.prefetch import build_queryset
+from catalogs.serializers import (
+    AlbumListRetvieveSerializer,
+    AlbumSerializer,
+    AlbumSongListRetrieveSerializer,
+    ArtistListRetrieveSerializer,
+    ArtistSerializer,
+    SongSerializer,
+)
+from catalogs.tests import catalog_reads
+
+READ_SERIALIZERS = (
+    ArtistSerializer,
+    SongSerializer,
+    AlbumSerializer,
+    AlbumSongListRetrieveSerializer,
+    AlbumListRetvieveSerializer,
+    ArtistListRetrieveSerializer,
+)
+
+
+@catalog_reads
+class TestFastSerializerParity(TestCase):
+    """
+    Скомпилированные кодировщики должны отдавать ровно то же, что и сериализаторы DRF.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        songs = Song.objects.bulk_create([Song(title=f"Песня «{index}»") for index in range(6)])
+        for index in range(3):
+            artist = Artist.objects.create(name=f"Исполнитель {index}")
+            for album_index in range(index):
+                album = Album.objects.create(title=f"Альбом {album_index}", release_year=1990 + index, artist=artist)
+                for number, song in enumerate(songs[album_index:], start=1):
+                    AlbumSong.objects.create(album=album, song=song, track_number=number)
+
+    def test_serializers(self):
+        for serializer_class in READ_SERIALIZERS:
+            with self.subTest(serializer=serializer_class.__name__):
+                queryset = build_queryset(serializer_class)
+                expected = serializer_class(queryset, many=True).data
+                encode = get_encoder(serializer_class)
+                self.assertEqual(json.dumps([encode(obj) for obj in queryset]), json.dumps(expected))
+
+    def test_api(self):
+        urls = [reverse(name) for name in ("artist-list", "album-list", "song-list")]
+        urls += [reverse("artist-detail", args=[Artist.objects.last().id])]
+        urls += [reverse("album-detail", args=[Album.objects.last().id])]
+        client = APIClient()
+        for url in urls:
+            with self.subTest(url=url):
+                expected = client.get(url).content
+                with override_settings(CATALOG_FAST_SERIALIZERS=True):
+                    self.assertEqual(client.get(url).content, expected)
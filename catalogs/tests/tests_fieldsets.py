@@ -0,0 +1,90 @@
+import json
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.tests import catalog_reads, read_chunks
+
+
+@catalog_reads
+class TestFieldSelection(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.song = Song.objects.create(title="Песня")
+        self.album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.create(album=self.album, song=self.song, track_number=1)
+
+    def get(self, name, params, *args):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data, [query["sql"] for query in queries]
+
+    def test_sparse_fields(self):
+        data, queries = self.get("artist-list", {"fields": "name"})
+        self.assertEqual(data["results"], [{"id": self.artist.id, "name": "Исполнитель"}])
+        self.assertFalse([sql for sql in queries if Album._meta.db_table in sql])
+        data, queries = self.get("artist-detail", {"fields": "albums.title,albums.artist.name"}, self.artist.id)
+        self.assertEqual(
+            data, {"id": self.artist.id, "albums": [{"title": "Альбом", "artist": {"name": "Исполнитель"}}]}
+        )
+        self.assertFalse([sql for sql in queries if AlbumSong._meta.db_table in sql])
+        data, _ = self.get("song-detail", {"fields": "title"}, self.song.id)
+        self.assertEqual(data, {"id": self.song.id, "title": "Песня"})
+
+    def test_depth_and_expand(self):
+        url = ("album-detail", self.album.id)
+        data, queries = self.get(url[0], {"depth": 0}, url[1])
+        self.assertEqual(
+            data, {"id": self.album.id, "title": "Альбом", "release_year": 2020, "artist": self.artist.id}
+        )
+        self.assertEqual(len(queries), 1)
+        data, _ = self.get(url[0], {"depth": 1}, url[1])
+        self.assertEqual(data["songs"], [{"song": self.song.id, "track_number": 1}])
+        data, _ = self.get(url[0], {"depth": 0, "expand": "songs.song"}, url[1])
+        self.assertEqual(data["songs"], [{"song": {"id": self.song.id, "title": "Песня"}, "track_number": 1}])
+        self.assertEqual(data["artist"], self.artist.id)
+        data, _ = self.get("artist-list", {"depth": 0, "fields": "name", "expand": "albums"})
+        self.assertEqual(data["results"][0]["albums"][0]["artist"], self.artist.id)
+        self.assertNotIn("songs", data["results"][0]["albums"][0])
+
+    def test_fast_serializers_parity(self):
+        params = [{"fields": "albums.songs.song.title"}, {"depth": 1}, {"depth": 0, "expand": "albums.songs"}]
+        for query in params:
+            expected, _ = self.get("artist-list", query)
+            with override_settings(CATALOG_FAST_SERIALIZERS=True):
+                self.assertEqual(self.get("artist-list", query)[0], expected, query)
+
+    def test_export(self):
+        response = self.client.get(reverse("album-export"), {"fields": "title", "expand": "songs"})
+        lines = [json.loads(line) for line in b"".join(read_chunks(response)).splitlines()]
+        self.assertEqual(
+            lines,
+            [
+                {
+                    "id": self.album.id,
+                    "title": "Альбом",
+                    "songs": [{"song": {"id": self.song.id, "title": "Песня"}, "track_number": 1}],
+                }
+            ],
+        )
+        self.assertEqual(self.client.get(reverse("album-export"), {"fields": "nope"}).status_code, 400)
+
+    def test_invalid_selection(self):
+        for params in (
+            {"fields": "nope"},
+            {"fields": "name.title"},
+            {"fields": "albums..title"},
+            {"expand": "name"},
+            {"expand": "albums.nope"},
+            {"depth": "-1"},
+            {"fields": "summary.name"},
+        ):
+            response = self.client.get(reverse("artist-list"), params)
+            self.assertEqual(response.status_code, 400, params)
+        self.assertEqual(self.client.get(reverse("song-list"), {"fields": "summary"}).status_code, 400)
@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test import TestCase
+
+from catalogs.filters import AlbumFilter, ArtistFilter, SongFilter
+from catalogs.models import Album, Artist, Song
+
+ROWS = 20000
+WORDS = ("Весна", "Дорога", "Ночь", "Город", "Море", "Песня", "Звезда", "Ветер")
+
+
+def title(index):
+    return f"{WORDS[index % len(WORDS)]} {index:05d} {WORDS[index * 7 % len(WORDS)]}"
+
+
+class TestFilterIndexes(TestCase):
+    """
+    Фильтры списков не должны приводить к последовательному чтению таблиц.
+
+    Таблицы заполняются так, чтобы планировщик выбирал индекс только при его наличии,
+    и после ANALYZE проверяется план запроса каждого фильтра.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        artists = Artist.objects.bulk_create([Artist(name=title(index)) for index in range(ROWS)])
+        Song.objects.bulk_create([Song(title=title(index)) for index in range(ROWS)])
+        Album.objects.bulk_create(
+            [
+                Album(title=title(index), release_year=1900 + index % 125, artist=artists[index])
+                for index in range(ROWS)
+            ]
+        )
+        with connection.cursor() as cursor:
+            for model in (Artist, Song, Album):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def assert_index_scan(self, filterset_class, params):
+        queryset = filterset_class(params, queryset=filterset_class.Meta.model.objects.all()).qs
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan", plan, f"{params}:\n{plan}")
+
+    def test_artist(self):
+        for params in (
+            {"name": title(42)},
+            {"name__icontains": "12345"},
+            {"name__istartswith": "Ночь 1234"},
+            {"name__similar": "Ночь 12342 Весна"},
+        ):
+            with self.subTest(params=params):
+                self.assert_index_scan(ArtistFilter, params)
+
+    def test_song(self):
+        for params in (
+            {"title": title(42)},
+            {"title__icontains": "12345"},
+            {"title__istartswith": "Ночь 1234"},
+            {"title__similar": "Ночь 12342 Весна"},
+        ):
+            with self.subTest(params=params):
+                self.assert_index_scan(SongFilter, params)
+
+    def test_album(self):
+        for params in (
+            {"title": title(42)},
+            {"title__icontains": "12345"},
+            {"title__istartswith": "Ночь 1234"},
+            {"title__similar": "Ночь 12342 Весна"},
+            {"release_year": 1999},
+            {"artist": Artist.objects.first().id},
+        ):
+            with self.subTest(params=params):
+                self.assert_index_scan(AlbumFilter, params)
+
+    def test_filters(self):
+        self.assertEqual(
+            list(SongFilter({"title__icontains": "НОЧЬ 1234"}, queryset=Song.objects.all()).qs.values_list(flat=True)),
+            list(Song.objects.filter(title__icontains="ночь 1234").values_list(flat=True)),
+        )
+        similar = SongFilter({"title__similar": "Ночь 12342 Весна"}, queryset=Song.objects.all()).qs
+        self.assertIn(title(12342), similar.values_list("title", flat=True))
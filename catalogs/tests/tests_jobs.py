@@ -0,0 +1,155 @@
+import datetime
+import threading
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.jobs import claim_job, enqueue, run_pending_jobs
+from catalogs.models import Album, AlbumSong, Artist, Job, Snapshot, Song
+from catalogs.tests import catalog_reads
+
+ASYNC = {"Prefer": "respond-async"}
+
+
+@catalog_reads
+class TestBackgroundWrites(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.songs = [Song.objects.create(title=f"Песня {index}") for index in range(3)]
+        self.album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.create(album=self.album, song=self.songs[0], track_number=1)
+
+    def test_album_update(self):
+        tracks = [{"song": song.id, "track_number": number} for number, song in enumerate(self.songs, start=1)]
+        url = reverse("album-detail", args=[self.album.id])
+        response = self.client.patch(url, {"songs": tracks}, format="json", headers=ASYNC)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], Job.QUEUED)
+        self.assertEqual(response["Location"], reverse("job-detail", args=[response.data["id"]]))
+        self.assertEqual(self.album.songs.count(), 1)
+
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(self.album.songs.count(), 3)
+        job = self.client.get(response["Location"]).data
+        self.assertEqual((job["status"], job["result"], job["attempts"]), (Job.DONE, {"id": self.album.id}, 1))
+        # Без заголовка запись выполняется в запросе
+        response = self.client.patch(url, {"songs": tracks[:1]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_validation(self):
+        response = self.client.post(reverse("album-list"), {"title": "Без исполнителя"}, format="json", headers=ASYNC)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(reverse("song-detail", args=[0]), {"title": "Нет"}, headers=ASYNC)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Job.objects.exists())
+        # Данные, ставшие некорректными до выполнения задачи, возвращаются ошибками задачи
+        data = {"title": "Новый", "release_year": 2021, "artist": self.artist.id, "songs": []}
+        response = self.client.post(reverse("album-list"), data, format="json", headers=ASYNC)
+        self.artist.delete()
+        run_pending_jobs()
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("artist", job.result)
+
+    def test_bulk(self):
+        data = [{"name": "Исполнитель"}, {"name": "Новый"}, {"name": ""}]
+        response = self.client.post(reverse("artist-bulk"), data, format="json", headers=ASYNC)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        run_pending_jobs()
+        result = self.client.get(reverse("job-detail", args=[response.data["id"]])).data["result"]
+        self.assertEqual((result["created"], result["updated"], result["errors"]), (1, 1, 1))
+        self.assertTrue(Artist.objects.filter(name="Новый").exists())
+        response = self.client.get(reverse("job-list"), {"kind": "bulk", "status": Job.DONE})
+        self.assertEqual(response.data["count"], 1)
+
+    def test_if_match(self):
+        url = reverse("artist-detail", args=[self.artist.id])
+        etag = self.client.get(url)["ETag"]
+        response = self.client.patch(url, {"name": "Из очереди"}, headers={**ASYNC, "If-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        # Запись изменили, пока задача ждала воркера: задача не перезаписывает изменение
+        self.client.patch(url, {"name": "Из запроса"}, headers={"If-Match": etag})
+        run_pending_jobs()
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual((job.status, job.result["status_code"]), (Job.FAILED, status.HTTP_412_PRECONDITION_FAILED))
+        self.artist.refresh_from_db()
+        self.assertEqual(self.artist.name, "Из запроса")
+
+        etag = self.client.get(url)["ETag"]
+        self.client.patch(url, {"name": "Из очереди"}, headers={**ASYNC, "If-Match": etag})
+        run_pending_jobs()
+        self.artist.refresh_from_db()
+        self.assertEqual(self.artist.name, "Из очереди")
+
+    def test_lost_jobs(self):
+        started = timezone.now() - datetime.timedelta(days=1)
+        retried = enqueue("write", {"model": "song", "pk": None, "partial": False, "data": {"title": "Новая"}})
+        exhausted = enqueue("write", {"model": "song", "pk": None, "partial": False, "data": {"title": "Другая"}})
+        Job.objects.filter(pk=retried.pk).update(status=Job.RUNNING, started_at=started, attempts=1)
+        Job.objects.filter(pk=exhausted.pk).update(status=Job.RUNNING, started_at=started, attempts=3)
+        with override_settings(CATALOG_JOBS_MAX_ATTEMPTS=3):
+            self.assertEqual(run_pending_jobs(), 1)
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), (Job.DONE, 2))
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertEqual(
+            list(Song.objects.filter(title__in=["Новая", "Другая"]).values_list("title", flat=True)), ["Новая"]
+        )
+
+    @override_settings(CATALOG_SNAPSHOTS=True, CATALOG_SNAPSHOTS_BACKGROUND=True)
+    def test_snapshots(self):
+        self.songs[0].title = "Новое название"
+        self.songs[0].save()
+        job = Job.objects.get(kind="snapshots")
+        self.assertEqual(job.payload, {"albums": [self.album.id], "artists": [self.artist.id]})
+        run_pending_jobs()
+        document = Snapshot.objects.get(kind=Snapshot.ALBUM, object_id=self.album.id)
+        self.assertIn("Новое название", bytes(document.content).decode())
+
+
+class TestQueueLocking(TransactionTestCase):
+    def test_skip_locked(self):
+        first = enqueue("bulk", {"model": "song", "items": []})
+        second = enqueue("bulk", {"model": "song", "items": []})
+        claimed = []
+
+        def claim():
+            claimed.append(claim_job())
+            connection.close()
+
+        # Пока первая задача заблокирована другой транзакцией, воркер берёт следующую, не дожидаясь её
+        with transaction.atomic():
+            Job.objects.select_for_update().get(pk=first.pk)
+            thread = threading.Thread(target=claim)
+            thread.start()
+            thread.join()
+        self.assertEqual(claimed[0].pk, second.pk)
+        self.assertEqual(claim_job().pk, first.pk)
+        self.assertIsNone(claim_job())
+
+    def test_running_job(self):
+        job = enqueue("bulk", {"model": "song", "items": []})
+        started = timezone.now() - datetime.timedelta(days=1)
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING, started_at=started, attempts=1)
+        claimed = []
+
+        def claim():
+            claimed.append(claim_job())
+            connection.close()
+
+        # Задачу держит живой воркер: сколько бы она ни выполнялась, другой воркер её не забирает
+        with transaction.atomic():
+            Job.objects.select_for_update().get(pk=job.pk)
+            thread = threading.Thread(target=claim)
+            thread.start()
+            thread.join()
+        self.assertEqual(claimed, [None])
+        # Блокировка снята, а задача осталась running - воркер остановлен, задача запускается снова
+        job = claim_job()
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 2))
@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.metrics import QueryBudgetError, buffer, get_view_metrics, render_metrics
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.tests import catalog_reads
+from catalogs.views import AlbumViewSet
+
+
+@catalog_reads
+class TestQueryMetrics(TestCase):
+    def setUp(self):
+        # Счётчики предыдущих тестов, накопленные в памяти процесса, сбрасываются в очищаемый кэш
+        buffer.flush()
+        caches["catalog"].clear()
+        self.client = APIClient()
+        artist = Artist.objects.create(name="Исполнитель")
+        self.album = Album.objects.create(title="Альбом", release_year=2020, artist=artist)
+        AlbumSong.objects.create(album=self.album, song=Song.objects.create(title="Песня"), track_number=1)
+
+    def test_server_timing(self):
+        response = self.client.get(reverse("album-detail", args=[self.album.id]))
+        timing = dict(part.split(";", 1) for part in response["Server-Timing"].split(", "))
+        self.assertEqual(timing.keys(), {"db", "serializer", "app", "response"})
+        self.assertIn('desc="2 SQL"', timing["db"])
+        self.assertEqual(timing["response"], f'desc="{len(response.content)} B"')
+
+    def test_metrics_endpoint(self):
+        for _ in range(2):
+            self.client.get(reverse("album-list"))
+        self.assertEqual(get_view_metrics()["album.list"]["queries"], 6)
+        with override_settings(CATALOG_METRICS_TOKEN="secret"):
+            response = self.client.get(reverse("metrics"), headers={"Authorization": "Bearer secret"})
+        text = response.content.decode()
+        self.assertIn('catalog_requests_total{view="album.list"} 2', text)
+        self.assertIn('catalog_request_duration_seconds_bucket{view="album.list",le="+Inf"} 2', text)
+        self.assertIn("catalog_cache_hit_total 0", text)
+
+    def test_metrics_access(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(CATALOG_METRICS_TOKEN="secret"):
+            for header in ("Bearer other", "Basic secret", "Bearer "):
+                with self.subTest(header=header):
+                    response = self.client.get(url, headers={"Authorization": header})
+                    self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        user = User.objects.create_user("user", password="password")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_budget_exceeded(self):
+        url = reverse("album-detail", args=[self.album.id])
+        with (
+            patch.object(AlbumViewSet, "query_budget", {"retrieve": 1}),
+            self.assertLogs("catalogs.metrics", "WARNING") as logs,
+            self.assertRaises(QueryBudgetError),
+        ):
+            self.client.get(url)
+        self.assertIn("album.retrieve: 2 SQL-запросов при бюджете 1", logs.output[0])
+        with override_settings(CATALOG_QUERY_BUDGET_STRICT=False), self.assertLogs("catalogs.metrics", "WARNING"):
+            with patch.object(AlbumViewSet, "query_budget", {"retrieve": 1}):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(get_view_metrics()["album.retrieve"]["budget_exceeded"], 2)
+
+    def test_pool_metrics(self):
+        stats = {("default", "requests_num"): 3, ("default", "requests_wait_ms"): 1500}
+        with (
+            patch("catalogs.metrics.get_pool_aliases", return_value=["default"]),
+            patch("catalogs.metrics.pop_pool_stats", side_effect=[stats, {}]),
+        ):
+            text = render_metrics()
+        self.assertIn('catalog_db_pool_requests_total{alias="default"} 3', text)
+        self.assertIn('catalog_db_pool_wait_seconds_total{alias="default"} 1.5', text)
+        self.assertIn('catalog_db_pool_errors_total{alias="default"} 0', text)
@@ -0,0 +1,92 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.models import Artist, Song
+from catalogs.tests import catalog_reads
+
+
+@catalog_reads
+class TestLimitOffsetPagination(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Song.objects.bulk_create([Song(title=f"Песня {index:03}") for index in range(150)])
+
+    def test_default_limit(self):
+        response = self.client.get(reverse("song-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 150)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertIn("offset=10", response.data["next"])
+
+    def test_max_limit(self):
+        response = self.client.get(reverse("song-list"), {"limit": 1000})
+        self.assertEqual(len(response.data["results"]), 100)
+
+    def test_last_page_has_no_next(self):
+        response = self.client.get(reverse("song-list"), {"limit": 100, "offset": 100})
+        self.assertEqual(len(response.data["results"]), 50)
+        self.assertIsNone(response.data["next"])
+        self.assertIsNotNone(response.data["previous"])
+
+    def test_count_none(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("song-list"), {"count": "none"})
+        self.assertIsNone(response.data["count"])
+        self.assertIsNotNone(response.data["next"])
+
+    def test_count_estimate(self):
+        response = self.client.get(reverse("song-list"), {"count": "estimate"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data["count"], int)
+
+    def test_invalid_count(self):
+        response = self.client.get(reverse("song-list"), {"count": "all"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(CATALOG_PAGINATION_COUNT="none")
+    def test_count_mode_from_settings(self):
+        response = self.client.get(reverse("song-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@catalog_reads
+class TestKeysetPagination(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Artist.objects.bulk_create([Artist(name=f"Исполнитель {index % 7}-{index:02}") for index in range(25)])
+
+    def walk(self, params):
+        names = []
+        response = self.client.get(reverse("artist-list"), params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend(artist["name"] for artist in response.data["results"])
+            if not response.data["next"]:
+                return names, response
+            response = self.client.get(response.data["next"])
+
+    def test_walk_by_id(self):
+        names, _ = self.walk({"cursor": "", "limit": 10})
+        self.assertEqual(names, list(Artist.objects.order_by("id").values_list("name", flat=True)))
+
+    def test_walk_by_ordering_field(self):
+        names, _ = self.walk({"cursor": "", "limit": 4, "ordering": "-name"})
+        self.assertEqual(names, list(Artist.objects.order_by("-name").values_list("name", flat=True)))
+
+    def test_previous_page(self):
+        first = self.client.get(reverse("artist-list"), {"cursor": "", "limit": 10})
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        previous = self.client.get(second.data["previous"])
+        self.assertEqual(previous.data["results"], first.data["results"])
+        self.assertIsNotNone(previous.data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("artist-list"), {"cursor": "не-курсор"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_ordering(self):
+        response = self.client.get(reverse("artist-list"), {"cursor": "", "ordering": "albums"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,161 @@
+from unittest.mock import patch
+
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.serializers import AlbumSerializer, AlbumSongSerializer
+from catalogs.signals import catalog_changed
+from catalogs.tests import catalog_reads
+
+
+@catalog_reads
+class TestCatalogQueryCount(TestCase):
+    """
+    Количество запросов к БД не должно зависеть от количества исполнителей, альбомов и треков.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.add_catalog(artists=2, albums=2, tracks=2)
+
+    def add_catalog(self, artists, albums, tracks):
+        offset = Artist.objects.count()
+        for artist_index in range(offset, offset + artists):
+            artist = Artist.objects.create(name=f"Исполнитель {artist_index}")
+            for album_index in range(albums):
+                album = Album.objects.create(title=f"Альбом {album_index}", release_year=2020, artist=artist)
+                for track_number in range(tracks, 0, -1):
+                    song = Song.objects.create(title=f"Песня {track_number}")
+                    AlbumSong.objects.create(album=album, song=song, track_number=track_number)
+
+    def assert_fixed_queries(self, url, num):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.add_catalog(artists=3, albums=3, tracks=5)
+        with self.assertNumQueries(num):
+            self.client.get(url)
+        return response
+
+    def test_list_artists(self):
+        self.assert_fixed_queries(reverse("artist-list"), 4)
+
+    def test_retrieve_artist(self):
+        artist = Artist.objects.first()
+        response = self.assert_fixed_queries(reverse("artist-detail", args=[artist.id]), 3)
+        track_numbers = [track["track_number"] for track in response.data["albums"][0]["songs"]]
+        self.assertEqual(track_numbers, [1, 2])
+
+    def test_list_albums(self):
+        self.assert_fixed_queries(reverse("album-list"), 3)
+
+    def test_retrieve_album(self):
+        album = Album.objects.first()
+        self.assert_fixed_queries(reverse("album-detail", args=[album.id]), 2)
+
+    def test_list_songs(self):
+        self.assert_fixed_queries(reverse("song-list"), 2)
+
+
+class TestAlbumWriteTracks(TestCase):
+    """
+    Треклист записывается пакетно, при обновлении меняются только отличающиеся строки.
+    """
+
+    def setUp(self):
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.songs = Song.objects.bulk_create([Song(title=f"Песня {index}") for index in range(300)])
+
+    def album_data(self, tracks):
+        return {
+            "title": "Альбом",
+            "release_year": 2020,
+            "artist": self.artist.id,
+            "songs": [{"song": song.id, "track_number": number} for number, song in tracks],
+        }
+
+    def test_create_queries_do_not_depend_on_track_count(self):
+        serializer = AlbumSerializer(data=self.album_data(enumerate(self.songs[:3], start=1)))
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as small:
+            serializer.save()
+        data = self.album_data(enumerate(self.songs, start=1))
+        serializer = AlbumSerializer(data={**data, "title": "Большой альбом"})
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as large:
+            album = serializer.save()
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(album.albumsong_set.count(), 300)
+
+    def test_validation_queries_do_not_depend_on_track_count(self):
+        counts = []
+        for size in (3, 300):
+            serializer = AlbumSerializer(data=self.album_data(enumerate(self.songs[:size], start=1)))
+            with CaptureQueriesContext(connection) as queries:
+                self.assertTrue(serializer.is_valid())
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_track_numbers_taken_in_context_album(self):
+        album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.create(album=album, song=self.songs[0], track_number=2)
+        serializer = AlbumSongSerializer(
+            data=[{"song": song.id, "track_number": number} for number, song in enumerate(self.songs[:3], start=1)],
+            many=True,
+            context={"album": album},
+        )
+        with self.assertNumQueries(2):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[0], {})
+        self.assertIn("track_number", serializer.errors[1])
+
+    def test_update_applies_diff(self):
+        serializer = AlbumSerializer(data=self.album_data(enumerate(self.songs[:4], start=1)))
+        serializer.is_valid(raise_exception=True)
+        album = serializer.save()
+        kept = AlbumSong.objects.get(album=album, track_number=1)
+        tracks = [(1, self.songs[0]), (2, self.songs[10]), (3, self.songs[2]), (5, self.songs[11])]
+        serializer = AlbumSerializer(album, data=self.album_data(tracks))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(
+            list(album.albumsong_set.order_by("track_number").values_list("track_number", "song_id")),
+            [(number, song.id) for number, song in tracks],
+        )
+        self.assertTrue(AlbumSong.objects.filter(pk=kept.pk).exists())
+
+    def test_update_removes_tracks_in_batch(self):
+        sent = []
+
+        def receiver(sender, instances, deleted, **kwargs):
+            sent.append((sender, len(instances), deleted))
+
+        album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.bulk_create(
+            AlbumSong(album=album, song=song, track_number=number) for number, song in enumerate(self.songs, start=1)
+        )
+        serializer = AlbumSerializer(album, data=self.album_data([(1, self.songs[0])]))
+        serializer.is_valid(raise_exception=True)
+        catalog_changed.connect(receiver)
+        try:
+            serializer.save()
+        finally:
+            catalog_changed.disconnect(receiver)
+        self.assertEqual(album.albumsong_set.count(), 1)
+        # Удалённые треки - один сигнал на всё удаление, а не post_delete каждой строки
+        self.assertEqual([event for event in sent if event[2]], [(AlbumSong, 299, True)])
+
+    def test_update_rolls_back_on_error(self):
+        album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.create(album=album, song=self.songs[0], track_number=1)
+        serializer = AlbumSerializer(album, data=self.album_data([(1, self.songs[1])]))
+        serializer.is_valid(raise_exception=True)
+        with patch.object(AlbumSong.objects, "bulk_update", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                serializer.save()
+        self.assertEqual(album.albumsong_set.get().song_id, self.songs[0].id)
@@ -0,0 +1,93 @@
+import datetime
+import decimal
+import io
+import math
+import uuid
+import zoneinfo
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.parsers import NDJSONParser, ORJSONParser
+from catalogs.renderers import ORJSONRenderer, json_float
+from catalogs.tests import catalog_reads
+
+
+@catalog_reads
+class TestORJSON(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        artist = Artist.objects.create(name='Исполнитель   «кавычки» "\\ </script>')
+        song = Song.objects.create(title="Песня 🎵")
+        album = Album.objects.create(title="Альбом", release_year=2020, artist=artist)
+        AlbumSong.objects.create(album=album, song=song, track_number=1)
+
+    def assert_parity(self, data, media_type=None):
+        expected = JSONRenderer().render(data, media_type)
+        self.assertEqual(ORJSONRenderer().render(data, media_type), expected, data)
+
+    def test_types(self):
+        moscow = zoneinfo.ZoneInfo("Europe/Moscow")
+        for data in (
+            None,
+            {"text": "строка    \x00 \x7f", 1: [True, None, 1.5, 0.1, 2**70]},
+            [datetime.datetime(2020, 1, 1, 12, 30, tzinfo=datetime.UTC), datetime.datetime(2020, 1, 1, tzinfo=moscow)],
+            [datetime.datetime(2020, 1, 1, 0, 0, 0, 5), datetime.date(2020, 1, 2), datetime.time(1, 2, 3)],
+            [decimal.Decimal("1.10"), datetime.timedelta(seconds=90), uuid.UUID(int=1), gettext_lazy("Песни")],
+        ):
+            self.assert_parity(data)
+        self.assert_parity({"a": [1, {"b": 2}]}, "application/json; indent=4")
+
+    def test_floats(self):
+        values = [1e-5, 2.5e-7, 1e16, 1e20, -1.5e300, 5e-324, 1e15, 0.0001, -0.0, 0.1 + 0.2, 0.0607927]
+        self.assert_parity({"rank": [json_float(value) for value in values]})
+        self.assertIs(type(json_float(0.0607927)), float)
+        for value in (math.nan, math.inf, -math.inf):
+            with self.subTest(value=value):
+                with self.assertRaisesMessage(ValueError, "Out of range float values"):
+                    JSONRenderer().render({"rank": json_float(value)})
+                with self.assertRaisesMessage(ValueError, "Out of range float values"):
+                    ORJSONRenderer().render({"rank": [json_float(value)]})
+
+    def test_responses(self):
+        for name, params in (
+            ("artist-list", {}),
+            ("album-list", {"cursor": ""}),
+            ("song-list", {"fields": "title"}),
+            ("search-list", {"q": "исполнитель"}),
+            ("album-list", {"release_year": "bad"}),
+        ):
+            response = self.client.get(reverse(name), params)
+            self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+            expected = JSONRenderer().render(response.data, response.accepted_media_type, response.renderer_context)
+            self.assertEqual(response.content, expected, name)
+
+    def test_parser(self):
+        url = reverse("song-list")
+        response = self.client.post(url, '{"title": "Новая 🎵"}', content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Song.objects.filter(title="Новая 🎵").exists())
+        for body in ('{"title": NaN}', '{"title": "a"', ""):
+            response = self.client.post(url, body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+        response = self.client.post(reverse("artist-bulk"), '[{"name": "Из bulk"}]', content_type="application/json")
+        self.assertEqual(response.data["created"], 1)
+
+    def test_parser_numbers(self):
+        body = b'{"big": [18446744073709551616, -9223372036854775809, 1234567890123456789012], "float": [1e-05, 0.1]}'
+        expected = JSONParser().parse(io.BytesIO(body))
+        self.assertEqual(expected["big"][0], 2**64)
+        for parser in (ORJSONParser(), NDJSONParser()):
+            with self.subTest(parser=parser):
+                data = parser.parse(io.BytesIO(body))
+                self.assertEqual(data, expected if isinstance(parser, ORJSONParser) else [expected])
+                values = data["big"] if isinstance(parser, ORJSONParser) else data[0]["big"]
+                self.assertTrue(all(type(value) is int for value in values))
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"big": 12345678901234567890, "nan": NaN}'))
@@ -0,0 +1,82 @@
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.routers import PIN_COOKIE
+from catalogs.tests import catalog_reads, read_chunks
+
+
+@override_settings(CATALOG_READ_REPLICAS=["replica_1"])
+@catalog_reads
+class TestReplicaRouting(TransactionTestCase):
+    # replica_1 в тестах - второе соединение с тестовой БД, поэтому данные должны быть закоммичены.
+    # Псевдонима ещё нет, когда раннер собирает databases тестов, поэтому он добавляется в setUpClass
+    databases = {"default"}
+
+    @classmethod
+    def setUpClass(cls):
+        # Без POSTGRES_REPLICAS псевдоним существует только на время этого класса, чтобы
+        # маршрутизация остальных тестов не зависела от порядка их запуска. Тестовая БД
+        # к этому моменту создана, и реплика - зеркало default с тем же именем БД
+        if "replica_1" not in connections:
+            default = connections["default"].settings_dict
+            connections.settings["replica_1"] = {**default, "TEST": {**default["TEST"], "MIRROR": "default"}}
+            cls.addClassCleanup(cls.remove_replica)
+        cls.databases = {"default", "replica_1"}
+        super().setUpClass()
+
+    @classmethod
+    def remove_replica(cls):
+        cls.databases = {"default"}
+        connections["replica_1"].close()
+        del connections["replica_1"]
+        del connections.settings["replica_1"]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.song = Song.objects.create(title="Песня")
+        album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+        AlbumSong.objects.create(album=album, song=self.song, track_number=1)
+
+    def request(self, method, url, data=None):
+        with (
+            CaptureQueriesContext(connections["default"]) as primary,
+            CaptureQueriesContext(connections["replica_1"]) as replica,
+        ):
+            response = getattr(self.client, method)(url, data, format="json")
+        return response, len(primary), len(replica)
+
+    def test_reads_use_replica(self):
+        for url in (reverse("artist-list"), reverse("album-detail", args=[self.artist.albums.get().id])):
+            response, primary, replica = self.request("get", url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(primary, 0)
+            self.assertGreater(replica, 0)
+        # Поток выгрузки читается после выхода из представления, но с той же реплики
+        with CaptureQueriesContext(connections["default"]) as primary:
+            response = self.client.get(reverse("album-export"))
+            lines = b"".join(read_chunks(response)).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(len(primary), 0)
+
+    def test_write_pins_client_to_primary(self):
+        response, primary, replica = self.request(
+            "patch", reverse("song-detail", args=[self.song.id]), {"title": "Новая"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response, primary, replica = self.request("get", reverse("song-detail", args=[self.song.id]))
+        self.assertEqual(response.data["title"], "Новая")
+        self.assertEqual(replica, 0)
+        del self.client.cookies[PIN_COOKIE]
+        self.assertEqual(self.request("get", reverse("song-detail", args=[self.song.id]))[1], 0)
+
+    def test_failed_write_does_not_pin(self):
+        response, _, _ = self.request("post", reverse("song-list"), {})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
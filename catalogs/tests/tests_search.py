@@ -0,0 +1,99 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, SearchEntry, Song
+from catalogs.search import rebuild_search_index
+from catalogs.tests import catalog_reads
+
+
+@catalog_reads
+class TestSearch(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Кино")
+        self.album = Album.objects.create(title="Группа крови", release_year=1988, artist=self.artist)
+        self.song = Song.objects.create(title="Звезда по имени Солнце")
+        self.other = Song.objects.create(title="Группа крови")
+        AlbumSong.objects.create(album=self.album, song=self.song, track_number=1)
+        AlbumSong.objects.create(album=self.album, song=self.other, track_number=2)
+
+    def search(self, q, **params):
+        response = self.client.get(reverse("search-list"), {"q": q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item["type"], item["id"]) for item in response.data["results"]]
+
+    def test_mixed_ranked_results(self):
+        results = self.search("группа крови")
+        # Совпадение в собственном названии выше, чем совпадение только в названии альбома
+        self.assertEqual(set(results[:2]), {("album", self.album.id), ("song", self.other.id)})
+        self.assertEqual(results[2], ("song", self.song.id))
+        self.assertEqual(self.search("кино", type="song"), [("song", self.song.id), ("song", self.other.id)])
+
+    def test_prefix_and_stemming(self):
+        self.assertIn(("song", self.song.id), self.search("звезды по имени солн"))
+
+    def test_invalid_query(self):
+        for params in ({"q": " ,. "}, {}, {"q": "кино", "type": "label"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("search-list"), params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_incremental_updates(self):
+        self.artist.name = "Аквариум"
+        self.artist.save()
+        self.assertEqual(self.search("кино"), [])
+        self.assertIn(("song", self.song.id), self.search("аквариум"))
+
+        AlbumSong.objects.filter(song=self.song).delete()
+        self.assertNotIn(("song", self.song.id), self.search("аквариум"))
+
+        self.album.delete()
+        self.assertEqual(self.search("аквариум"), [("artist", self.artist.id)])
+        self.assertEqual(self.search("группа"), [("song", self.other.id)])
+
+        self.artist.delete()
+        self.other.delete()
+        self.assertEqual(list(SearchEntry.objects.values_list("kind", "object_id")), [("song", self.song.id)])
+
+    def test_artist_delete_updates_songs(self):
+        self.artist.delete()
+        self.assertEqual(self.search("кино"), [])
+        self.assertEqual(self.search("звезда"), [("song", self.song.id)])
+
+    def test_bulk_writes(self):
+        data = [{"title": "Группа крови", "release_year": 1989, "artist": self.artist.id, "songs": []}]
+        self.client.post(reverse("album-bulk"), data, format="json")
+        self.assertEqual(self.search("группа", type="song"), [("song", self.other.id)])
+        self.assertEqual(self.search("кино", type="song"), [])
+
+    def test_rebuild(self):
+        expected = set(SearchEntry.objects.values_list("kind", "object_id", "title", "search_vector"))
+        SearchEntry.objects.all().delete()
+        rebuild_search_index()
+        self.assertEqual(set(SearchEntry.objects.values_list("kind", "object_id", "title", "search_vector")), expected)
+
+    def test_pagination(self):
+        response = self.client.get(reverse("search-list"), {"q": "группа", "limit": 1})
+        self.assertEqual(response.data["count"], 3)
+        self.assertIsNotNone(response.data["next"])
+        with self.assertNumQueries(2):
+            self.client.get(reverse("search-list"), {"q": "группа", "limit": 1, "offset": 1})
+
+    def test_candidates_limit(self):
+        with override_settings(CATALOG_SEARCH_CANDIDATES=2):
+            response = self.client.get(reverse("search-list"), {"q": "группа"})
+            self.assertEqual(response.data["count"], 2)
+            self.assertEqual(len(response.data["results"]), 2)
+            self.assertEqual(len(self.search("группа", type="song")), 2)
+
+    def test_candidates_prefer_own_title(self):
+        # Совпадений только по имени исполнителя больше предела, но сам исполнитель в выдаче
+        for number in range(3, 8):
+            song = Song.objects.create(title=f"Песня {number}")
+            AlbumSong.objects.create(album=self.album, song=song, track_number=number)
+        with override_settings(CATALOG_SEARCH_CANDIDATES=2):
+            self.assertEqual(self.search("кино")[0], ("artist", self.artist.id))
+            self.assertEqual(self.search("кин")[0], ("artist", self.artist.id))
+            self.assertIn(("song", self.other.id), self.search("крови", type="song"))
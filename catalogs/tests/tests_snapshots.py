@@ -0,0 +1,107 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Snapshot, Song
+from catalogs.tests import catalog_reads
+
+
+@override_settings(CATALOG_SNAPSHOTS=True)
+@catalog_reads
+class TestSnapshots(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.artist = Artist.objects.create(name="Исполнитель")
+            self.song = Song.objects.create(title="Песня")
+            self.album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+            AlbumSong.objects.create(album=self.album, song=self.song, track_number=1)
+
+    def get(self, name, *args, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content), [query["sql"] for query in queries]
+
+    def get_live(self, name, *args):
+        with override_settings(CATALOG_SNAPSHOTS=False):
+            return self.get(name, *args)[0]
+
+    def test_documents_match_live_representation(self):
+        self.assertEqual(Snapshot.objects.count(), 2)
+        for name, args in (
+            ("artist-list", ()),
+            ("artist-detail", (self.artist.id,)),
+            ("album-list", ()),
+            ("album-detail", (self.album.id,)),
+        ):
+            data, queries = self.get(name, *args)
+            self.assertEqual(data, self.get_live(name, *args), name)
+            # Вложенные альбомы, треки и песни из документа не читаются
+            self.assertFalse([sql for sql in queries if AlbumSong._meta.db_table in sql], name)
+        with override_settings(CATALOG_FAST_SERIALIZERS=True):
+            call_command("rebuild_snapshots", stdout=StringIO())
+            self.assertEqual(self.get("album-list")[0], self.get_live("album-list"))
+
+    def test_changes_rebuild_documents(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.song.title = "Новое название"
+            self.song.save()
+        data, queries = self.get("artist-detail", self.artist.id)
+        self.assertEqual(data["albums"][0]["songs"][0]["song"]["title"], "Новое название")
+        self.assertFalse([sql for sql in queries if Song._meta.db_table in sql])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.album.delete()
+        self.assertEqual(list(Snapshot.objects.values_list("kind", flat=True)), [Snapshot.ARTIST])
+        self.assertEqual(self.get("artist-detail", self.artist.id)[0]["albums"], [])
+
+    def test_stale_documents_fall_back_to_serialization(self):
+        # Изменение без коммита: документ построен по прежней версии и не отдаётся
+        self.artist.name = "Переименован"
+        self.artist.save()
+        data, _ = self.get("album-list")
+        self.assertEqual(data["results"][0]["artist"]["name"], "Переименован")
+        self.assertEqual(data, self.get_live("album-list"))
+        Snapshot.objects.all().delete()
+        self.assertEqual(self.get("artist-detail", self.artist.id)[0], self.get_live("artist-detail", self.artist.id))
+        call_command("rebuild_snapshots", stdout=StringIO())
+        self.assertEqual(Snapshot.objects.count(), 2)
+
+    def test_field_selection_uses_serializers(self):
+        data, _ = self.get("album-detail", self.album.id, params={"fields": "title"})
+        self.assertEqual(data, {"id": self.album.id, "title": "Альбом"})
+        data, _ = self.get("artist-list", params={"fields": "summary"})
+        self.assertEqual(data["results"][0]["album_count"], 1)
+
+    @override_settings(CATALOG_CACHE_ENABLED=True)
+    def test_cached_documents(self):
+        caches["catalog"].clear()
+        url = reverse("album-detail", args=[self.album.id])
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.song.title = "Новое название"
+            self.song.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["songs"][0]["song"]["title"], "Новое название")
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+    def test_import_builds_documents(self):
+        directory = Path(tempfile.mkdtemp())
+        call_command("export_catalog", str(directory), stdout=StringIO(), stderr=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            Artist.objects.all().delete()
+        self.assertFalse(Snapshot.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_catalog", str(directory), stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Snapshot.objects.count(), 2)
+        self.assertEqual(self.get("album-list")[0], self.get_live("album-list"))
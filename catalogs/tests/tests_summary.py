@@ -0,0 +1,123 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.tests import catalog_reads
+
+
+def stored_summaries():
+    return (
+        sorted(Album.objects.values_list("id", "artist_name", "track_count", "songs_count")),
+        sorted(Artist.objects.values_list("id", "album_count")),
+    )
+
+
+def computed_summaries():
+    albums = Album.objects.annotate(tracks=Count("albumsong"), distinct_songs=Count("albumsong__song", distinct=True))
+    return (
+        sorted(albums.values_list("id", "artist__name", "tracks", "distinct_songs")),
+        sorted(Artist.objects.annotate(albums_number=Count("albums")).values_list("id", "albums_number")),
+    )
+
+
+@catalog_reads
+class TestSummaries(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Исполнитель")
+        self.songs = [Song.objects.create(title=f"Песня {index}") for index in range(4)]
+        self.album = Album.objects.create(title="Альбом", release_year=2020, artist=self.artist)
+
+    def assert_consistent(self):
+        self.assertEqual(stored_summaries(), computed_summaries())
+
+    def test_incremental_updates(self):
+        AlbumSong.objects.create(album=self.album, song=self.songs[0], track_number=1)
+        # Та же песня вторым треком (реприза) считается в track_count, но не в songs_count
+        AlbumSong.objects.create(album=self.album, song=self.songs[0], track_number=2)
+        self.album.songs.add(self.songs[1], through_defaults={"track_number": 3})
+        self.album.refresh_from_db()
+        self.assertEqual(
+            (self.album.artist_name, self.album.track_count, self.album.songs_count), ("Исполнитель", 3, 2)
+        )
+        self.songs[1].delete()
+        self.assertEqual(Album.objects.get(pk=self.album.pk).track_count, 2)
+
+        other = Artist.objects.create(name="Другой")
+        album = Album.objects.get(pk=self.album.pk)
+        album.artist = other
+        album.save()
+        self.assert_consistent()
+        other.name = "Переименован"
+        other.save()
+        self.assertEqual(Album.objects.get(pk=self.album.pk).artist_name, "Переименован")
+        album.delete()
+        self.assertEqual(Artist.objects.get(pk=other.pk).album_count, 0)
+        self.assert_consistent()
+
+    def test_api_writes(self):
+        data = {
+            "title": "Новый",
+            "release_year": 2021,
+            "artist": self.artist.id,
+            "songs": [{"song": song.id, "track_number": number} for number, song in enumerate(self.songs, start=1)],
+        }
+        response = self.client.post(reverse("album-list"), data, format="json")
+        album_id = response.data["id"]
+        self.assertEqual(Album.objects.get(pk=album_id).track_count, 4)
+        response = self.client.patch(
+            reverse("album-detail", args=[album_id]), {"songs": data["songs"][:1]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Album.objects.get(pk=album_id).track_count, 1)
+        response = self.client.post(reverse("album-bulk"), [{**data, "title": "Массовый"}], format="json")
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(Artist.objects.get(pk=self.artist.pk).album_count, 3)
+        self.assert_consistent()
+
+    def test_summary_representation(self):
+        AlbumSong.objects.create(album=self.album, song=self.songs[0], track_number=1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("album-list"), {"fields": "summary"})
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": self.album.id,
+                    "title": "Альбом",
+                    "release_year": 2020,
+                    "artist": self.artist.id,
+                    "artist_name": "Исполнитель",
+                    "track_count": 1,
+                    "songs_count": 1,
+                }
+            ],
+        )
+        tables = (AlbumSong._meta.db_table, Song._meta.db_table, Artist._meta.db_table)
+        self.assertFalse([query["sql"] for query in queries if any(table in query["sql"] for table in tables)])
+        response = self.client.get(reverse("artist-detail", args=[self.artist.id]), {"fields": "summary"})
+        self.assertEqual(response.data, {"id": self.artist.id, "name": "Исполнитель", "album_count": 1})
+        response = self.client.get(reverse("album-list"), {"fields": "summary.title"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_loads(self):
+        call_command("test_data", artists=7, songs=30, albums=20, seed=1, batch_size=6, stdout=StringIO())
+        self.assert_consistent()
+        directory = Path(tempfile.mkdtemp())
+        call_command("export_catalog", str(directory), stdout=StringIO(), stderr=StringIO())
+        Artist.objects.all().delete()
+        call_command("import_catalog", str(directory), stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Album.objects.count(), 21)
+        self.assert_consistent()
+        Album.objects.update(track_count=0)
+        call_command("rebuild_summaries", stdout=StringIO())
+        self.assert_consistent()
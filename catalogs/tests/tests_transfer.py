@@ -0,0 +1,105 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from catalogs.models import Album, AlbumSong, Artist, ChangeEvent, SearchEntry, Song
+from catalogs.search import search
+
+
+def snapshot():
+    return (
+        sorted(Artist.objects.values_list("name", flat=True)),
+        sorted(Song.objects.values_list("title", flat=True)),
+        sorted(Album.objects.values_list("title", "release_year", "artist__name")),
+        sorted(AlbumSong.objects.values_list("album__title", "track_number", "song__title")),
+    )
+
+
+class TestCatalogTransfer(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        artists = [Artist.objects.create(name=f"Исполнитель, {index}") for index in range(3)]
+        songs = [Song.objects.create(title=f'Песня "{index}"\nвторая строка') for index in range(6)]
+        for index, artist in enumerate(artists):
+            album = Album.objects.create(title="Альбом", release_year=2000 + index, artist=artist)
+            for number, song in enumerate(songs[index:], start=1):
+                AlbumSong.objects.create(album=album, song=song, track_number=number)
+
+    def call(self, name, *args, **options):
+        call_command(name, *args, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def clear(self):
+        Artist.objects.all().delete()
+        Song.objects.all().delete()
+
+    def test_roundtrip(self):
+        expected = snapshot()
+        for path in (self.directory / "csv", self.directory / "catalog.ndjson"):
+            with self.subTest(path=path.name):
+                self.call("export_catalog", str(path))
+                self.clear()
+                self.call("import_catalog", str(path))
+                self.assertEqual(snapshot(), expected)
+        self.assertEqual(SearchEntry.objects.filter(kind="song").count(), 6)
+
+    def test_merge_into_existing(self):
+        self.call("export_catalog", str(self.directory))
+        expected = snapshot()
+        album = Album.objects.get(artist__name="Исполнитель, 0")
+        Album.objects.filter(pk=album.pk).update(release_year=1999)
+        AlbumSong.objects.filter(album=album, track_number__gt=2).delete()
+        AlbumSong.objects.filter(album=album, track_number=1).update(song=Song.objects.last())
+        AlbumSong.objects.create(album=album, song=Song.objects.first(), track_number=50)
+        Artist.objects.filter(name="Исполнитель, 2").delete()
+        extra = Artist.objects.create(name="Только в этой БД")
+        updated_at = Artist.objects.get(name="Исполнитель, 1").updated_at
+        last_event = ChangeEvent.objects.latest("id").pk
+
+        self.call("import_catalog", str(self.directory))
+        artists, songs, albums, tracks = snapshot()
+        self.assertEqual((artists, songs, albums, tracks), (sorted([*expected[0], extra.name]), *expected[1:]))
+        # Записи, которые не изменились, сохраняют updated_at, поэтому их ETag остаются прежними
+        self.assertEqual(Artist.objects.get(name="Исполнитель, 1").updated_at, updated_at)
+        self.assertGreater(Artist.objects.get(name="Исполнитель, 0").updated_at, updated_at)
+        # Поиск обновлён для восстановленного исполнителя и песен его альбома
+        found = search("Исполнитель 2")
+        self.assertEqual(
+            sorted(found.values_list("kind", "title")),
+            sorted([("album", "Альбом"), ("artist", "Исполнитель, 2")] + [("song", title) for title in songs[2:]]),
+        )
+        # Журнал изменений получил события изменённых загрузкой записей, а не всего каталога
+        changed = set(ChangeEvent.objects.filter(id__gt=last_event).values_list("model", "object_id"))
+        self.assertIn(("album", album.pk), changed)
+        self.assertIn(("artist", Artist.objects.get(name="Исполнитель, 2").pk), changed)
+        self.assertNotIn(("artist", Artist.objects.get(name="Исполнитель, 1").pk), changed)
+
+        counts = [model.objects.count() for model in (Artist, Song, Album, AlbumSong)]
+        self.call("import_catalog", str(self.directory))
+        self.assertEqual([model.objects.count() for model in (Artist, Song, Album, AlbumSong)], counts)
+
+    def test_same_titled_songs(self):
+        # Две разные песни с одним названием в разных альбомах не сливаются ни при загрузке в пустой каталог,
+        # ни при повторной загрузке в тот же
+        albums = list(Album.objects.order_by("id")[:2])
+        for album in albums:
+            AlbumSong.objects.create(album=album, song=Song.objects.create(title="Intro"), track_number=100)
+        expected = snapshot()
+        self.call("export_catalog", str(self.directory))
+        self.clear()
+        for _ in range(2):
+            self.call("import_catalog", str(self.directory))
+            self.assertEqual(snapshot(), expected)
+            intros = AlbumSong.objects.filter(song__title="Intro")
+            self.assertEqual(Song.objects.filter(title="Intro").count(), 2)
+            self.assertEqual(len(set(intros.values_list("song_id", flat=True))), 2)
+
+    def test_invalid_input(self):
+        path = self.directory / "broken.ndjson"
+        path.write_text('{"table": "artist", "id": 1, "name": "Новый"}\n{"table": "label"}\n')
+        expected = snapshot()
+        with self.assertRaises(CommandError):
+            self.call("import_catalog", str(path))
+        self.assertEqual(snapshot(), expected)
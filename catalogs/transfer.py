@@ -0,0 +1,446 @@
+import json
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from catalogs.cache import bump_tags
+from catalogs.changes import record_merged_changes
+from catalogs.copy import ProgressFile, copy_from_file, copy_rows, copy_to_file
+from catalogs.models import Album, AlbumSong, Artist, Song
+from catalogs.search import index_entries
+from catalogs.snapshots import schedule_snapshots
+from catalogs.summary import update_summaries
+
+# Таблицы выгрузки в порядке загрузки: имя таблицы в файле, модель и колонки с типами staging-таблицы.
+# Связи выгружаются id исходной БД, при загрузке они сопоставляются по естественным ключам.
+TABLES = {
+    "artist": (Artist, (("id", "bigint"), ("name", "text"))),
+    "song": (Song, (("id", "bigint"), ("title", "text"))),
+    "album": (Album, (("id", "bigint"), ("title", "text"), ("release_year", "integer"), ("artist_id", "bigint"))),
+    "album_song": (AlbumSong, (("album_id", "bigint"), ("song_id", "bigint"), ("track_number", "integer"))),
+}
+CSV_OPTIONS = "FORMAT csv, HEADER true"
+NDJSON_BATCH_SIZE = 10000
+
+# Слияние staging-таблиц с таблицами каталога. Естественные ключи: имя исполнителя,
+# id и название песни (см. map_song), название альбома
+# у исполнителя и номер трека в альбоме. Треклисты загруженных альбомов заменяются
+# целиком. Изменённые записи собираются в changed_*: по ним обновляются updated_at, поиск
+# и сводные колонки альбомов и исполнителей.
+MERGE = (
+    (None, "CREATE TEMP TABLE changed_artist (id bigint)"),
+    (None, "CREATE TEMP TABLE changed_album (id bigint)"),
+    (None, "CREATE TEMP TABLE changed_song (id bigint)"),
+    (
+        "Исполнители",
+        """
+        WITH merged AS (
+            INSERT INTO {artist} (name, updated_at)
+            SELECT DISTINCT name, %(now)s FROM staging_artist
+            ON CONFLICT (name) DO NOTHING
+            RETURNING id
+        )
+        INSERT INTO changed_artist SELECT id FROM merged
+        """,
+    ),
+    (
+        None,
+        """
+        CREATE TEMP TABLE map_artist AS
+        SELECT DISTINCT ON (staging.id) staging.id AS source_id, artist.id AS target_id
+        FROM staging_artist staging JOIN {artist} artist ON artist.name = staging.name
+        """,
+    ),
+    (None, "ANALYZE map_artist"),
+    (
+        None,
+        # Песни без естественного ключа: та же песня - та, что осталась с тем же id и названием
+        # (повторная загрузка выгрузки этой же БД)
+        """
+        CREATE TEMP TABLE map_song AS
+        SELECT DISTINCT ON (staging.id) staging.id AS source_id, song.id AS target_id
+        FROM staging_song staging JOIN {song} song ON song.id = staging.id AND song.title = staging.title
+        """,
+    ),
+    (None, "CREATE INDEX ON map_song (source_id)"),
+    (None, "CREATE INDEX ON map_song (target_id)"),
+    (None, "ANALYZE map_song"),
+    (
+        None,
+        # Иначе по названию, только если оно однозначно и в выгрузке, и в каталоге:
+        # разные песни с одинаковым названием ("Intro") не объединяются. Однозначные названия
+        # собираются один раз группировкой, а не подсчётом на каждую строку выгрузки
+        """
+        CREATE TEMP TABLE staging_song_title AS
+        SELECT title FROM staging_song GROUP BY title HAVING count(DISTINCT id) = 1
+        """,
+    ),
+    (None, "ANALYZE staging_song_title"),
+    (
+        None,
+        """
+        CREATE TEMP TABLE song_title AS
+        SELECT song.title, min(song.id) AS id
+        FROM {song} song JOIN staging_song_title staging ON staging.title = song.title
+        GROUP BY song.title HAVING count(*) = 1
+        """,
+    ),
+    (None, "ANALYZE song_title"),
+    (
+        None,
+        """
+        INSERT INTO map_song
+        SELECT DISTINCT ON (staging.id) staging.id, song.id
+        FROM staging_song staging
+        JOIN staging_song_title unique_title ON unique_title.title = staging.title
+        JOIN song_title song ON song.title = staging.title
+        WHERE NOT EXISTS (SELECT 1 FROM map_song map WHERE map.source_id = staging.id)
+            AND NOT EXISTS (SELECT 1 FROM map_song map WHERE map.target_id = song.id)
+        """,
+    ),
+    (
+        None,
+        # Остальные песни создаются по одной на id выгрузки. Свободный id выгрузки сохраняется, поэтому
+        # следующая загрузка той же выгрузки найдёт песню по id; занятый заменяется новым из последовательности,
+        # которая сначала сдвигается за все id выгрузки, чтобы новые id с ними не совпали
+        """
+        SELECT setval(
+            pg_get_serial_sequence('{song}', 'id'),
+            greatest(nextval(pg_get_serial_sequence('{song}', 'id')), (SELECT coalesce(max(id), 0) FROM staging_song))
+        )
+        """,
+    ),
+    (
+        None,
+        """
+        CREATE TEMP TABLE new_song AS
+        SELECT
+            source_id,
+            CASE
+                WHEN EXISTS (SELECT 1 FROM {song} song WHERE song.id = source_id) THEN nextval(pg_get_serial_sequence('{song}', 'id'))
+                ELSE source_id
+            END AS target_id,
+            title
+        FROM (
+            SELECT DISTINCT ON (staging.id) staging.id AS source_id, staging.title
+            FROM staging_song staging
+            WHERE NOT EXISTS (SELECT 1 FROM map_song map WHERE map.source_id = staging.id)
+            ORDER BY staging.id
+        ) missing
+        """,
+    ),
+    (
+        "Песни",
+        """
+        WITH merged AS (
+            INSERT INTO {song} (id, title, updated_at)
+            SELECT target_id, title, %(now)s FROM new_song
+            RETURNING id
+        )
+        INSERT INTO changed_song SELECT id FROM merged
+        """,
+    ),
+    (None, "INSERT INTO map_song SELECT source_id, target_id FROM new_song"),
+    (None, "ANALYZE map_song"),
+    (
+        "Альбомы",
+        """
+        WITH merged AS (
+            INSERT INTO {album} (title, release_year, artist_id, updated_at)
+            SELECT DISTINCT ON (staging.title, map.target_id) staging.title, staging.release_year, map.target_id, %(now)s
+            FROM staging_album staging JOIN map_artist map ON map.source_id = staging.artist_id
+            ORDER BY staging.title, map.target_id, staging.id
+            ON CONFLICT (title, artist_id) DO UPDATE
+            SET release_year = EXCLUDED.release_year, updated_at = EXCLUDED.updated_at
+            WHERE {album}.release_year <> EXCLUDED.release_year
+            RETURNING id
+        )
+        INSERT INTO changed_album SELECT id FROM merged
+        """,
+    ),
+    (
+        None,
+        """
+        CREATE TEMP TABLE map_album AS
+        SELECT DISTINCT ON (staging.id) staging.id AS source_id, album.id AS target_id
+        FROM staging_album staging
+        JOIN map_artist map ON map.source_id = staging.artist_id
+        JOIN {album} album ON album.title = staging.title AND album.artist_id = map.target_id
+        """,
+    ),
+    (None, "ANALYZE map_album"),
+    (
+        None,
+        # Песни треков, которые будут удалены или заменены: после слияния их уже не найти
+        """
+        INSERT INTO changed_song
+        SELECT track.song_id
+        FROM {album_song} track
+        JOIN map_album album ON album.target_id = track.album_id
+        LEFT JOIN staging_album_song staging
+            ON staging.album_id = album.source_id AND staging.track_number = track.track_number
+        LEFT JOIN map_song song ON song.source_id = staging.song_id
+        WHERE song.target_id IS DISTINCT FROM track.song_id
+        """,
+    ),
+    (
+        "Удалённые треки",
+        """
+        WITH removed AS (
+            DELETE FROM {album_song} track USING map_album map
+            WHERE track.album_id = map.target_id AND NOT EXISTS (
+                SELECT 1 FROM staging_album_song staging
+                WHERE staging.album_id = map.source_id AND staging.track_number = track.track_number
+            )
+            RETURNING track.album_id
+        )
+        INSERT INTO changed_album SELECT album_id FROM removed
+        """,
+    ),
+    (
+        "Треки",
+        """
+        WITH merged AS (
+            INSERT INTO {album_song} (album_id, song_id, track_number)
+            SELECT DISTINCT ON (album.target_id, staging.track_number)
+                album.target_id, song.target_id, staging.track_number
+            FROM staging_album_song staging
+            JOIN map_album album ON album.source_id = staging.album_id
+            JOIN map_song song ON song.source_id = staging.song_id
+            ORDER BY album.target_id, staging.track_number
+            ON CONFLICT (album_id, track_number) DO UPDATE SET song_id = EXCLUDED.song_id
+            WHERE {album_song}.song_id <> EXCLUDED.song_id
+            RETURNING album_id
+        )
+        INSERT INTO changed_album SELECT album_id FROM merged
+        """,
+    ),
+    (None, "ANALYZE changed_album"),
+    (
+        None,
+        """
+        INSERT INTO changed_song
+        SELECT song_id FROM {album_song} WHERE album_id IN (SELECT id FROM changed_album)
+        """,
+    ),
+    (None, "ANALYZE changed_song"),
+    (
+        None,
+        """
+        UPDATE {album} SET updated_at = %(now)s WHERE id IN (SELECT id FROM changed_album)
+        """,
+    ),
+    (
+        None,
+        """
+        UPDATE {artist} SET updated_at = %(now)s
+        WHERE id IN (SELECT artist_id FROM {album} WHERE id IN (SELECT id FROM changed_album))
+        """,
+    ),
+)
+DB_TABLES = {name: model._meta.db_table for name, (model, _) in TABLES.items()}
+# Временные таблицы загрузки удаляются в конце merge: если транзакция внешняя (например,
+# в тестах), ON COMMIT DROP не сработал бы до следующей загрузки в той же сессии
+TEMP_TABLES = [f"staging_{name}" for name in TABLES] + [
+    "map_artist",
+    "map_song",
+    "staging_song_title",
+    "song_title",
+    "new_song",
+    "map_album",
+    "changed_artist",
+    "changed_album",
+    "changed_song",
+]
+
+
+class ProgressReport:
+    """
+    Вывод прогресса выгрузки и загрузки: итог каждого шага (передано seconds)
+    и промежуточные значения не чаще раза в interval секунд.
+    """
+
+    def __init__(self, stream, interval=1.0):
+        self.stream = stream
+        self.interval = interval
+        self.printed = 0
+
+    def __call__(self, name, rows=None, size=None, seconds=None):
+        now = time.monotonic()
+        if seconds is None and now - self.printed < self.interval:
+            return
+        self.printed = now
+        parts = [name]
+        if rows is not None:
+            parts.append(f"{rows} строк")
+        if size is not None:
+            parts.append(f"{size / 1024 / 1024:.0f} МБ")
+        if seconds is not None:
+            parts.append(f"{seconds:.1f} с")
+        self.stream.write(": ".join(parts[:2]) + "".join(f", {part}" for part in parts[2:]))
+
+
+def get_file_name(name):
+    return f"{name}.csv"
+
+
+@contextmanager
+def snapshot():
+    """
+    Транзакция, в которой все запросы читают один снимок БД (REPEATABLE READ),
+    поэтому связи между таблицами выгрузки согласованы даже при параллельной записи.
+    Внутри уже открытой транзакции используется её уровень изоляции.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def export_csv(directory, report):
+    """
+    Выгружает таблицы каталога в CSV-файлы каталога directory командой COPY ... TO STDOUT.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    with snapshot():
+        for name, (model, columns) in TABLES.items():
+            started = time.perf_counter()
+            sql = (
+                f"COPY (SELECT {', '.join(column for column, _ in columns)} FROM {model._meta.db_table} ORDER BY 1) "
+                f"TO STDOUT WITH ({CSV_OPTIONS})"
+            )
+            with open(directory / get_file_name(name), "wb") as file:
+                rows = copy_to_file(sql, ProgressFile(file, lambda size, name=name: report(name, size=size)))
+            report(name, rows=rows, seconds=time.perf_counter() - started)
+
+
+def export_ndjson(file, report, batch_size=NDJSON_BATCH_SIZE):
+    """
+    Выгружает таблицы каталога в один NDJSON-файл, по строке на запись с полем `table`.
+
+    Строки JSON собирает Postgres, они читаются серверным курсором порциями по batch_size.
+    """
+    with snapshot():
+        for name, (model, columns) in TABLES.items():
+            started = time.perf_counter()
+            fields = ", ".join(f"'{column}', {column}" for column, _ in columns)
+            rows = 0
+            with connection.chunked_cursor() as cursor:
+                cursor.execute(
+                    f"SELECT json_build_object('table', %s, {fields})::text FROM {model._meta.db_table} ORDER BY {columns[0][0]}",
+                    [name],
+                )
+                while batch := cursor.fetchmany(batch_size):
+                    file.write("".join(f"{line}\n" for (line,) in batch).encode())
+                    rows += len(batch)
+                    report(name, rows=rows)
+            report(name, rows=rows, seconds=time.perf_counter() - started)
+
+
+def create_staging_tables():
+    with connection.cursor() as cursor:
+        for name, (_, columns) in TABLES.items():
+            definition = ", ".join(f"{column} {type_}" for column, type_ in columns)
+            cursor.execute(f"CREATE TEMP TABLE staging_{name} ({definition})")
+
+
+def load_csv(directory, report):
+    """
+    Загружает CSV-файлы выгрузки в staging-таблицы. Отсутствующий файл - пустая таблица.
+    """
+    for name, (_, columns) in TABLES.items():
+        path = directory / get_file_name(name)
+        if not path.exists():
+            continue
+        started = time.perf_counter()
+        sql = f"COPY staging_{name} ({', '.join(column for column, _ in columns)}) FROM STDIN WITH ({CSV_OPTIONS})"
+        with open(path, "rb") as file:
+            rows = copy_from_file(sql, ProgressFile(file, lambda size, name=name: report(name, size=size)))
+        report(name, rows=rows, seconds=time.perf_counter() - started)
+
+
+def load_ndjson(file, report, batch_size=NDJSON_BATCH_SIZE):
+    """
+    Загружает NDJSON-выгрузку в staging-таблицы порциями по batch_size строк на таблицу.
+    """
+    buffers = {name: [] for name in TABLES}
+    counts = dict.fromkeys(TABLES, 0)
+
+    def flush(name):
+        columns = [column for column, _ in TABLES[name][1]]
+        copy_rows(f"staging_{name}", columns, buffers[name])
+        counts[name] += len(buffers[name])
+        buffers[name].clear()
+        report(name, rows=counts[name])
+
+    for number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            name = record["table"]
+            row = [record[column] for column, _ in TABLES[name][1]]
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError(f"Строка {number}: некорректная запись ({exc}).") from None
+        buffers[name].append(row)
+        if len(buffers[name]) >= batch_size:
+            flush(name)
+    for name in TABLES:
+        if buffers[name]:
+            flush(name)
+
+
+def merge(report):
+    """
+    Сливает staging-таблицы с каталогом, затем обновляет поиск, сводные колонки и журнал
+    изменений, планирует построение готовых документов и сбрасывает кэш ответов.
+    """
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for name in TABLES:
+            cursor.execute(f"ANALYZE staging_{name}")
+        for label, sql in MERGE:
+            started = time.perf_counter()
+            cursor.execute(sql.format(**DB_TABLES), {"now": now})
+            if label is not None:
+                report(label, rows=cursor.rowcount, seconds=time.perf_counter() - started)
+        started = time.perf_counter()
+        index_entries("artist", subquery="SELECT id FROM changed_artist")
+        index_entries("album", subquery="SELECT id FROM changed_album")
+        index_entries("song", subquery="SELECT id FROM changed_song")
+        report("Поиск", seconds=time.perf_counter() - started)
+        started = time.perf_counter()
+        update_summaries("album", subquery="SELECT id FROM changed_album")
+        update_summaries(
+            "artist",
+            subquery=f"SELECT artist_id FROM {DB_TABLES['album']} WHERE id IN (SELECT id FROM changed_album)",
+        )
+        report("Сводки", seconds=time.perf_counter() - started)
+        record_merged_changes()
+        if settings.CATALOG_SNAPSHOTS:
+            cursor.execute("SELECT id FROM changed_album")
+            album_ids = {row[0] for row in cursor.fetchall()}
+            cursor.execute(
+                f"SELECT id FROM changed_artist UNION SELECT artist_id FROM {DB_TABLES['album']} "
+                "WHERE id IN (SELECT id FROM changed_album)"
+            )
+            artist_ids = {row[0] for row in cursor.fetchall()}
+            schedule_snapshots(album_ids, artist_ids)
+        cursor.execute(f"DROP TABLE {', '.join(TEMP_TABLES)}")
+    # Записи изменены в обход catalog_changed, поэтому кэш списков сбрасывается вручную
+    transaction.on_commit(lambda: bump_tags({"artist:*", "album:*", "song:*"}))
+
+
+def import_catalog(load, report):
+    """
+    Загружает выгрузку в одной транзакции: при ошибке каталог не меняется.
+    """
+    with transaction.atomic():
+        create_staging_tables()
+        load(report)
+        merge(report)
@@ -1,12 +1,15 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from catalogs.views import AlbumViewSet, ArtistViewSet, SongViewSet
+from catalogs.views import AlbumViewSet, ArtistViewSet, ChangeViewSet, JobViewSet, SearchViewSet, SongViewSet
 
 router = DefaultRouter()
 router.register(r"artists", ArtistViewSet)
 router.register(r"albums", AlbumViewSet)
 router.register(r"songs", SongViewSet)
+router.register(r"search", SearchViewSet, basename="search")
+router.register(r"jobs", JobViewSet)
+router.register(r"changes", ChangeViewSet, basename="change")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -1,46 +1,178 @@
+from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import (
     OpenApiResponse,
     extend_schema,
     extend_schema_view,
+    inline_serializer,
 )
-from rest_framework.exceptions import NotFound
-from rest_framework.viewsets import ModelViewSet
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
-from catalogs.models import Album, Artist, Song
-from catalogs.pagination import CustomLOPagination
+from catalogs.async_views import AsyncReadMixin
+from catalogs.bulk import AlbumBulkSerializer, ArtistBulkSerializer, BulkMixin, SongBulkSerializer
+from catalogs.cache import CacheResponseMixin
+from catalogs.changes import check_sequence, get_changes_queryset, get_limit, parse_sequence
+from catalogs.conditional import ConditionalMixin
+from catalogs.export import NDJSON_CONTENT_TYPE, ExportMixin
+from catalogs.fast import FastSerializer
+from catalogs.fieldsets import SUMMARY, get_field_selection, select_fields
+from catalogs.filters import AlbumFilter, ArtistFilter, JobFilter, SongFilter
+from catalogs.jobs import BackgroundWriteMixin
+from catalogs.metrics import MetricsMixin
+from catalogs.models import Album, Artist, ChangeEvent, Job, SearchEntry, Song
+from catalogs.pagination import CustomLOPagination, SearchPagination
+from catalogs.prefetch import build_queryset
+from catalogs.routers import ReplicaMixin
+from catalogs.search import search
 from catalogs.serializers import (
     AlbumListRetvieveSerializer,
     AlbumSerializer,
+    AlbumSummarySerializer,
     ArtistListRetrieveSerializer,
     ArtistSerializer,
+    ArtistSummarySerializer,
+    ChangeEventSerializer,
+    JobSerializer,
+    SearchEntrySerializer,
     SongSerializer,
 )
+from catalogs.snapshots import SnapshotMixin
 from fixture.fixture import (
+    ACCEPTED_DESCRIPTION,
     ALBUM_ARTIST,
     ALBUM_ERROR,
     ALBUM_RELEASE_YEAR,
     ALBUM_SETTINGS,
+    ALBUM_TITLE_ICONTAINS,
+    ALBUM_TITLE_ISTARTSWITH,
+    ALBUM_TITLE_SIMILAR,
     ALMUB_TITLE,
     ARTIST_200_DESCRIPTION,
     ARTIST_ERROR,
     ARTIST_NAME,
+    ARTIST_NAME_ICONTAINS,
+    ARTIST_NAME_ISTARTSWITH,
+    ARTIST_NAME_SIMILAR,
     ARTIST_SETTINGS,
+    BULK_DESCRIPTION,
+    BULK_RESULT,
+    CHANGES_ERROR,
+    CHANGES_EXPIRED,
+    CHANGES_LIMIT,
+    CHANGES_SETTINGS,
+    CHANGES_SINCE,
+    COUNT,
+    CURSOR,
+    DEPTH,
+    EXPAND,
+    FIELDS,
     ID_ARTIST,
+    IF_MATCH,
+    IF_NONE_MATCH,
+    JOB_ERROR,
+    JOB_ID,
+    JOB_KIND,
+    JOB_SETTINGS,
+    JOB_STATUS,
     LIMIT,
+    NOT_MODIFIED_DESCRIPTION,
     OFFSET,
+    ORDERING,
+    PRECONDITION_FAILED_DESCRIPTION,
+    PREFER,
+    SEARCH_ERROR,
+    SEARCH_QUERY,
+    SEARCH_SETTINGS,
+    SEARCH_TYPE,
     SONG_200_DESCRIPTION,
     SONG_ERROR,
     SONG_ID,
     SONG_SETTINGS,
     SONG_TITLE,
+    SONG_TITLE_ICONTAINS,
+    SONG_TITLE_ISTARTSWITH,
+    SONG_TITLE_SIMILAR,
 )
 
 
-class BaseViewSet(ModelViewSet):
+class BaseViewSet(AsyncReadMixin, ReplicaMixin, MetricsMixin, ModelViewSet):
+    summary_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize(page, many=True))
+        return Response(self.serialize(queryset, many=True))
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            return self.get_paginated_response(self.serialize(page, many=True))
+        return Response(self.serialize([instance async for instance in queryset], many=True))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.serialize(self.get_object()))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(self.serialize(await self.aget_object()))
+
+    def get_queryset(self):
+        # Жадная загрузка связей строится по дереву сериализатора текущего action,
+        # обрезанному параметрами fields, expand и depth
+        serializer = self.get_serializer_class()
+        selection = self.get_field_selection()
+        if selection is not None:
+            serializer = select_fields(serializer(), selection)
+        return build_queryset(serializer, queryset=super().get_queryset())
+
+    def get_serializer(self, *args, **kwargs):
+        selection = self.get_field_selection() if "data" not in kwargs else None
+        # Для чтения можно включить скомпилированные кодировщики вместо полей DRF
+        if settings.CATALOG_FAST_SERIALIZERS and self.action in ("list", "retrieve") and "data" not in kwargs:
+            return FastSerializer(
+                self.get_serializer_class(), *args, many=kwargs.get("many", False), selection=selection
+            )
+        serializer = super().get_serializer(*args, **kwargs)
+        if selection is not None:
+            select_fields(serializer.child if kwargs.get("many") else serializer, selection)
+        return serializer
+
+    def get_field_selection(self):
+        """
+        Выбор полей ответа action LIST и RETRIEVE из параметров fields, expand и depth.
+        """
+        if self.request is None or self.action not in ("list", "retrieve"):
+            return None
+        if not hasattr(self, "_field_selection"):
+            summary = self.summary_serializer_class is not None
+            self._field_selection = get_field_selection(self.request.query_params, summary=summary)
+        return self._field_selection
+
+    def get_read_serializer_class(self, serializer_class):
+        """
+        Сериализатор action LIST и RETRIEVE: краткий при `?fields=summary`, иначе serializer_class.
+        """
+        fields = self.request.query_params.get("fields") if self.request is not None else None
+        if fields == SUMMARY and self.summary_serializer_class is not None:
+            return self.summary_serializer_class
+        return serializer_class
+
     def get_object(self):
         try:
-            return self.model.objects.get(pk=self.kwargs["pk"])
+            return self.get_queryset().get(pk=self.kwargs["pk"])
+        except self.model.DoesNotExist:
+            raise NotFound(self.error_message) from None
+
+    async def aget_object(self):
+        try:
+            return await self.get_queryset().aget(pk=self.kwargs["pk"])
         except self.model.DoesNotExist:
             raise NotFound(self.error_message) from None
 
@@ -50,11 +182,21 @@ class BaseViewSet(ModelViewSet):
     list=extend_schema(
         summary="Список всех исполнителей.",
         description="Получение списка всех исполнителей с пагинацией.\n\n"
-        "У каждого исполнителя возвращаются все альбомы с песнями и порядковыми номера в альбоме.",
+        "У каждого исполнителя возвращаются все альбомы с песнями и порядковыми номера в альбоме, "
+        "с `fields=summary` - только количество альбомов.",
         parameters=[
             LIMIT,
             OFFSET,
+            CURSOR,
+            ORDERING,
+            COUNT,
+            FIELDS,
+            EXPAND,
+            DEPTH,
             ARTIST_NAME,
+            ARTIST_NAME_ICONTAINS,
+            ARTIST_NAME_ISTARTSWITH,
+            ARTIST_NAME_SIMILAR,
         ],
         responses={
             200: OpenApiResponse(
@@ -67,11 +209,18 @@ class BaseViewSet(ModelViewSet):
         summary="Создание нового исполнителя.",
         description="Создание нового исполнителя.\n\nПоле `name` - обязательное.",
         request=ArtistSerializer,
+        parameters=[
+            PREFER,
+        ],
         responses={
             201: OpenApiResponse(
                 response=ArtistSerializer,
                 description="Успешное создание нового исполнителя.",
             ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
         },
     ),
     retrieve=extend_schema(
@@ -79,12 +228,19 @@ class BaseViewSet(ModelViewSet):
         description="Получение информации об исполнителе.\n\nНеобходимо передать `id` исполнителя.",
         parameters=[
             ID_ARTIST,
+            IF_NONE_MATCH,
+            FIELDS,
+            EXPAND,
+            DEPTH,
         ],
         responses={
             200: OpenApiResponse(
                 response=ArtistListRetrieveSerializer,
                 description=ARTIST_200_DESCRIPTION,
             ),
+            304: OpenApiResponse(
+                description=NOT_MODIFIED_DESCRIPTION,
+            ),
         },
     ),
     update=extend_schema(
@@ -93,12 +249,21 @@ class BaseViewSet(ModelViewSet):
         request=ArtistSerializer,
         parameters=[
             ID_ARTIST,
+            IF_MATCH,
+            PREFER,
         ],
         responses={
             200: OpenApiResponse(
                 response=ArtistListRetrieveSerializer,
                 description=ARTIST_200_DESCRIPTION,
             ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            412: OpenApiResponse(
+                description=PRECONDITION_FAILED_DESCRIPTION,
+            ),
         },
     ),
     partial_update=extend_schema(
@@ -107,12 +272,64 @@ class BaseViewSet(ModelViewSet):
         request=ArtistSerializer,
         parameters=[
             ID_ARTIST,
+            IF_MATCH,
+            PREFER,
         ],
         responses={
             200: OpenApiResponse(
                 response=ArtistListRetrieveSerializer,
                 description=ARTIST_200_DESCRIPTION,
-            )
+            ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            412: OpenApiResponse(
+                description=PRECONDITION_FAILED_DESCRIPTION,
+            ),
+        },
+    ),
+    export=extend_schema(
+        summary="Потоковая выгрузка всех исполнителей.",
+        description="Выгрузка всех исполнителей с альбомами и песнями в формате NDJSON, одна запись на строку.\n\n"
+        "С заголовком `If-Modified-Since` выгружаются только исполнители, изменённые после указанной даты.",
+        parameters=[
+            ARTIST_NAME,
+            ARTIST_NAME_ICONTAINS,
+            ARTIST_NAME_ISTARTSWITH,
+            ARTIST_NAME_SIMILAR,
+            FIELDS,
+            EXPAND,
+            DEPTH,
+        ],
+        responses={
+            (200, NDJSON_CONTENT_TYPE): OpenApiResponse(
+                response=ArtistListRetrieveSerializer,
+                description="Поток исполнителей в формате NDJSON.",
+            ),
+            304: OpenApiResponse(description="Исполнители не изменялись."),
+        },
+    ),
+    bulk=extend_schema(
+        summary="Массовое создание и обновление исполнителей.",
+        description=BULK_DESCRIPTION,
+        request=ArtistSerializer(many=True),
+        parameters=[
+            PREFER,
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=BULK_RESULT,
+                description="Результат записи по каждому исполнителю.",
+            ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            400: OpenApiResponse(
+                response=BULK_RESULT,
+                description="Ни один объект не прошёл валидацию.",
+            ),
         },
     ),
     destroy=extend_schema(
@@ -128,18 +345,28 @@ class BaseViewSet(ModelViewSet):
         },
     ),
 )
-class ArtistViewSet(BaseViewSet):
-    queryset = Artist.objects.all()
+class ArtistViewSet(
+    ConditionalMixin, CacheResponseMixin, SnapshotMixin, BackgroundWriteMixin, BulkMixin, ExportMixin, BaseViewSet
+):
+    queryset = Artist.objects.order_by("id")
     pagination_class = CustomLOPagination
     model = Artist
+    cache_tag = "artist"
+    snapshot_kind = "artist"
+    export_serializer_class = ArtistListRetrieveSerializer
+    summary_serializer_class = ArtistSummarySerializer
+    bulk_serializer_class = ArtistBulkSerializer
     error_message = ARTIST_ERROR
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ("name",)
+    filterset_class = ArtistFilter
     ordering_fields = "__all__"
+    # Худший случай: list с count=estimate без статистики таблицы считает строки ещё и точно,
+    # retrieve с несовпавшим If-None-Match делает ещё один запрос версии записи
+    query_budget = {"list": 5, "retrieve": 4}
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
-            return ArtistListRetrieveSerializer
+            return self.get_read_serializer_class(ArtistListRetrieveSerializer)
         else:
             return ArtistSerializer
 
@@ -152,7 +379,14 @@ class ArtistViewSet(BaseViewSet):
         parameters=[
             LIMIT,
             OFFSET,
+            CURSOR,
+            ORDERING,
+            COUNT,
+            FIELDS,
             SONG_TITLE,
+            SONG_TITLE_ICONTAINS,
+            SONG_TITLE_ISTARTSWITH,
+            SONG_TITLE_SIMILAR,
         ],
         responses={
             200: OpenApiResponse(
@@ -165,22 +399,36 @@ class ArtistViewSet(BaseViewSet):
         summary="Создание новой песни.",
         description="Создание новой песни.\n\nПоля `title` - обязательные.",
         request=SongSerializer,
+        parameters=[
+            PREFER,
+        ],
         responses={
             201: OpenApiResponse(
                 response=SongSerializer,
                 description="Успешное создание новой песни.",
             ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
         },
     ),
     retrieve=extend_schema(
         summary="Получение информации о песне.",
         description="Получение информации о песне.\n\nНеобходимо передать `id` песни.",
-        parameters=[SONG_ID],
+        parameters=[
+            SONG_ID,
+            IF_NONE_MATCH,
+            FIELDS,
+        ],
         responses={
             200: OpenApiResponse(
                 response=SongSerializer,
                 description=SONG_200_DESCRIPTION,
             ),
+            304: OpenApiResponse(
+                description=NOT_MODIFIED_DESCRIPTION,
+            ),
         },
     ),
     update=extend_schema(
@@ -189,12 +437,21 @@ class ArtistViewSet(BaseViewSet):
         request=SongSerializer,
         parameters=[
             SONG_ID,
+            IF_MATCH,
+            PREFER,
         ],
         responses={
             200: OpenApiResponse(
                 response=SongSerializer,
                 description=SONG_200_DESCRIPTION,
             ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            412: OpenApiResponse(
+                description=PRECONDITION_FAILED_DESCRIPTION,
+            ),
         },
     ),
     partial_update=extend_schema(
@@ -203,12 +460,43 @@ class ArtistViewSet(BaseViewSet):
         request=SongSerializer,
         parameters=[
             SONG_ID,
+            IF_MATCH,
+            PREFER,
         ],
         responses={
             200: OpenApiResponse(
                 response=SongSerializer,
                 description=SONG_200_DESCRIPTION,
             ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            412: OpenApiResponse(
+                description=PRECONDITION_FAILED_DESCRIPTION,
+            ),
+        },
+    ),
+    bulk=extend_schema(
+        summary="Массовое создание песен.",
+        description=BULK_DESCRIPTION,
+        request=SongSerializer(many=True),
+        parameters=[
+            PREFER,
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=BULK_RESULT,
+                description="Результат записи по каждому песне.",
+            ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            400: OpenApiResponse(
+                response=BULK_RESULT,
+                description="Ни один объект не прошёл валидацию.",
+            ),
         },
     ),
     destroy=extend_schema(
@@ -224,15 +512,18 @@ class ArtistViewSet(BaseViewSet):
         },
     ),
 )
-class SongViewSet(BaseViewSet):
-    queryset = Song.objects.all()
+class SongViewSet(ConditionalMixin, CacheResponseMixin, BackgroundWriteMixin, BulkMixin, BaseViewSet):
+    queryset = Song.objects.order_by("id")
     serializer_class = SongSerializer
+    bulk_serializer_class = SongBulkSerializer
     pagination_class = CustomLOPagination
     model = Song
+    cache_tag = "song"
     error_message = SONG_ERROR
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ("title",)
+    filterset_class = SongFilter
     ordering_fields = "__all__"
+    query_budget = {"list": 3, "retrieve": 2}
 
 
 @extend_schema(tags=[ALBUM_SETTINGS["name"]])
@@ -240,11 +531,21 @@ class SongViewSet(BaseViewSet):
     list=extend_schema(
         summary="Cписок всех альбомов.",
         description="Получение списка всех альбомов с пагинацией.\n\n"
-        "Каждый альбом содержит информацию о его исполнителе и о песнях с порядковыми номерами в альбоме.",
+        "Каждый альбом содержит информацию о его исполнителе и о песнях с порядковыми номерами в альбоме, "
+        "с `fields=summary` - только имя исполнителя и количество треков.",
         parameters=[
             LIMIT,
             OFFSET,
+            CURSOR,
+            ORDERING,
+            COUNT,
+            FIELDS,
+            EXPAND,
+            DEPTH,
             ALMUB_TITLE,
+            ALBUM_TITLE_ICONTAINS,
+            ALBUM_TITLE_ISTARTSWITH,
+            ALBUM_TITLE_SIMILAR,
             ALBUM_RELEASE_YEAR,
             ALBUM_ARTIST,
         ],
@@ -260,11 +561,18 @@ class SongViewSet(BaseViewSet):
         description="Создание нового альбома.\n\n"
         "\tВсе поля обязательные.\n\n `artist` - передаём id исполнителя.\n\n `song` - передаём id песни.",
         request=AlbumSerializer,
+        parameters=[
+            PREFER,
+        ],
         responses={
             201: OpenApiResponse(
                 response=AlbumListRetvieveSerializer,
                 description="Успешное создание нового альбома.",
             ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
         },
     ),
     retrieve=extend_schema(
@@ -272,12 +580,19 @@ class SongViewSet(BaseViewSet):
         description="Получение информации об альбоме.\n\nНеобходимо передать `id` альбома.",
         parameters=[
             ID_ARTIST,
+            IF_NONE_MATCH,
+            FIELDS,
+            EXPAND,
+            DEPTH,
         ],
         responses={
             200: OpenApiResponse(
                 response=ArtistListRetrieveSerializer,
                 description=ARTIST_200_DESCRIPTION,
             ),
+            304: OpenApiResponse(
+                description=NOT_MODIFIED_DESCRIPTION,
+            ),
         },
     ),
     update=extend_schema(
@@ -286,12 +601,21 @@ class SongViewSet(BaseViewSet):
         request=ArtistSerializer,
         parameters=[
             ID_ARTIST,
+            IF_MATCH,
+            PREFER,
         ],
         responses={
             200: OpenApiResponse(
                 response=ArtistListRetrieveSerializer,
                 description=ARTIST_200_DESCRIPTION,
             ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            412: OpenApiResponse(
+                description=PRECONDITION_FAILED_DESCRIPTION,
+            ),
         },
     ),
     partial_update=extend_schema(
@@ -300,12 +624,66 @@ class SongViewSet(BaseViewSet):
         request=ArtistSerializer,
         parameters=[
             ID_ARTIST,
+            IF_MATCH,
+            PREFER,
         ],
         responses={
             200: OpenApiResponse(
                 response=ArtistListRetrieveSerializer,
                 description=ARTIST_200_DESCRIPTION,
             ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            412: OpenApiResponse(
+                description=PRECONDITION_FAILED_DESCRIPTION,
+            ),
+        },
+    ),
+    export=extend_schema(
+        summary="Потоковая выгрузка всех альбомов.",
+        description="Выгрузка всех альбомов с исполнителем и песнями в формате NDJSON, одна запись на строку.\n\n"
+        "С заголовком `If-Modified-Since` выгружаются только альбомы, изменённые после указанной даты.",
+        parameters=[
+            ALMUB_TITLE,
+            ALBUM_TITLE_ICONTAINS,
+            ALBUM_TITLE_ISTARTSWITH,
+            ALBUM_TITLE_SIMILAR,
+            ALBUM_RELEASE_YEAR,
+            ALBUM_ARTIST,
+            FIELDS,
+            EXPAND,
+            DEPTH,
+        ],
+        responses={
+            (200, NDJSON_CONTENT_TYPE): OpenApiResponse(
+                response=AlbumListRetvieveSerializer,
+                description="Поток альбомов в формате NDJSON.",
+            ),
+            304: OpenApiResponse(description="Альбомы не изменялись."),
+        },
+    ),
+    bulk=extend_schema(
+        summary="Массовое создание и обновление альбомов.",
+        description=BULK_DESCRIPTION,
+        request=AlbumSerializer(many=True),
+        parameters=[
+            PREFER,
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=BULK_RESULT,
+                description="Результат записи по каждому альбому.",
+            ),
+            202: OpenApiResponse(
+                response=JobSerializer,
+                description=ACCEPTED_DESCRIPTION,
+            ),
+            400: OpenApiResponse(
+                response=BULK_RESULT,
+                description="Ни один объект не прошёл валидацию.",
+            ),
         },
     ),
     destroy=extend_schema(
@@ -321,17 +699,171 @@ class SongViewSet(BaseViewSet):
         },
     ),
 )
-class AlbumViewSet(BaseViewSet):
-    queryset = Album.objects.all()
+class AlbumViewSet(
+    ConditionalMixin, CacheResponseMixin, SnapshotMixin, BackgroundWriteMixin, BulkMixin, ExportMixin, BaseViewSet
+):
+    queryset = Album.objects.order_by("id")
     pagination_class = CustomLOPagination
     model = Album
+    cache_tag = "album"
+    snapshot_kind = "album"
+    export_serializer_class = AlbumListRetvieveSerializer
+    summary_serializer_class = AlbumSummarySerializer
+    bulk_serializer_class = AlbumBulkSerializer
     error_message = ALBUM_ERROR
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ("title", "release_year", "artist")
+    filterset_class = AlbumFilter
     ordering_fields = "__all__"
+    query_budget = {"list": 4, "retrieve": 3}
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
-            return AlbumListRetvieveSerializer
+            return self.get_read_serializer_class(AlbumListRetvieveSerializer)
         else:
             return AlbumSerializer
+
+
+@extend_schema(tags=[SEARCH_SETTINGS["name"]])
+@extend_schema_view(
+    list=extend_schema(
+        summary="Поиск по каталогу.",
+        description="Полнотекстовый поиск по именам исполнителей, названиям альбомов и песен.\n\n"
+        "Результаты разных типов возвращаются одним списком по убыванию релевантности `rank`. "
+        "Песню находят и слова из названий её альбомов и имён исполнителей, но ниже, "
+        "чем записи с этими словами в собственном названии.",
+        parameters=[
+            SEARCH_QUERY,
+            SEARCH_TYPE,
+            LIMIT,
+            OFFSET,
+            COUNT,
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=SearchEntrySerializer(many=True),
+                description="Найденные записи.",
+            ),
+            400: OpenApiResponse(
+                description=SEARCH_ERROR,
+            ),
+        },
+    ),
+)
+class SearchViewSet(ReplicaMixin, MetricsMixin, ListModelMixin, GenericViewSet):
+    queryset = SearchEntry.objects.all()
+    serializer_class = SearchEntrySerializer
+    pagination_class = SearchPagination
+    filter_backends = []
+    query_budget = {"list": 2}
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(self.serialize(page, many=True))
+
+    def get_queryset(self):
+        kind = self.request.query_params.get("type")
+        kinds = dict(SearchEntry.KIND_CHOICES)
+        if kind is not None and kind not in kinds:
+            raise ValidationError({"type": [f"Допустимые значения: {', '.join(kinds)}."]})
+        queryset = search(self.request.query_params.get("q", ""), kind)
+        if queryset is None:
+            raise ValidationError({"q": [SEARCH_ERROR]})
+        return queryset
+
+
+@extend_schema(tags=[JOB_SETTINGS["name"]])
+@extend_schema_view(
+    list=extend_schema(
+        summary="Список фоновых задач.",
+        description="Задачи записи, поставленные в очередь с заголовком `Prefer: respond-async`, новые первыми.",
+        parameters=[
+            LIMIT,
+            OFFSET,
+            JOB_STATUS,
+            JOB_KIND,
+        ],
+    ),
+    retrieve=extend_schema(
+        summary="Статус фоновой задачи.",
+        description="Статус задачи и результат: id записанной записи, итог массовой записи или ошибки валидации.",
+        parameters=[
+            JOB_ID,
+        ],
+    ),
+)
+class JobViewSet(MetricsMixin, ListModelMixin, RetrieveModelMixin, GenericViewSet):
+    # Статус читается из основной БД: реплика может ещё не знать о только что созданной задаче
+    queryset = Job.objects.order_by("-id")
+    serializer_class = JobSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = JobFilter
+    query_budget = {"list": 2, "retrieve": 1}
+
+    def get_object(self):
+        try:
+            return self.get_queryset().get(pk=self.kwargs["pk"])
+        except Job.DoesNotExist:
+            raise NotFound(JOB_ERROR) from None
+
+
+@extend_schema(tags=[CHANGES_SETTINGS["name"]])
+@extend_schema_view(
+    list=extend_schema(
+        summary="Лента изменений каталога.",
+        description="События создания, изменения и удаления исполнителей, альбомов и песен в порядке записи.\n\n"
+        "Изменение песни или трека даёт события и для альбомов и исполнителей, в которые они вложены. "
+        "Синхронизация: прочитать каталог целиком, затем запрашивать ленту с `since` из ссылки `next`, "
+        "пока `has_more` - `true`, и повторять позже с последней ссылкой `next`. "
+        "Одна запись может встретиться в ленте несколько раз, актуально последнее событие. "
+        "События хранятся CATALOG_CHANGES_RETENTION_DAYS дней: на позицию старше ответ 410, "
+        "и синхронизацию нужно начать заново с чтения каталога.",
+        parameters=[
+            CHANGES_SINCE,
+            CHANGES_LIMIT,
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=inline_serializer(
+                    name="ChangeFeed",
+                    fields={
+                        "next": serializers.URLField(help_text="Адрес следующей порции событий"),
+                        "has_more": serializers.BooleanField(help_text="Следующая порция уже доступна"),
+                        "results": ChangeEventSerializer(many=True),
+                    },
+                ),
+                description="События после позиции since.",
+            ),
+            400: OpenApiResponse(
+                description=CHANGES_ERROR,
+            ),
+            410: OpenApiResponse(
+                description=CHANGES_EXPIRED,
+            ),
+        },
+    ),
+)
+class ChangeViewSet(ReplicaMixin, MetricsMixin, ListModelMixin, GenericViewSet):
+    queryset = ChangeEvent.objects.all()
+    serializer_class = ChangeEventSerializer
+    pagination_class = None
+    filter_backends = []
+    # Позиция since, кроме 0, сверяется с самым старым событием журнала
+    query_budget = {"list": 2}
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get("since")
+        position = parse_sequence(since)
+        limit = get_limit(request.query_params.get("limit"))
+        check_sequence(position)
+        events = list(get_changes_queryset(position)[: limit + 1])
+        has_more = len(events) > limit
+        events = events[:limit]
+        # Пустая порция оставляет позицию прежней: следующий запрос продолжит с того же места
+        sequence = events[-1].sequence if events else since or "0"
+        return Response(
+            {
+                "next": replace_query_param(request.build_absolute_uri(), "since", sequence),
+                "has_more": has_more,
+                "results": self.serialize(events, many=True),
+            }
+        )
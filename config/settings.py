@@ -6,6 +6,9 @@ from dotenv import load_dotenv
 from fixture.fixture import (
     ALBUM_SETTINGS,
     ARTIST_SETTINGS,
+    CHANGES_SETTINGS,
+    JOB_SETTINGS,
+    SEARCH_SETTINGS,
     SONG_SETTINGS,
 )
 
@@ -25,6 +28,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "drf_spectacular",
@@ -32,6 +36,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "catalogs.metrics.QueryMetricsMiddleware",
+    "catalogs.routers.ReplicaMiddleware",
+    "catalogs.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -60,6 +67,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# Соединения с Postgres. POSTGRES_POOL включает пул psycopg 3 в каждом процессе: под ASGI
+# запросы к БД выполняются в новых потоках, и постоянные соединения потоков (CONN_MAX_AGE)
+# не переиспользуются, поэтому пул обязателен. Без пула соединение живёт POSTGRES_CONN_MAX_AGE
+# секунд (0 - закрывается после каждого запроса) и проверяется перед повторным использованием.
+POSTGRES_POOL = os.getenv("POSTGRES_POOL", "False") == "True"
+POSTGRES_CONN_MAX_AGE = int(os.getenv("POSTGRES_CONN_MAX_AGE", 60))
+# PgBouncer в режиме transaction: серверные курсоры и подготовленные запросы привязаны
+# к соединению с Postgres, которое между транзакциями достаётся другим клиентам
+POSTGRES_PGBOUNCER = os.getenv("POSTGRES_PGBOUNCER", "False") == "True"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -68,8 +85,40 @@ DATABASES = {
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
+        "CONN_MAX_AGE": 0 if POSTGRES_POOL else POSTGRES_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": POSTGRES_PGBOUNCER,
+        "OPTIONS": {},
     }
 }
+if POSTGRES_POOL:
+    # Размер пула задаётся на процесс: всего соединений до workers * POSTGRES_POOL_MAX_SIZE
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", 10)),
+        "timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", 10)),
+        "max_idle": float(os.getenv("POSTGRES_POOL_MAX_IDLE", 600)),
+        "max_lifetime": float(os.getenv("POSTGRES_POOL_MAX_LIFETIME", 3600)),
+    }
+if POSTGRES_PGBOUNCER:
+    DATABASES["default"]["OPTIONS"]["prepare_threshold"] = None
+
+# Реплики для чтения: хосты через запятую (host или host:port), остальные параметры как у основной БД.
+# LIST, RETRIEVE и выгрузка читают со случайной реплики, клиент после записи читает с основной БД
+# POSTGRES_REPLICA_PIN_SECONDS секунд, пока реплики не догонят её
+POSTGRES_REPLICAS = [host.strip() for host in os.getenv("POSTGRES_REPLICAS", "").split(",") if host.strip()]
+POSTGRES_REPLICA_PIN_SECONDS = int(os.getenv("POSTGRES_REPLICA_PIN_SECONDS", 5))
+for index, replica in enumerate(POSTGRES_REPLICAS, start=1):
+    host, _, port = replica.partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "OPTIONS": {**DATABASES["default"]["OPTIONS"]},
+        "TEST": {"MIRROR": "default"},
+    }
+CATALOG_READ_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["catalogs.routers.ReplicaRouter"]
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -100,8 +149,52 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "static", "media")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Кэш ответов каталога. Без CATALOG_CACHE_URL используется память процесса,
+# что подходит только для одного воркера: инвалидация не дойдёт до других процессов.
+CATALOG_CACHE_URL = os.getenv("CATALOG_CACHE_URL")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalog": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CATALOG_CACHE_URL,
+        }
+        if CATALOG_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "catalog",
+        }
+    ),
+}
+CATALOG_CACHE_ALIAS = "catalog"
+CATALOG_CACHE_ENABLED = os.getenv("CATALOG_CACHE_ENABLED", "True") == "True"
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 300))
+
+# Сжатие ответов brotli и gzip (catalogs.compression): ответы меньше CATALOG_COMPRESSION_MIN_SIZE байт
+# не сжимаются, уровни подобраны для сжатия на лету (brotli 0-11, gzip 1-9)
+CATALOG_COMPRESSION = os.getenv("CATALOG_COMPRESSION", "True") == "True"
+CATALOG_COMPRESSION_MIN_SIZE = int(os.getenv("CATALOG_COMPRESSION_MIN_SIZE", 1024))
+CATALOG_BROTLI_QUALITY = int(os.getenv("CATALOG_BROTLI_QUALITY", 4))
+CATALOG_GZIP_LEVEL = int(os.getenv("CATALOG_GZIP_LEVEL", 6))
+
+# JSON ответов и запросов через orjson (catalogs.renderers) вместо модуля json
+CATALOG_ORJSON = os.getenv("CATALOG_ORJSON", "True") == "True"
+# Браузерный API DRF (text/html) для отладки; по умолчанию включён только с DEBUG
+CATALOG_BROWSABLE_API = os.getenv("CATALOG_BROWSABLE_API", str(DEBUG)) == "True"
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "catalogs.renderers.ORJSONRenderer" if CATALOG_ORJSON else "rest_framework.renderers.JSONRenderer",
+        *(["rest_framework.renderers.BrowsableAPIRenderer"] if CATALOG_BROWSABLE_API else []),
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "catalogs.parsers.ORJSONParser" if CATALOG_ORJSON else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
@@ -112,6 +205,58 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 10,
 }
 
+# Максимальный размер страницы и режим подсчёта записей по умолчанию (exact, estimate, none)
+CATALOG_PAGINATION_MAX_LIMIT = int(os.getenv("CATALOG_PAGINATION_MAX_LIMIT", 100))
+CATALOG_PAGINATION_COUNT = os.getenv("CATALOG_PAGINATION_COUNT", "exact")
+
+# Размер порции серверного курсора при потоковой выгрузке каталога
+CATALOG_EXPORT_CHUNK_SIZE = int(os.getenv("CATALOG_EXPORT_CHUNK_SIZE", 500))
+
+# Сериализация LIST и RETRIEVE скомпилированными кодировщиками (catalogs.fast) вместо полей DRF
+CATALOG_FAST_SERIALIZERS = os.getenv("CATALOG_FAST_SERIALIZERS", "False") == "True"
+
+# Готовые JSON-документы исполнителей и альбомов (catalogs.snapshots): строятся после коммита
+# изменений и отдаются LIST и RETRIEVE без сериализации
+CATALOG_SNAPSHOTS = os.getenv("CATALOG_SNAPSHOTS", "False") == "True"
+# Перестраивать документы фоновой задачей воркера (в той же транзакции, что и изменение), а не после коммита
+CATALOG_SNAPSHOTS_BACKGROUND = os.getenv("CATALOG_SNAPSHOTS_BACKGROUND", "False") == "True"
+
+# Конфигурация полнотекстового поиска Postgres: russian стеммит русские слова, а латиницу - как english
+CATALOG_SEARCH_CONFIG = os.getenv("CATALOG_SEARCH_CONFIG", "russian")
+# Сколько найденных индексом записей поиск ранжирует (catalogs.search.search)
+CATALOG_SEARCH_CANDIDATES = int(os.getenv("CATALOG_SEARCH_CANDIDATES", 1000))
+
+# Максимальное количество объектов в одном запросе массовой записи
+CATALOG_BULK_MAX_ITEMS = int(os.getenv("CATALOG_BULK_MAX_ITEMS", 5000))
+
+# Фоновые задачи (catalogs.jobs): количество потоков воркера, пауза между опросами пустой очереди (секунды),
+# время после запуска, через которое незаблокированная воркером выполняемая задача считается
+# потерянной и запускается снова (секунды),
+# максимальное количество запусков одной задачи и срок хранения завершённых задач (дни)
+CATALOG_JOBS_CONCURRENCY = int(os.getenv("CATALOG_JOBS_CONCURRENCY", 2))
+CATALOG_JOBS_POLL_INTERVAL = float(os.getenv("CATALOG_JOBS_POLL_INTERVAL", 1))
+CATALOG_JOBS_TIMEOUT = int(os.getenv("CATALOG_JOBS_TIMEOUT", 60))
+CATALOG_JOBS_MAX_ATTEMPTS = int(os.getenv("CATALOG_JOBS_MAX_ATTEMPTS", 3))
+CATALOG_JOBS_RETENTION_DAYS = int(os.getenv("CATALOG_JOBS_RETENTION_DAYS", 7))
+
+# Максимальное количество событий в одном ответе ленты изменений (/changes/)
+# и срок хранения событий (дни): с позицией старше него лента отвечает 410
+CATALOG_CHANGES_MAX_LIMIT = int(os.getenv("CATALOG_CHANGES_MAX_LIMIT", 1000))
+CATALOG_CHANGES_RETENTION_DAYS = int(os.getenv("CATALOG_CHANGES_RETENTION_DAYS", 30))
+
+# Заголовок Server-Timing с количеством SQL-запросов, временем БД и сериализации
+CATALOG_SERVER_TIMING = os.getenv("CATALOG_SERVER_TIMING", "True") == "True"
+# Превышение бюджета SQL-запросов (query_budget представлений) всегда логируется,
+# а при CATALOG_QUERY_BUDGET_STRICT=True ещё и завершает запрос ошибкой
+CATALOG_QUERY_BUDGET_STRICT = os.getenv("CATALOG_QUERY_BUDGET_STRICT", "False") == "True"
+# Как часто воркер сбрасывает накопленные метрики запросов в кэш каталога, секунды
+CATALOG_METRICS_FLUSH_INTERVAL = float(os.getenv("CATALOG_METRICS_FLUSH_INTERVAL", 5))
+# Токен сборщика метрик для /metrics/ (Authorization: Bearer <токен>); без него метрики видят только сотрудники
+CATALOG_METRICS_TOKEN = os.getenv("CATALOG_METRICS_TOKEN", "")
+
+# Асинхронные обработчики чтения (list, retrieve, export) под ASGI-сервером (uvicorn)
+CATALOG_ASYNC_VIEWS = os.getenv("CATALOG_ASYNC_VIEWS", "False") == "True"
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "API каталога исполнителей с альбомами и их песнями",
     "DESCRIPTION": "Полная документация API каталога исполнителей с альбомами и их песнями",
@@ -124,6 +269,9 @@ SPECTACULAR_SETTINGS = {
         ARTIST_SETTINGS,
         SONG_SETTINGS,
         ALBUM_SETTINGS,
+        SEARCH_SETTINGS,
+        JOB_SETTINGS,
+        CHANGES_SETTINGS,
     ],
     "SORT_OPERATIONS": True,
     "SORT_OPERATION_PARAMETERS": False,
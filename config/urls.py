@@ -3,6 +3,7 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from catalogs.metrics import metrics_view
 from config import settings
 
 urlpatterns = [
@@ -25,6 +26,11 @@ urlpatterns = [
         include("catalogs.urls"),
         name="catalogs",
     ),
+    path(
+        "metrics/",
+        metrics_view,
+        name="metrics",
+    ),
 ]
 
 if settings.DEBUG:
@@ -1,4 +1,5 @@
-from drf_spectacular.utils import OpenApiParameter
+from drf_spectacular.utils import OpenApiParameter, inline_serializer
+from rest_framework import serializers
 
 # Фикстуры для settings
 ARTIST_SETTINGS = {
@@ -13,6 +14,18 @@ SONG_SETTINGS = {
     "name": "Песни",
     "description": "Методы для работы с песнями.",
 }
+SEARCH_SETTINGS = {
+    "name": "Поиск",
+    "description": "Полнотекстовый поиск по исполнителям, альбомам и песням.",
+}
+JOB_SETTINGS = {
+    "name": "Фоновые задачи",
+    "description": "Статус записей, выполняемых в фоне по заголовку `Prefer: respond-async`.",
+}
+CHANGES_SETTINGS = {
+    "name": "Журнал изменений",
+    "description": "Лента изменений каталога для инкрементальной синхронизации.",
+}
 # Фикстуры исполнителя
 ID_ARTIST = OpenApiParameter(
     name="id",
@@ -29,6 +42,24 @@ ARTIST_NAME = OpenApiParameter(
     description="Имя исполнителя",
     required=False,
 )
+ARTIST_NAME_ICONTAINS = OpenApiParameter(
+    name="name__icontains",
+    type=str,
+    description="Имя исполнителя содержит строку без учёта регистра",
+    required=False,
+)
+ARTIST_NAME_ISTARTSWITH = OpenApiParameter(
+    name="name__istartswith",
+    type=str,
+    description="Имя исполнителя начинается со строки без учёта регистра",
+    required=False,
+)
+ARTIST_NAME_SIMILAR = OpenApiParameter(
+    name="name__similar",
+    type=str,
+    description="Имя исполнителя похоже на строку (нечёткий поиск по триграммам)",
+    required=False,
+)
 
 # Фикстуры песен
 SONG_ID = OpenApiParameter(
@@ -46,6 +77,24 @@ SONG_TITLE = OpenApiParameter(
     description="Название песни",
     required=False,
 )
+SONG_TITLE_ICONTAINS = OpenApiParameter(
+    name="title__icontains",
+    type=str,
+    description="Название песни содержит строку без учёта регистра",
+    required=False,
+)
+SONG_TITLE_ISTARTSWITH = OpenApiParameter(
+    name="title__istartswith",
+    type=str,
+    description="Название песни начинается со строки без учёта регистра",
+    required=False,
+)
+SONG_TITLE_SIMILAR = OpenApiParameter(
+    name="title__similar",
+    type=str,
+    description="Название песни похоже на строку (нечёткий поиск по триграммам)",
+    required=False,
+)
 
 # Фикстуры альбома
 ALBUM_ID = OpenApiParameter(
@@ -63,6 +112,24 @@ ALMUB_TITLE = OpenApiParameter(
     description="Название альбома",
     required=False,
 )
+ALBUM_TITLE_ICONTAINS = OpenApiParameter(
+    name="title__icontains",
+    type=str,
+    description="Название альбома содержит строку без учёта регистра",
+    required=False,
+)
+ALBUM_TITLE_ISTARTSWITH = OpenApiParameter(
+    name="title__istartswith",
+    type=str,
+    description="Название альбома начинается со строки без учёта регистра",
+    required=False,
+)
+ALBUM_TITLE_SIMILAR = OpenApiParameter(
+    name="title__similar",
+    type=str,
+    description="Название альбома похоже на строку (нечёткий поиск по триграммам)",
+    required=False,
+)
 ALBUM_RELEASE_YEAR = OpenApiParameter(
     name="release_year",
     type=int,
@@ -80,7 +147,7 @@ ALBUM_ARTIST = OpenApiParameter(
 LIMIT = OpenApiParameter(
     name="limit",
     type=int,
-    description="Количество записей на одной странице, по умолчанию 10 записей.",
+    description="Количество записей на одной странице, по умолчанию 10 записей, не больше 100.",
     required=False,
 )
 OFFSET = OpenApiParameter(
@@ -89,3 +156,155 @@ OFFSET = OpenApiParameter(
     description="Начальный индекс для пагинации",
     required=False,
 )
+CURSOR = OpenApiParameter(
+    name="cursor",
+    type=str,
+    description="Курсор keyset-пагинации. Пустое значение - первая страница, далее курсор берётся из `next`/`previous`.",
+    required=False,
+)
+ORDERING = OpenApiParameter(
+    name="ordering",
+    type=str,
+    description="Поле сортировки для keyset-пагинации, например `name` или `-id`.",
+    required=False,
+)
+COUNT = OpenApiParameter(
+    name="count",
+    type=str,
+    enum=["exact", "estimate", "none"],
+    description="Подсчёт количества записей: точный, оценка по статистике Postgres или без подсчёта.",
+    required=False,
+)
+
+# Фикстуры выбора полей
+FIELDS = OpenApiParameter(
+    name="fields",
+    type=str,
+    description="Поля ответа через запятую, вложенные - через точку, например `name,albums.title`. "
+    "`id` верхнего уровня возвращается всегда. Для альбомов и исполнителей `summary` - краткое "
+    "представление для карточек со сводными счётчиками вместо вложенных записей.",
+    required=False,
+)
+EXPAND = OpenApiParameter(
+    name="expand",
+    type=str,
+    description="Связи через запятую, которые раскрываются объектами независимо от `depth`, например `albums.songs`.",
+    required=False,
+)
+DEPTH = OpenApiParameter(
+    name="depth",
+    type=int,
+    description="Глубина вложенных объектов: `0` - только поля самой записи. Более глубокие связи "
+    "с одним объектом возвращаются как id, списки не возвращаются. По умолчанию без ограничения.",
+    required=False,
+)
+
+# Фикстуры массовой записи
+BULK_DESCRIPTION = (
+    "Принимает список объектов в JSON или NDJSON (`Content-Type: application/x-ndjson`).\n\n"
+    "Каждый объект валидируется отдельно, корректные объекты записываются одной транзакцией, "
+    "результат возвращается для каждого объекта в порядке запроса."
+)
+BULK_RESULT = inline_serializer(
+    name="BulkResult",
+    fields={
+        "created": serializers.IntegerField(help_text="Количество созданных записей"),
+        "updated": serializers.IntegerField(help_text="Количество обновлённых записей"),
+        "errors": serializers.IntegerField(help_text="Количество записей с ошибками"),
+        "results": inline_serializer(
+            name="BulkItemResult",
+            many=True,
+            fields={
+                "status": serializers.ChoiceField(choices=["created", "updated", "error"]),
+                "id": serializers.IntegerField(required=False),
+                "errors": serializers.DictField(required=False),
+            },
+        ),
+    },
+)
+
+# Фикстуры условных запросов
+IF_NONE_MATCH = OpenApiParameter(
+    name="If-None-Match",
+    type=str,
+    location=OpenApiParameter.HEADER,
+    description="ETag из предыдущего ответа. Если запись не изменилась, вернётся 304 без тела.",
+    required=False,
+)
+IF_MATCH = OpenApiParameter(
+    name="If-Match",
+    type=str,
+    location=OpenApiParameter.HEADER,
+    description="ETag изменяемой записи. Если запись уже изменили, вернётся 412 и изменения не применятся.",
+    required=False,
+)
+NOT_MODIFIED_DESCRIPTION = "Запись не изменилась с момента получения ETag."
+PRECONDITION_FAILED_DESCRIPTION = "Запись была изменена после получения ETag."
+
+# Фикстуры фоновых задач
+PREFER = OpenApiParameter(
+    name="Prefer",
+    type=str,
+    location=OpenApiParameter.HEADER,
+    enum=["respond-async"],
+    description="`respond-async` - записать в фоне: ответ 202 с задачей, статус - по адресу из заголовка Location.",
+    required=False,
+)
+ACCEPTED_DESCRIPTION = "Запись поставлена в очередь фоновых задач."
+JOB_ID = OpenApiParameter(
+    name="id",
+    type=int,
+    location=OpenApiParameter.PATH,
+    description="ID задачи",
+    required=True,
+)
+JOB_ERROR = "Задача с таким id не найдена."
+JOB_STATUS = OpenApiParameter(
+    name="status",
+    type=str,
+    enum=["queued", "running", "done", "failed"],
+    description="Статус задачи.",
+    required=False,
+)
+JOB_KIND = OpenApiParameter(
+    name="kind",
+    type=str,
+    enum=["write", "bulk", "snapshots"],
+    description="Тип задачи.",
+    required=False,
+)
+
+# Фикстуры журнала изменений
+CHANGES_SINCE = OpenApiParameter(
+    name="since",
+    type=str,
+    description="`sequence` последнего обработанного события (его же содержит ссылка `next`), `0` - с начала журнала.",
+    required=False,
+)
+CHANGES_LIMIT = OpenApiParameter(
+    name="limit",
+    type=int,
+    description="Количество событий в ответе, по умолчанию и не больше CATALOG_CHANGES_MAX_LIMIT.",
+    required=False,
+)
+CHANGES_ERROR = "Некорректный параметр since или limit."
+CHANGES_EXPIRED = (
+    "События после позиции since уже удалены из журнала (хранятся CATALOG_CHANGES_RETENTION_DAYS дней): "
+    "прочитайте каталог заново и продолжайте с since=0."
+)
+
+# Фикстуры поиска
+SEARCH_QUERY = OpenApiParameter(
+    name="q",
+    type=str,
+    description="Слова из имени исполнителя, названия альбома или песни. Последнее слово ищется как префикс.",
+    required=True,
+)
+SEARCH_TYPE = OpenApiParameter(
+    name="type",
+    type=str,
+    enum=["artist", "album", "song"],
+    description="Искать только записи одного типа.",
+    required=False,
+)
+SEARCH_ERROR = "Передайте хотя бы одно слово для поиска."
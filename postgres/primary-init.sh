@@ -0,0 +1,5 @@
+#!/bin/sh
+# Разрешает реплике (сервис db_replica) подключаться для потоковой репликации.
+# Выполняется образом postgres только при инициализации пустого тома.
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,13 @@
+#!/bin/sh
+# Запускает реплику только для чтения: при пустом томе копирует основную БД (pg_basebackup -R
+# создаёт standby.signal и настройки подключения), затем принимает изменения потоковой репликацией.
+set -e
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h db -p "$POSTGRES_PORT" -U "$POSTGRES_USER"; do
+        sleep 1
+    done
+    PGPASSWORD="$POSTGRES_PASSWORD" pg_basebackup -h db -p "$POSTGRES_PORT" -U "$POSTGRES_USER" \
+        -D "$PGDATA" -R -X stream
+    chmod 700 "$PGDATA"
+fi
+exec postgres -p "$POSTGRES_PORT"